@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from collections.abc import Iterator
+from collections.abc import Iterator, Mapping
 from decimal import Decimal
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 from oscar.apps.basket.utils import DiscountApplication
 from oscar.core.decorators import deprecated
 
+from .offer.context import notify_consumption
+
 if TYPE_CHECKING:
     from .mixins import BluelightBasketLineMixin as Line
     from .offer.models import ConditionalOffer
@@ -15,6 +16,26 @@ if TYPE_CHECKING:
 ZERO = Decimal("0.00")
 
 
+class OfferConsumptionSnapshot(NamedTuple):
+    offers: dict[int, ConditionalOffer]
+    affected_quantity: int
+    consumptions: dict[int, int]
+    discounted_quantity: int
+    global_affected_quantity: int
+
+
+class OfferConsumption:
+    """
+    How many items of a line an offer has consumed.
+    """
+
+    __slots__ = ("offer", "quantity")
+
+    def __init__(self, offer: ConditionalOffer, quantity: int = 0) -> None:
+        self.offer = offer
+        self.quantity = quantity
+
+
 class BluelightLineOfferConsumer:
     """
     Version of ``oscar.app.basket.utils.LineOfferConsumer`` which supports OfferGroups.
@@ -22,9 +43,11 @@ class BluelightLineOfferConsumer:
 
     def __init__(self, line: Line) -> None:
         self._line = line
-        self._offers: dict[int, ConditionalOffer] = {}
+        # Every offer which has consumed (or tried to consume) this line, keyed by offer ID
+        self._consumptions: dict[int, OfferConsumption] = {}
+        # Whether any of the offers in ``_consumptions`` is exclusive
+        self._has_exclusive_offer = False
         self._affected_quantity = 0
-        self._consumptions: defaultdict[int, int] = defaultdict(int)
 
         # The built-in _affected_quantity property simply tracks how many items in the line aren't available
         # for use by offers. This property tracks what subset of that number was actually discounted (versus
@@ -35,8 +58,26 @@ class BluelightLineOfferConsumer:
         # This property refers to the affected quantity global of OfferGroups
         self._global_affected_quantity = 0
 
-    def _cache(self, offer: ConditionalOffer) -> None:
-        self._offers[offer.pk] = offer
+    def _cache(self, offer: ConditionalOffer) -> OfferConsumption:
+        consumption = self._consumptions.get(offer.pk)
+        if consumption is None:
+            consumption = self._consumptions[offer.pk] = OfferConsumption(offer)
+        else:
+            consumption.offer = offer
+        if offer.exclusive:
+            self._has_exclusive_offer = True
+        return consumption
+
+    def _set_consumptions(
+        self,
+        offers: Mapping[int, ConditionalOffer],
+        quantities: Mapping[int, int],
+    ) -> None:
+        self._consumptions = {
+            offer_id: OfferConsumption(offer, quantities.get(offer_id, 0))
+            for offer_id, offer in offers.items()
+        }
+        self._has_exclusive_offer = any(offer.exclusive for offer in offers.values())
 
     def _update_affected_quantity(self, quantity: int) -> int:
         available_in_group = int(self._line.quantity - self._affected_quantity)
@@ -57,14 +98,14 @@ class BluelightLineOfferConsumer:
         If offer is None, the specified quantity of items on this basket line is consumed for *any*
         offer, else only for the specified offer.
         """
-        available = 0
-        if offer:
-            self._cache(offer)
-            available = self.available(offer)
-        num_consumed = self._update_affected_quantity(quantity)
-        if offer:
-            num_consumed = min(available, quantity)
-            self._consumptions[offer.pk] += num_consumed
+        notify_consumption()
+        if not offer:
+            return self._update_affected_quantity(quantity)
+        consumption = self._cache(offer)
+        available = self.available(offer)
+        self._update_affected_quantity(quantity)
+        num_consumed = min(available, quantity)
+        consumption.quantity += num_consumed
         return num_consumed
 
     @deprecated
@@ -79,19 +120,19 @@ class BluelightLineOfferConsumer:
         """
         if not offer:
             return self._affected_quantity
-        return int(self._consumptions[offer.pk])
+        consumption = self._consumptions.get(offer.pk)
+        return consumption.quantity if consumption is not None else 0
 
     @property
     def consumers(self) -> list[ConditionalOffer]:
-        return [x for x in self._offers.values() if self.num_consumed(x)]
+        return [c.offer for c in self._consumptions.values() if c.quantity]
 
     def available(self, offer: ConditionalOffer | None = None) -> int:
         """
         Check how many items are available for offers
         """
         if offer:
-            exclusive = any(x.exclusive for x in self._offers.values())
-            exclusive |= bool(offer.exclusive)
+            exclusive = self._has_exclusive_offer or bool(offer.exclusive)
         else:
             exclusive = True
 
@@ -111,6 +152,7 @@ class BluelightLineOfferConsumer:
         """
         Update the discounted quantity.
         """
+        notify_consumption()
         self._discounted_quantity += quantity
 
     def discounted(self) -> int:
@@ -127,6 +169,7 @@ class BluelightLineOfferConsumer:
         to 0. This allows offers to re-consume lines already consumed by previous offer groups while still calculating
         their discount amounts correctly.
         """
+        notify_consumption()
         self._affected_quantity = 0
         self._discounted_quantity = 0
 
@@ -134,23 +177,82 @@ class BluelightLineOfferConsumer:
         """
         Signal that the Applicator has finished applying a group of offers.
         """
+        notify_consumption()
         self._discounted_quantity = 0
 
     def finalize_offer_group_applications(self) -> None:
         """
         Signal that all offer groups (and therefore all offers) have now been applied.
         """
+        notify_consumption()
         self._affected_quantity = min(
             self._line.quantity, self._global_affected_quantity
         )
 
+    def get_state(self) -> dict[str, Any]:
+        """
+        Get a picklable copy of this consumer's state, with offers replaced by their IDs.
+        """
+        return {
+            "offers": list(self._consumptions.keys()),
+            "affected_quantity": self._affected_quantity,
+            "consumptions": {
+                offer_id: c.quantity for offer_id, c in self._consumptions.items()
+            },
+            "discounted_quantity": self._discounted_quantity,
+            "global_affected_quantity": self._global_affected_quantity,
+        }
+
+    def set_state(
+        self,
+        state: Mapping[str, Any],
+        offers: Mapping[int, ConditionalOffer],
+    ) -> None:
+        """
+        Restore state previously returned by ``get_state``. ``offers`` maps offer ID to offer.
+        """
+        notify_consumption()
+        self._set_consumptions(
+            {offer_id: offers[offer_id] for offer_id in state["offers"]},
+            state["consumptions"],
+        )
+        self._affected_quantity = state["affected_quantity"]
+        self._discounted_quantity = state["discounted_quantity"]
+        self._global_affected_quantity = state["global_affected_quantity"]
+
+    def get_snapshot(self) -> OfferConsumptionSnapshot:
+        """
+        Get an in-memory copy of this consumer's consumption counters (but not of any discounts).
+        """
+        return OfferConsumptionSnapshot(
+            offers={offer_id: c.offer for offer_id, c in self._consumptions.items()},
+            affected_quantity=self._affected_quantity,
+            consumptions={
+                offer_id: c.quantity for offer_id, c in self._consumptions.items()
+            },
+            discounted_quantity=self._discounted_quantity,
+            global_affected_quantity=self._global_affected_quantity,
+        )
+
+    def restore_snapshot(self, snapshot: OfferConsumptionSnapshot) -> None:
+        """
+        Restore the consumption counters previously returned by ``get_snapshot``.
+        """
+        notify_consumption()
+        self._set_consumptions(snapshot.offers, snapshot.consumptions)
+        self._affected_quantity = snapshot.affected_quantity
+        self._discounted_quantity = snapshot.discounted_quantity
+        self._global_affected_quantity = snapshot.global_affected_quantity
+
 
 class BluelightLineDiscountRegistry(BluelightLineOfferConsumer):
     def __init__(self, line: Line):
         super().__init__(line)
         self._discounts: list[DiscountApplication] = []
-        self._discount_excl_tax: Decimal | None = None
-        self._discount_incl_tax: Decimal | None = None
+        # Running totals of ``_discounts``
+        self._discount_excl_tax = ZERO
+        self._discount_incl_tax = ZERO
+        self._discount_total = ZERO
 
     def discount(
         self,
@@ -160,34 +262,56 @@ class BluelightLineDiscountRegistry(BluelightLineOfferConsumer):
         offer: ConditionalOffer | None = None,
     ) -> None:
         super().discount(amount, quantity, incl_tax=incl_tax, offer=offer)
-        self._discounts.append(DiscountApplication(amount, quantity, incl_tax, offer))
+        self._add_discount(DiscountApplication(amount, quantity, incl_tax, offer))
         self.consume(quantity, offer=offer)
-        if incl_tax:
-            self._discount_incl_tax = None
+
+    def _add_discount(self, discount: DiscountApplication) -> None:
+        self._discounts.append(discount)
+        if discount.incl_tax:
+            self._discount_incl_tax += discount.amount
         else:
-            self._discount_excl_tax = None
+            self._discount_excl_tax += discount.amount
+        self._discount_total += discount.amount
+
+    def get_state(self) -> dict[str, Any]:
+        state = super().get_state()
+        state["discounts"] = [
+            (d.amount, d.quantity, d.incl_tax, d.offer.pk if d.offer else None)
+            for d in self._discounts
+        ]
+        return state
+
+    def set_state(
+        self,
+        state: Mapping[str, Any],
+        offers: Mapping[int, ConditionalOffer],
+    ) -> None:
+        super().set_state(state, offers)
+        self._discounts = []
+        self._discount_excl_tax = ZERO
+        self._discount_incl_tax = ZERO
+        self._discount_total = ZERO
+        for amount, quantity, incl_tax, offer_id in state["discounts"]:
+            self._add_discount(
+                DiscountApplication(
+                    amount,
+                    quantity,
+                    incl_tax,
+                    offers[offer_id] if offer_id is not None else None,
+                )
+            )
 
     @property
     def excl_tax(self) -> Decimal:
-        if self._discount_excl_tax is None:
-            self._discount_excl_tax = sum(
-                [d.amount for d in self._discounts if not d.incl_tax],
-                ZERO,
-            )
         return self._discount_excl_tax
 
     @property
     def incl_tax(self) -> Decimal:
-        if self._discount_incl_tax is None:
-            self._discount_incl_tax = sum(
-                [d.amount for d in self._discounts if d.incl_tax],
-                ZERO,
-            )
         return self._discount_incl_tax
 
     @property
     def total(self) -> Decimal:
-        return sum([d.amount for d in self._discounts], ZERO)
+        return self._discount_total
 
     def all(self) -> list[DiscountApplication]:
         return self._discounts
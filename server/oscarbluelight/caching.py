@@ -1,11 +1,69 @@
 from __future__ import annotations
 
-from collections.abc import Callable
-from typing import Any
+from collections.abc import Callable, Hashable, Iterable, Mapping
+from typing import Any, Literal, overload
+import logging
+import time
 
 from django.core.cache.backends.base import BaseCache
 from django.utils.translation import gettext_lazy as _
 
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """
+    Stampede protection settings for a :class:`FluentCache`.
+
+    On a cache miss, a worker must first take a short-lived lock (``cache.add`` of a lock key) before
+    computing the value. Workers which lose the race serve the value stored under the previous
+    namespace versions (if one is still readable), or else poll the cache for up to
+    ``wait_timeout`` seconds before giving up and computing the value themselves.
+    """
+
+    def __init__(
+        self,
+        lock_timeout: int = 30,
+        wait_timeout: float = 2.0,
+        poll_interval: float = 0.05,
+    ):
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    def get_lock_key(self, key: str) -> str:
+        return f"{key}:lock"
+
+    def acquire(self, cache: BaseCache, key: str, version: int | None = None) -> bool:
+        return cache.add(
+            self.get_lock_key(key), 1, timeout=self.lock_timeout, version=version
+        )
+
+    def release(self, cache: BaseCache, key: str, version: int | None = None) -> None:
+        cache.delete(self.get_lock_key(key), version=version)
+
+    def wait_for(
+        self,
+        cache: BaseCache,
+        keys: Iterable[str],
+        version: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Poll the cache until every key has a value, or until ``wait_timeout`` elapses. Returns
+        whichever values were found.
+        """
+        pending = set(keys)
+        found: dict[str, Any] = {}
+        deadline = time.monotonic() + self.wait_timeout
+        while pending and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            values = cache.get_many(pending, version=version)
+            found.update(values)
+            pending.difference_update(values)
+        return found
+
 
 class ConcreteFluentCache:
     def __init__(
@@ -14,11 +72,15 @@ class ConcreteFluentCache:
         key: str,
         timeout: int | None = None,
         version: int | None = None,
+        stale_key: str | None = None,
+        single_flight: SingleFlight | None = None,
     ):
         self.cache = cache
         self.key = key
         self.timeout = timeout
         self.version = version
+        self.stale_key = stale_key
+        self.single_flight = single_flight
 
     def get(self, default: Any = None) -> Any:
         return self.cache.get(self.key, default=default, version=self.version)
@@ -34,9 +96,36 @@ class ConcreteFluentCache:
         )
 
     def get_or_set(self, default: Callable[[], Any]) -> Any:
-        return self.cache.get_or_set(
-            self.key, default, timeout=self.timeout, version=self.version
+        if self.single_flight is None:
+            return self.cache.get_or_set(
+                self.key, default, timeout=self.timeout, version=self.version
+            )
+        value = self.get(_MISSING)
+        if value is not _MISSING:
+            return value
+        # Only compute the value if nobody else is already doing so
+        if self.single_flight.acquire(self.cache, self.key, version=self.version):
+            try:
+                value = default()
+                self.set(value)
+                return value
+            finally:
+                self.single_flight.release(self.cache, self.key, version=self.version)
+        # Someone else is computing the value. Serve the previous value, if there is one.
+        if self.stale_key is not None:
+            value = self.cache.get(self.stale_key, _MISSING, version=self.version)
+            if value is not _MISSING:
+                return value
+        # Else, wait a moment for the other worker to finish.
+        found = self.single_flight.wait_for(
+            self.cache, [self.key], version=self.version
         )
+        if self.key in found:
+            return found[self.key]
+        logger.debug("Timed out waiting for cache key %s", self.key)
+        value = default()
+        self.set(value)
+        return value
 
     def delete(self) -> bool:
         return self.cache.delete(self.key, version=self.version)
@@ -45,25 +134,116 @@ class ConcreteFluentCache:
         return self.cache.touch(self.key, timeout=self.timeout, version=self.version)
 
 
+def _get_initial_namespace_value() -> int:
+    # Seed new namespaces from the clock rather than from 1, so that a
+    # namespace which gets evicted (or flushed) and re-created never reuses a
+    # version number that a process may still be holding onto.
+    return time.time_ns() // 1_000
+
+
 class CacheNamespace:
-    def __init__(self, cache: BaseCache, name: str):
+    def __init__(
+        self,
+        cache: BaseCache,
+        name: str,
+        grace_period: int | None = None,
+    ):
         self.cache = cache
         self.name = name
+        # How long (in seconds) to keep the previous namespace version readable after invalidation
+        self.grace_period = grace_period
 
     @property
     def key(self) -> str:
         return f"oscarbluelight.cache-ns:{self.name}"
 
+    @property
+    def previous_key(self) -> str:
+        return f"{self.key}:previous"
+
+    @property
+    def previous_value(self) -> Any:
+        """
+        The namespace version in effect before the most recent invalidation, if it's still within
+        the grace period. Otherwise, ``None``.
+        """
+        if not self.grace_period:
+            return None
+        return self.cache.get(self.previous_key)
+
     @property
     def value(self) -> Any:
-        return self.cache.get_or_set(self.key, 1, timeout=None)
+        return self.cache.get_or_set(
+            self.key, _get_initial_namespace_value, timeout=None
+        )
 
     def invalidate(self) -> None:
         key = self.key
+        if self.grace_period:
+            previous = self.cache.get(key)
+            if previous is not None:
+                self.cache.set(self.previous_key, previous, timeout=self.grace_period)
         try:
             self.cache.incr(key, delta=1)
         except ValueError:
-            self.cache.set(key, 1, timeout=None)
+            self.cache.set(key, _get_initial_namespace_value(), timeout=None)
+
+
+class CacheNamespaceFamily:
+    """
+    A set of :class:`CacheNamespace` objects, one per member (e.g. one per product), which can
+    be invalidated independently of each other.
+    """
+
+    def __init__(
+        self,
+        cache: BaseCache,
+        name: str,
+        grace_period: int | None = None,
+    ):
+        self.cache = cache
+        self.name = name
+        self.grace_period = grace_period
+
+    def get(self, member: int | str) -> CacheNamespace:
+        return CacheNamespace(
+            self.cache, f"{self.name}:{member}", grace_period=self.grace_period
+        )
+
+    def get_values(self, members: Iterable[int | str]) -> dict[int | str, Any]:
+        """
+        Get the current version of each member's namespace, using a single cache round trip in
+        the common case where every namespace already exists.
+        """
+        namespaces = {member: self.get(member) for member in members}
+        found = self.cache.get_many([ns.key for ns in namespaces.values()])
+        values: dict[int | str, Any] = {}
+        for member, ns in namespaces.items():
+            try:
+                values[member] = found[ns.key]
+            except KeyError:
+                # Only create the namespaces which don't exist yet
+                values[member] = ns.value
+        return values
+
+    def get_previous_values(self, members: Iterable[int | str]) -> dict[int | str, Any]:
+        """
+        Get the previous version of each member's namespace, for those which were invalidated
+        within the grace period.
+        """
+        if not self.grace_period:
+            return {}
+        namespaces = {member: self.get(member) for member in members}
+        found = self.cache.get_many([ns.previous_key for ns in namespaces.values()])
+        return {
+            member: found[ns.previous_key]
+            for member, ns in namespaces.items()
+            if ns.previous_key in found
+        }
+
+    def invalidate(self, members: Iterable[int | str]) -> None:
+        for member in set(members):
+            self.get(member).invalidate()
 
 
 class FluentCache:
@@ -79,7 +259,9 @@ class FluentCache:
         self._timeout = timeout
         self._version = version
         self._namespaces: list[CacheNamespace] = []
+        self._namespace_families: dict[str, CacheNamespaceFamily] = {}
         self._key_parts: list[str] = []
+        self._single_flight: SingleFlight | None = None
 
     def timeout(self, ttl: int) -> FluentCache:
         self._timeout = ttl
@@ -89,32 +271,254 @@ class FluentCache:
         self._namespaces = list(args)
         return self
 
+    def namespace_families(self, **kwargs: CacheNamespaceFamily) -> FluentCache:
+        """
+        Scope entries to the namespace of the family member given by a key part. E.g.
+        ``namespace_families(product=product_ns)`` scopes each entry to the namespace of its
+        product, so that invalidating one product's namespace only drops that product's entries.
+        """
+        self._namespace_families = dict(kwargs)
+        return self
+
     def key_parts(self, *args: str) -> FluentCache:
         self._key_parts = list(args)
         return self
 
+    def single_flight(self, single_flight: SingleFlight | None) -> FluentCache:
+        self._single_flight = single_flight
+        return self
+
     def concrete(self, **kwargs: int | str) -> ConcreteFluentCache:
         key = self.build_key(**kwargs)
+        stale_key: str | None = None
+        if self._single_flight is not None:
+            stale_key = self.build_stale_key(**kwargs)
         return ConcreteFluentCache(
             self.cache,
             key,
             timeout=self._timeout,
             version=self._version,
+            stale_key=stale_key,
+            single_flight=self._single_flight,
         )
 
     def build_key(self, **kwargs: int | str) -> str:
+        return self.build_keys([kwargs])[0]
+
+    def build_stale_key(self, **kwargs: int | str) -> str | None:
+        """
+        Build the key this entry had under the previous namespace versions, or ``None`` if none
+        of the entry's namespaces has a readable previous version.
+        """
+        return self.build_stale_keys([kwargs])[0]
+
+    def build_keys(self, items: Iterable[Mapping[str, int | str]]) -> list[str]:
+        """
+        Build a key for each mapping of key parts in ``items``. Namespace versions are looked up
+        once for the whole batch.
+        """
+        items = list(items)
+        ns_fragments = self._get_namespace_fragments()
+        family_fragments = self._get_family_fragments(items)
+        return [
+            self._build_key(ns_fragments + item_fragments, kwargs)
+            for kwargs, item_fragments in zip(items, family_fragments, strict=True)
+        ]
+
+    def build_stale_keys(
+        self,
+        items: Iterable[Mapping[str, int | str]],
+    ) -> list[str | None]:
+        """
+        Bulk version of ``build_stale_key``.
+        """
+        items = list(items)
+        ns_fragments, has_previous = self._get_previous_namespace_fragments()
+        family_fragments = self._get_family_fragments(items, previous=True)
+        keys: list[str | None] = []
+        for kwargs, (item_fragments, item_has_previous) in zip(
+            items, family_fragments, strict=True
+        ):
+            if not has_previous and not item_has_previous:
+                keys.append(None)
+            else:
+                keys.append(self._build_key(ns_fragments + item_fragments, kwargs))
+        return keys
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        return self.cache.get_many(keys, version=self._version)
+
+    def set_many(self, data: Mapping[str, Any]) -> None:
+        if not data:
+            return
+        self.cache.set_many(dict(data), timeout=self._timeout, version=self._version)
+
+    def get_many_or_set[K: Hashable](
+        self,
+        items: Mapping[K, Mapping[str, int | str]],
+        default: Callable[[list[K]], Mapping[K, Any]],
+    ) -> dict[K, Any]:
+        """
+        Bulk version of ``get_or_set``.
+
+        ``items`` maps an arbitrary identifier to the key parts for that entry. Any entries missing
+        from the cache are computed with a single call to ``default`` (which receives the list of
+        missing identifiers and returns a mapping of identifier to value) and then stored.
+        """
+        idents = list(items)
+        keys = dict(zip(idents, self.build_keys(items.values()), strict=True))
+        cached = self.get_many(keys.values())
+        results: dict[K, Any] = {
+            ident: cached[key] for ident, key in keys.items() if key in cached
+        }
+        misses = [ident for ident in idents if ident not in results]
+        if not misses:
+            return results
+        if self._single_flight is None:
+            computed = default(misses)
+            self.set_many({keys[ident]: value for ident, value in computed.items()})
+            results.update(computed)
+            return results
+        return self._get_many_or_set_single_flight(
+            items, keys, results, misses, default
+        )
+
+    def _get_many_or_set_single_flight[K: Hashable](
+        self,
+        items: Mapping[K, Mapping[str, int | str]],
+        keys: Mapping[K, str],
+        results: dict[K, Any],
+        misses: list[K],
+        default: Callable[[list[K]], Mapping[K, Any]],
+    ) -> dict[K, Any]:
+        single_flight = self._single_flight
+        assert single_flight is not None
+        # Compute the entries we can get a lock on. Leave the rest to whoever holds their locks.
+        locked: list[K] = []
+        contended: list[K] = []
+        for ident in misses:
+            if single_flight.acquire(self.cache, keys[ident], version=self._version):
+                locked.append(ident)
+            else:
+                contended.append(ident)
+        if locked:
+            try:
+                computed = default(locked)
+                self.set_many({keys[ident]: value for ident, value in computed.items()})
+                results.update(computed)
+            finally:
+                for ident in locked:
+                    single_flight.release(
+                        self.cache, keys[ident], version=self._version
+                    )
+        if not contended:
+            return results
+
+        # Serve previous values for contended entries, where available
+        stale_keys = {
+            ident: stale_key
+            for ident, stale_key in zip(
+                contended,
+                self.build_stale_keys(items[ident] for ident in contended),
+                strict=True,
+            )
+            if stale_key is not None
+        }
+        if stale_keys:
+            stale = self.get_many(stale_keys.values())
+            for ident, stale_key in stale_keys.items():
+                if stale_key in stale:
+                    results[ident] = stale[stale_key]
+            contended = [ident for ident in contended if ident not in results]
+
+        # Wait for other workers to finish the remainder, and compute anything still missing
+        if contended:
+            found = single_flight.wait_for(
+                self.cache, (keys[ident] for ident in contended), version=self._version
+            )
+            for ident in contended:
+                if keys[ident] in found:
+                    results[ident] = found[keys[ident]]
+            contended = [ident for ident in contended if ident not in results]
+        if contended:
+            logger.debug("Timed out waiting for %d cache keys", len(contended))
+            computed = default(contended)
+            self.set_many({keys[ident]: value for ident, value in computed.items()})
+            results.update(computed)
+        return results
+
+    def _get_namespace_fragments(self) -> list[str]:
+        return [
+            f"ns:{namespace.name}:{namespace.value}" for namespace in self._namespaces
+        ]
+
+    def _get_previous_namespace_fragments(self) -> tuple[list[str], bool]:
+        fragments: list[str] = []
+        has_previous = False
+        for namespace in self._namespaces:
+            value = namespace.previous_value
+            if value is None:
+                value = namespace.value
+            else:
+                has_previous = True
+            fragments.append(f"ns:{namespace.name}:{value}")
+        return fragments, has_previous
+
+    @overload
+    def _get_family_fragments(
+        self,
+        items: list[Mapping[str, int | str]],
+        previous: Literal[False] = False,
+    ) -> list[list[str]]: ...
+
+    @overload
+    def _get_family_fragments(
+        self,
+        items: list[Mapping[str, int | str]],
+        previous: Literal[True],
+    ) -> list[tuple[list[str], bool]]: ...
+
+    def _get_family_fragments(
+        self,
+        items: list[Mapping[str, int | str]],
+        previous: bool = False,
+    ) -> list[list[str]] | list[tuple[list[str], bool]]:
+        fragments: list[list[str]] = [[] for __ in items]
+        has_previous = [False for __ in items]
+        for key_part, family in self._namespace_families.items():
+            members = [self._get_key_part(kwargs, key_part) for kwargs in items]
+            values = family.get_values(members)
+            previous_values = family.get_previous_values(members) if previous else {}
+            for i, member in enumerate(members):
+                value = values[member]
+                if member in previous_values:
+                    value = previous_values[member]
+                    has_previous[i] = True
+                fragments[i].append(f"ns:{family.name}:{value}")
+        if previous:
+            return list(zip(fragments, has_previous, strict=True))
+        return fragments
+
+    def _get_key_part(
+        self, kwargs: Mapping[str, int | str], key_part: str
+    ) -> int | str:
+        if key_part not in kwargs:
+            raise ValueError(
+                _("Cache key is missing value for key part: %s") % key_part
+            )
+        return kwargs[key_part]
+
+    def _build_key(
+        self,
+        ns_fragments: list[str],
+        kwargs: Mapping[str, int | str],
+    ) -> str:
         key_fragments = [self._key_base]
         # Add in serialized namespaces
-        for namespace in self._namespaces:
-            fragment = f"ns:{namespace.name}:{namespace.value}"
-            key_fragments.append(fragment)
+        key_fragments.extend(ns_fragments)
         # Add in key parts
         for key_part in self._key_parts:
-            if key_part not in kwargs:
-                raise ValueError(
-                    _("Cache key is missing value for key part: %s") % key_part
-                )
-            val = kwargs[key_part]
+            val = self._get_key_part(kwargs, key_part)
             fragment = f"p:{key_part}:{val}"
             key_fragments.append(fragment)
         return ".".join(key_fragments)
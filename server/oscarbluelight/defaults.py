@@ -31,6 +31,120 @@ BLUELIGHT_OFFER_IMAGE_FOLDER = "images/offers/"
 
 BLUELIGHT_COSMETIC_PRICE_CACHE_TTL = 86400
 
+# Protect against cache stampedes after the pricing cache is invalidated. When
+# enabled, only one worker calculates a given cosmetic price at a time. Other
+# workers serve the price from before the invalidation (if it's still within
+# the grace period below) or briefly wait for the calculating worker.
+BLUELIGHT_COSMETIC_PRICE_SINGLE_FLIGHT = False
+
+# How long (in seconds) the pricing cache namespace's previous version remains
+# readable after it's invalidated.
+BLUELIGHT_PRICING_CACHE_NS_GRACE_PERIOD = 300
+
+# Changes which only affect the cosmetic prices of specific products (stock
+# records, range membership, etc.) invalidate just those products' prices. If a
+# single change affects more products than this, the entire pricing cache is
+# invalidated instead.
+BLUELIGHT_PRICING_CACHE_MAX_PRODUCT_INVALIDATIONS = 1000
+
+# Queue a task to pre-compute cosmetic prices after the pricing cache is
+# invalidated, so that shoppers don't pay for the cache misses.
+BLUELIGHT_COSMETIC_PRICE_WARMING_ENABLED = False
+
+# Number of products to price per batch while warming the cache.
+BLUELIGHT_COSMETIC_PRICE_WARMING_CHUNK_SIZE = 100
+
+# Optional dotted path to a function returning a list of product IDs (e.g.
+# best-sellers) whose cosmetic prices should be warmed first.
+BLUELIGHT_COSMETIC_PRICE_WARMING_PRIORITY_FUNC = None
+
+# Serve site offers from a per-process, pre-sorted snapshot rather than loading
+# them from the database on every offer application. The snapshot is rebuilt
+# whenever the pricing cache namespace is invalidated (which happens on commit
+# of any offer, condition, benefit, or offer group change) or an offer's
+# start / end datetime passes.
+BLUELIGHT_OFFER_CATALOG_ENABLED = False
+
+# Maximum age (in seconds) of the offer catalog snapshot. Offer usage counters
+# (e.g. ``num_applications``) are updated without sending signals, so this
+# bounds how stale those counters may become. Set to ``None`` to disable.
+BLUELIGHT_OFFER_CATALOG_MAX_AGE = 300
+
+# Only evaluate the site offers whose condition ranges contain at least one of
+# the basket's products, using an index kept in the offer catalog. Requires
+# ``BLUELIGHT_OFFER_CATALOG_ENABLED``.
+BLUELIGHT_OFFER_PREFILTER_ENABLED = False
+
+# Dotted path to a ``BaseOfferInstrumentationCollector`` subclass which
+# receives per-offer timing, iteration, and query counts each time offers are
+# applied to a basket. E.g.
+# ``oscarbluelight.offer.instrumentation.LoggingOfferInstrumentationCollector``.
+# Defaults to a no-op collector.
+BLUELIGHT_OFFER_INSTRUMENTATION_COLLECTOR = None
+
+# Fraction (0.0 - 1.0) of offer applications to record stats for.
+BLUELIGHT_OFFER_INSTRUMENTATION_SAMPLE_RATE = 1.0
+
+# Apply offers with high application limits (e.g. "buy 2 get 1" on a line with a
+# large quantity) in a single aggregated step, instead of re-evaluating the
+# condition and benefit once per application. Only applies to count, coverage,
+# and value conditions combined with percentage, absolute, and multibuy benefits
+# on a single basket line. The resulting discounts and offer application totals
+# are identical.
+BLUELIGHT_OFFER_MULTI_APPLICATION_ENABLED = False
+
+# Skip calculating offer upsells and line discount descriptions while calculating
+# cosmetic prices, since only the resulting prices are used. Note that any
+# ``post_offers_apply`` signal receivers then won't see upsells or discount
+# descriptions on the simulated basket.
+BLUELIGHT_COSMETIC_PRICING_LEAN_APPLICATION = False
+
+# Keep a per-process copy of the range product set view (loaded lazily, one range
+# at a time) and use it to check whether a product is in a standard range, instead
+# of querying the view each time. The copy is dropped whenever the view is
+# refreshed.
+BLUELIGHT_RANGE_MEMBERSHIP_CACHE_ENABLED = False
+
+# How often (in seconds) each process checks whether the range product set view
+# has been refreshed by another process.
+BLUELIGHT_RANGE_MEMBERSHIP_CACHE_CHECK_INTERVAL = 30
+
+# Cache the result of applying offers to a basket, keyed by a fingerprint of the
+# basket's lines (products, quantities, and prices), offers, vouchers, and user.
+# Re-applying offers to an unchanged basket then restores the cached discounts,
+# offer applications, and upsells instead of recalculating them. Applications
+# involving system offer groups are never cached.
+BLUELIGHT_BASKET_APPLICATION_CACHE_ENABLED = False
+
+# How long (in seconds) to cache basket offer applications for. Offers with usage
+# limits (e.g. ``max_user_applications``) are part of the fingerprint, by how many
+# more times the basket's owner can use them.
+BLUELIGHT_BASKET_APPLICATION_CACHE_TTL = 300
+
+# Stop evaluating a compound condition's sub-conditions as soon as the result is
+# known (i.e. once an AND has failed or an OR has succeeded). The result is the
+# same, but ``ConditionalOffer.get_condition_satisfying_lines`` then only
+# includes lines from the sub-conditions which were evaluated.
+BLUELIGHT_COMPOUND_CONDITION_SHORT_CIRCUIT = False
+
+# When short-circuiting compound conditions, evaluate their sub-conditions
+# cheapest and most decisive first: by static cost (e.g. count conditions before
+# tax-inclusive value conditions) until enough evaluations have been timed, and
+# by each sub-condition's observed cost and outcomes after that. This only
+# changes the evaluation order, not the order in which items are consumed.
+BLUELIGHT_COMPOUND_CONDITION_ADAPTIVE_ORDER = False
+
+# Generate and insert auto-generated child voucher codes in PostgreSQL (with
+# ``generate_series`` and random suffixes from ``gen_random_uuid``), in batches,
+# instead of building the codes in Python and checking them for conflicts before
+# inserting them. Conflicting codes are retried with new suffixes.
+BLUELIGHT_VOUCHER_GENERATE_CODES_IN_DB = False
+
+# Stream custom child voucher codes into a temporary table with ``COPY``, then
+# insert the codes which don't already exist with a single statement, instead of
+# building a ``Voucher`` instance for each code and inserting them in batches.
+BLUELIGHT_VOUCHER_COPY_CUSTOM_CODES = False
+
 BLUELIGHT_BENEFIT_CLASSES = [
     (
         "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
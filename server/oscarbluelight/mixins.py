@@ -1,19 +1,23 @@
 from __future__ import annotations
 
+from collections.abc import Mapping, Sequence
 from decimal import Decimal
 from typing import TYPE_CHECKING, Any, NamedTuple
-import itertools
 import logging
 
 from django.utils.translation import gettext_lazy as _
 from oscar.core.utils import round_half_up
 
+from .basket_utils import OfferConsumptionSnapshot
+from .offer.context import notify_consumption
+
 if TYPE_CHECKING:
     from oscar.apps.basket.abstract_models import AbstractBasket, AbstractLine
     from oscar.apps.offer.results import PostOrderAction
 
     from .offer.models import ConditionalOffer
-    from .offer.upsells import OfferUpsell
+    from .offer.modes import DeferredOfferUpsells
+    from .offer.upsells import OfferUpsell, UpsellRelevance
 else:
 
     class AbstractBasket:
@@ -39,12 +43,65 @@ class LineDiscountDescription(NamedTuple):
     voucher_code: str | None
 
 
+class ConsumptionSnapshot(NamedTuple):
+    consumption: OfferConsumptionSnapshot
+    offer_group_starting_discount: Decimal
+
+
 class LinePriceBreakdownItem(NamedTuple):
     unit_price_incl_tax: Decimal
     unit_price_excl_tax: Decimal
     quantity: int
 
 
+def _append_price_run(
+    runs: list[tuple[Decimal, int]],
+    price: Decimal,
+    quantity: int,
+) -> None:
+    if runs and runs[-1][0] == price:
+        runs[-1] = (runs[-1][0], runs[-1][1] + quantity)
+    else:
+        runs.append((price, quantity))
+
+
+def _discount_price_runs(
+    runs: list[tuple[Decimal, int]],
+    discount_group: PriceBreakdownStackEntry,
+    line_quantity: int,
+) -> list[tuple[Decimal, int]]:
+    """
+    Decrease the unit price of ``discount_group.quantity_with_discount`` items by
+    ``discount_group.discount_delta_unit``, sweeping over the items in order (and skipping any
+    priced lower than the delta) as many times as it takes.
+
+    Items are described as runs of consecutive items with the same unit price, so this scales
+    with the number of distinct prices rather than the line quantity.
+    """
+    delta = discount_group.discount_delta_unit
+    remaining_qty_affected = discount_group.quantity_with_discount
+    iterations = 0
+    while remaining_qty_affected > 0 and iterations <= line_quantity:
+        swept: list[tuple[Decimal, int]] = []
+        num_discounted = 0
+        for price, qty in runs:
+            if remaining_qty_affected <= 0 or price < delta:
+                _append_price_run(swept, price, qty)
+                continue
+            qty_discounted = min(qty, remaining_qty_affected)
+            _append_price_run(swept, price - delta, qty_discounted)
+            if qty > qty_discounted:
+                _append_price_run(swept, price, qty - qty_discounted)
+            remaining_qty_affected -= qty_discounted
+            num_discounted += qty_discounted
+        runs = swept
+        iterations += 1
+        # Nothing could be discounted, so another sweep wouldn't change anything either
+        if num_discounted == 0:
+            break
+    return runs
+
+
 class BluelightBasketMixin(AbstractBasket):
     @property
     def offer_post_order_actions(self) -> list[PostOrderAction]:
@@ -82,16 +139,40 @@ class BluelightBasketMixin(AbstractBasket):
                 )
 
     def add_offer_upsell(self, offer_upsell: OfferUpsell) -> None:
+        self.add_offer_upsells([offer_upsell])
+
+    def add_offer_upsells(
+        self,
+        offer_upsells: Sequence[OfferUpsell],
+        relevance: UpsellRelevance | None = None,
+    ) -> None:
+        """
+        Add each of the given upsells to the lines whose products it's relevant to. Relevance is
+        resolved in bulk by the given (or a new) :class:`UpsellRelevance
+        <oscarbluelight.offer.upsells.UpsellRelevance>`, rather than per line and upsell.
+        """
+        from .offer.upsells import UpsellRelevance
+
+        lines: list[BluelightBasketLineMixin] = []
         for line in self.all_lines():
             if isinstance(line, BluelightBasketLineMixin):
-                if line.product and offer_upsell.is_relevant_to_product(line.product):
-                    line.add_offer_upsell(offer_upsell)
+                lines.append(line)
             else:
                 logger.warning(
                     "Basket line %r does not use BluelightBasketLineMixin. "
                     "Ensure your basket Line model includes this mixin.",
                     line,
                 )
+        if not offer_upsells or not lines:
+            return
+        if relevance is None:
+            relevance = UpsellRelevance(line.product for line in lines if line.product)
+        relevance.prefetch(offer_upsells)
+        for offer_upsell in offer_upsells:
+            product_ids = relevance.get_relevant_product_ids(offer_upsell)
+            for line in lines:
+                if line.product and line.product.pk in product_ids:
+                    line.add_offer_upsell(offer_upsell)
 
     def get_offer_upsells(self) -> list[OfferUpsell]:
         offer_upsells = set()
@@ -109,6 +190,10 @@ class BluelightBasketMixin(AbstractBasket):
 
 
 class BluelightBasketLineMixin(AbstractLine):
+    # Whether ``discount`` should record a description of each discount. Set by the Applicator
+    # according to its application mode.
+    record_discount_descriptions = True
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
 
@@ -125,6 +210,9 @@ class BluelightBasketLineMixin(AbstractLine):
         # Used to track offer upsell messages
         self._offer_upsells: list[OfferUpsell] = []
 
+        # Offer upsells which still need to be calculated (when offers were applied with lazy upsells)
+        self._deferred_offer_upsells: DeferredOfferUpsells | None = None
+
     @property
     def unit_effective_price(self) -> Decimal:
         """
@@ -209,6 +297,7 @@ class BluelightBasketLineMixin(AbstractLine):
         Remove any discounts from this line.
         """
         super().clear_discount()
+        notify_consumption()
         self._offer_group_starting_discount = Decimal("0.00")
         self._price_breakdown_stack = []
         self._discount_descriptions = []
@@ -245,7 +334,7 @@ class BluelightBasketLineMixin(AbstractLine):
         self.discounts.discount(discount_value, affected_quantity, incl_tax, offer)
 
         # Push description of discount onto the stack
-        if offer:
+        if offer and self.record_discount_descriptions:
             voucher = offer.get_voucher()
             descr = LineDiscountDescription(
                 amount=discount_value,
@@ -293,13 +382,66 @@ class BluelightBasketLineMixin(AbstractLine):
         self.discounts.finalize_offer_group_applications()
         self._offer_group_starting_discount = Decimal(self.discount_value)
 
+    def get_offer_application_state(self) -> dict[str, Any]:
+        """
+        Get a picklable copy of the discounts applied to this line, for
+        :func:`oscarbluelight.offer.application_cache.capture_offer_application_state`.
+        Doesn't include offer upsells.
+        """
+        return {
+            "discounts": self.discounts.get_state(),  # type: ignore[attr-defined]  # Line.discounts is a BluelightLineDiscountRegistry
+            "offer_group_starting_discount": self._offer_group_starting_discount,
+            "price_breakdown_stack": list(self._price_breakdown_stack),
+            "discount_descriptions": list(self._discount_descriptions),
+        }
+
+    def restore_offer_application_state(
+        self,
+        state: dict[str, Any],
+        offers: Mapping[int, ConditionalOffer],
+    ) -> None:
+        """
+        Restore state previously returned by ``get_offer_application_state``.
+        """
+        self.discounts.set_state(state["discounts"], offers)  # type: ignore[attr-defined]  # Line.discounts is a BluelightLineDiscountRegistry
+        self._offer_group_starting_discount = state["offer_group_starting_discount"]
+        self._price_breakdown_stack = list(state["price_breakdown_stack"])
+        self._discount_descriptions = list(state["discount_descriptions"])
+
+    def get_consumption_snapshot(self) -> ConsumptionSnapshot:
+        """
+        Get an in-memory copy of the line's offer consumption state, for
+        :class:`oscarbluelight.offer.modes.DeferredOfferUpsells`.
+        """
+        return ConsumptionSnapshot(
+            consumption=self.discounts.get_snapshot(),  # type: ignore[attr-defined]  # Line.discounts is a BluelightLineDiscountRegistry
+            offer_group_starting_discount=self._offer_group_starting_discount,
+        )
+
+    def restore_consumption_snapshot(self, snapshot: ConsumptionSnapshot) -> None:
+        """
+        Restore state previously returned by ``get_consumption_snapshot``.
+        """
+        self.discounts.restore_snapshot(snapshot.consumption)  # type: ignore[attr-defined]  # Line.discounts is a BluelightLineDiscountRegistry
+        self._offer_group_starting_discount = snapshot.offer_group_starting_discount
+
     def clear_offer_upsells(self) -> None:
         self._offer_upsells = []
+        self._deferred_offer_upsells = None
 
     def add_offer_upsell(self, offer_upsell: OfferUpsell) -> None:
         self._offer_upsells.append(offer_upsell)
 
+    def defer_offer_upsells(self, deferred: DeferredOfferUpsells | None) -> None:
+        """
+        Calculate the line's offer upsells using the given ``DeferredOfferUpsells`` the next time
+        they're read.
+        """
+        self._deferred_offer_upsells = deferred
+
     def get_offer_upsells(self) -> list[OfferUpsell]:
+        if self._deferred_offer_upsells is not None:
+            self._deferred_offer_upsells.resolve()
         return self._offer_upsells
 
     def get_price_breakdown(self) -> list[LinePriceBreakdownItem]:  # type: ignore[override]  # list invariance prevents covariant NamedTuple→tuple return
@@ -313,11 +455,12 @@ class BluelightBasketLineMixin(AbstractLine):
                 _("A price breakdown can only be determined when taxes are known")
             )
 
-        # Create an array of the pre-discount unit prices with length equal to the line quantity
+        # Describe the pre-discount unit price of each item in the line, as runs of consecutive
+        # items with the same price.
         assert self.unit_price_excl_tax is not None
-        item_prices: list[Decimal] = []
-        for i in range(self.quantity):
-            item_prices.append(self.unit_price_excl_tax)
+        price_runs: list[tuple[Decimal, int]] = []
+        if self.quantity > 0:
+            price_runs.append((self.unit_price_excl_tax, self.quantity))
 
         # Make sure _price_breakdown_stack adequately describes the total discount applied (in-case
         # somehow we applied a benefit but didn't call ``end_offer_group_application``. If it was
@@ -327,24 +470,14 @@ class BluelightBasketLineMixin(AbstractLine):
         # Based on the discounts and affected quantities recorded in the _price_breakdown_stack, decrease each
         # unit price in the line until the full discount amount is exhausted.
         for discount_group in self._price_breakdown_stack:
-            remaining_qty_affected = discount_group.quantity_with_discount
-            iterations = 0
-            while remaining_qty_affected > 0 and iterations <= self.quantity:
-                for i in range(self.quantity):
-                    if item_prices[i] >= discount_group.discount_delta_unit:
-                        item_prices[i] -= discount_group.discount_delta_unit
-                        remaining_qty_affected -= 1
-
-                    if remaining_qty_affected <= 0:
-                        break
-                iterations += 1
-
-        # Remove the duplicate unit prices, resulting in a list of tuples containing a unit price and the quantity at that unit price
-        price_qtys = []
-        for price, _prices in itertools.groupby(sorted(item_prices)):
-            qty = len(list(_prices))
-            price_qty = (price, qty)
-            price_qtys.append(price_qty)
+            price_runs = _discount_price_runs(price_runs, discount_group, self.quantity)
+
+        # Remove the duplicate unit prices, resulting in a list of tuples containing a unit price and the quantity at that
+        # unit price. For equal prices, keep the first item's (since that decides the precision of the tax-inclusive price).
+        qty_by_price: dict[Decimal, int] = {}
+        for price, qty in price_runs:
+            qty_by_price[price] = qty_by_price.get(price, 0) + qty
+        price_qtys = sorted(qty_by_price.items())
 
         # Return a list of (unit_price_incl_tax, unit_price_excl_tax, quantity)
         prices: list[LinePriceBreakdownItem] = []
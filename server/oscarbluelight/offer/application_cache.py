@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING, Any
+import copy
+import hashlib
+
+from ..basket_utils import BluelightLineDiscountRegistry
+from ..mixins import BluelightBasketLineMixin
+from .results import OfferApplications
+from .upsells import CompoundUpsell, SimpleUpsell
+
+if TYPE_CHECKING:
+    from django.contrib.auth.models import AbstractBaseUser, AnonymousUser
+    from oscar.apps.basket.models import Basket
+
+    from .models import ConditionalOffer
+    from .upsells import OfferUpsell
+
+# Bump whenever the structure of the captured state changes, so that old cache entries are ignored.
+STATE_VERSION = 1
+
+
+class _DetachedOffer:
+    """
+    Placeholder for the offer of a cached upsell.
+    """
+
+    def __init__(self, offer_id: int):
+        self.offer_id = offer_id
+
+
+def get_basket_fingerprint(
+    basket: Basket,
+    user: AbstractBaseUser | AnonymousUser | None,
+    offers: Sequence[ConditionalOffer],
+    versions: Sequence[Any] = (),
+) -> str | None:
+    """
+    Get a hash of everything which determines the result of applying the given offers to the
+    basket: the basket lines (products, quantities, and prices), the offers (and the vouchers
+    they came from, and how many more times the basket owner may use them), the user, and the
+    given cache namespace ``versions``.
+
+    Returns ``None`` if the application can't be cached (e.g. because an offer is unsaved, or
+    belongs to a system offer group, whose receivers must run while offers are applied).
+    """
+    offer_parts = []
+    for offer in offers:
+        if offer.pk is None:
+            return None
+        if offer.offer_group is not None and offer.offer_group.is_system_group:
+            return None
+        voucher = offer.get_voucher()
+        offer_parts.append(
+            (
+                offer.pk,
+                voucher.pk if voucher else None,
+                _get_remaining_applications(offer, basket),
+            )
+        )
+    line_parts = []
+    for line in basket.all_lines():
+        price = line.purchase_info.price
+        line_parts.append(
+            (
+                line.line_reference,
+                line.product_id,
+                line.stockrecord_id,
+                line.quantity,
+                price.exists and price.excl_tax,
+                price.exists and price.is_tax_known and price.tax,
+                price.currency,
+            )
+        )
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    parts = (
+        STATE_VERSION,
+        tuple(versions),
+        user_id,
+        tuple(sorted(offer_parts)),
+        tuple(sorted(line_parts)),
+    )
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _get_remaining_applications(
+    offer: ConditionalOffer,
+    basket: Basket,
+) -> int | None:
+    # Per-user, global, and total discount limits depend on usage, which changes as orders are
+    # placed, so include the number of applications still allowed. This is what
+    # ``Applicator._apply_offer_group`` uses to limit the offer.
+    if (
+        offer.max_user_applications
+        or offer.max_global_applications
+        or offer.max_discount
+    ):
+        return offer.get_max_applications(basket.owner)
+    return None
+
+
+def capture_offer_application_state(basket: Basket) -> dict[str, Any] | None:
+    """
+    Get a picklable copy of the offer applications, line discounts, and upsells of a basket which
+    has just had offers applied to it. Offers are replaced by their IDs.
+
+    Returns ``None`` if the basket's lines don't support capturing their state.
+    """
+    lines: dict[str, dict[str, Any]] = {}
+    upsells: list[OfferUpsell] = []
+    upsell_indexes: dict[int, int] = {}
+    for line in basket.all_lines():
+        if not isinstance(line, BluelightBasketLineMixin) or not isinstance(
+            line.discounts, BluelightLineDiscountRegistry
+        ):
+            return None
+        line_upsells: list[int] = []
+        for upsell in line.get_offer_upsells():
+            if id(upsell) not in upsell_indexes:
+                upsell_indexes[id(upsell)] = len(upsells)
+                upsells.append(_detach_upsell(upsell))
+            line_upsells.append(upsell_indexes[id(upsell)])
+        line_state = line.get_offer_application_state()
+        line_state["upsells"] = line_upsells
+        lines[line.line_reference] = line_state
+
+    offer_ids: set[int] = set()
+    applications = []
+    for application in basket.offer_applications:
+        offer_ids.add(application["offer"].pk)
+        application_state = dict(application)
+        application_state["offer"] = application["offer"].pk
+        del application_state["voucher"]
+        applications.append(application_state)
+    for line_state in lines.values():
+        offer_ids.update(line_state["discounts"]["offers"])
+    for upsell in upsells:
+        offer_ids.update(_get_detached_offer_ids(upsell))
+
+    return {
+        "offer_ids": offer_ids,
+        "lines": lines,
+        "upsells": upsells,
+        "applications": applications,
+    }
+
+
+def can_restore_offer_application_state(
+    basket: Basket,
+    offers: Sequence[ConditionalOffer],
+    state: Mapping[str, Any],
+) -> bool:
+    """
+    Check that state captured by ``capture_offer_application_state`` matches the given basket
+    lines and offers.
+    """
+    lines = basket.all_lines()
+    if not all(isinstance(line, BluelightBasketLineMixin) for line in lines):
+        return False
+    if {line.line_reference for line in lines} != state["lines"].keys():
+        return False
+    return state["offer_ids"].issubset(offer.pk for offer in offers)
+
+
+def restore_offer_application_state(
+    basket: Basket,
+    offers: Sequence[ConditionalOffer],
+    state: Mapping[str, Any],
+) -> None:
+    """
+    Restore state previously returned by ``capture_offer_application_state`` onto a basket whose
+    offers haven't been applied yet. Check ``can_restore_offer_application_state`` first.
+    """
+    offers_by_id = {offer.pk: offer for offer in offers}
+    lines = basket.all_lines()
+    upsells = [
+        _attach_upsell(copy.copy(upsell), basket, offers_by_id)
+        for upsell in state["upsells"]
+    ]
+    for line in lines:
+        assert isinstance(line, BluelightBasketLineMixin)
+        line_state = state["lines"][line.line_reference]
+        line.clear_discount()
+        line.restore_offer_application_state(line_state, offers_by_id)
+        line.clear_offer_upsells()
+        for upsell_index in line_state["upsells"]:
+            line.add_offer_upsell(upsells[upsell_index])
+
+    applications = OfferApplications()
+    for application_state in state["applications"]:
+        offer = offers_by_id[application_state["offer"]]
+        application = dict(application_state)
+        application["offer"] = offer
+        application["voucher"] = offer.get_voucher()
+        applications.applications[offer.pk] = application  # type: ignore[assignment]  # rebuilt from a captured OfferApplication
+    basket.offer_applications = applications
+
+
+def _detach_upsell(upsell: OfferUpsell) -> OfferUpsell:
+    detached = copy.copy(upsell)
+    detached.offer = _DetachedOffer(upsell.offer.pk)  # type: ignore[assignment]  # swapped back by _attach_upsell
+    detached.basket = None  # type: ignore[assignment]  # swapped back by _attach_upsell
+    if isinstance(detached, SimpleUpsell):
+        # Don't pickle the range's cached product queryset (which would evaluate it)
+        detached.product_range = copy.copy(detached.product_range)
+        for attr in ("product_queryset", "proxy"):
+            detached.product_range.__dict__.pop(attr, None)
+    if isinstance(detached, CompoundUpsell):
+        detached.subupsells = [_detach_upsell(sub) for sub in detached.subupsells]
+    return detached
+
+
+def _attach_upsell(
+    upsell: OfferUpsell,
+    basket: Basket,
+    offers: Mapping[int, ConditionalOffer],
+) -> OfferUpsell:
+    assert isinstance(upsell.offer, _DetachedOffer)
+    upsell.offer = offers[upsell.offer.offer_id]
+    upsell.basket = basket
+    if isinstance(upsell, CompoundUpsell):
+        upsell.subupsells = [
+            _attach_upsell(copy.copy(sub), basket, offers) for sub in upsell.subupsells
+        ]
+    return upsell
+
+
+def _get_detached_offer_ids(upsell: OfferUpsell) -> set[int]:
+    assert isinstance(upsell.offer, _DetachedOffer)
+    offer_ids = {upsell.offer.offer_id}
+    if isinstance(upsell, CompoundUpsell):
+        for sub in upsell.subupsells:
+            offer_ids |= _get_detached_offer_ids(sub)
+    return offer_ids
@@ -1,44 +1,98 @@
 from __future__ import annotations
 
-from collections.abc import Generator
+from collections.abc import Generator, Iterable, Sequence
 from contextlib import contextmanager
 from decimal import Decimal
+from functools import partial
 from itertools import chain, groupby
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.cache import cache
-from django.db import transaction
 from django.db.models import Q
 from django.utils.timezone import now
-from oscar.apps.offer import results
 from oscar.apps.offer.applicator import Applicator as BaseApplicator
-from oscar.core.loading import get_model
 
-from ..caching import CacheNamespace, FluentCache
+from ..caching import CacheNamespace, CacheNamespaceFamily, FluentCache, SingleFlight
 from ..mixins import BluelightBasketLineMixin
-from .models import ConditionalOffer
+from ..simulation import SimulatedBasket
+from .application_cache import (
+    can_restore_offer_application_state,
+    capture_offer_application_state,
+    get_basket_fingerprint,
+    restore_offer_application_state,
+)
+from .catalog import copy_offer, get_offer_catalog
+from .context import (
+    ApplicationContext,
+    get_application_context,
+    use_application_context,
+)
+from .instrumentation import OfferApplicationRecorder, get_offer_application_recorder
+from .membership import RangeMembershipSnapshot, use_range_membership
+from .models import Benefit, Condition, ConditionalOffer, OfferGroup, Range
+from .modes import (
+    FULL_APPLICATION,
+    LEAN_APPLICATION,
+    ApplicationMode,
+    DeferredOfferUpsells,
+    UpsellMode,
+)
+from .multi_application import (
+    RepeatedApplicationProbe,
+    is_multi_application_enabled,
+)
+from .results import OfferApplications
 from .signals import (
     post_offer_group_apply,
     post_offers_apply,
     pre_offer_group_apply,
     pre_offers_apply,
 )
+from .upsells import OfferUpsell, UpsellRelevance
 
 if TYPE_CHECKING:
+    from django.contrib.auth.models import Group
     from django.db.models.query import QuerySet
+    from django.http import HttpRequest
     from oscar.apps.basket.models import Basket
     from oscar.apps.catalogue.models import Product
     from oscar.apps.partner.strategy import Base as BaseStrategy
 
+    from ..voucher.models import Voucher
+
 
-pricing_cache_ns = CacheNamespace(cache, "oscarbluelight.pricing")
+pricing_cache_ns = CacheNamespace(
+    cache,
+    "oscarbluelight.pricing",
+    grace_period=getattr(settings, "BLUELIGHT_PRICING_CACHE_NS_GRACE_PERIOD", 300),
+)
+# Per-product namespaces, for changes (stock records, range membership, etc.) which can only affect
+# the prices of specific products.
+product_pricing_ns = CacheNamespaceFamily(
+    cache,
+    "oscarbluelight.pricing.product",
+    grace_period=getattr(settings, "BLUELIGHT_PRICING_CACHE_NS_GRACE_PERIOD", 300),
+)
 cosmetic_price_cache = (
     FluentCache(cache, "oscarbluelight.applicator.cosmetic_price")
     .timeout(getattr(settings, "BLUELIGHT_COSMETIC_PRICE_CACHE_TTL", 86400))
     .namespaces(pricing_cache_ns)
+    .namespace_families(product=product_pricing_ns)
     .key_parts("product", "quantity")
+    .single_flight(
+        SingleFlight()
+        if getattr(settings, "BLUELIGHT_COSMETIC_PRICE_SINGLE_FLIGHT", False)
+        else None
+    )
+)
+basket_application_cache = (
+    FluentCache(cache, "oscarbluelight.applicator.basket_application")
+    .timeout(getattr(settings, "BLUELIGHT_BASKET_APPLICATION_CACHE_TTL", 300))
+    .namespaces(pricing_cache_ns)
+    .key_parts("fingerprint")
 )
 
 
@@ -65,8 +119,28 @@ def group_offers(offers: list[ConditionalOffer]) -> groupby[int, ConditionalOffe
     return groupby(offers, key=get_offer_group_priority)
 
 
+def get_offer_ranges(offers: Iterable[ConditionalOffer]) -> list[Range]:
+    """
+    Get every range used by the given offers' conditions and benefits, including the ranges of
+    any compound condition / benefit children.
+    """
+    ranges: dict[int, Range] = {}
+    pending: list[Condition | Benefit] = []
+    for offer in offers:
+        pending += [offer.condition.proxy(), offer.benefit.proxy()]
+    while pending:
+        obj = pending.pop()
+        if obj.range_id is not None and obj.range is not None:
+            ranges[obj.range.pk] = obj.range
+        pending += [child.proxy() for child in getattr(obj, "children", [])]
+    return list(ranges.values())
+
+
 class Applicator(BaseApplicator):
     _is_applying_cosmetic_prices = False
+    _application_mode: ApplicationMode = FULL_APPLICATION
+    # In-memory basket used to calculate cosmetic prices
+    simulated_basket_class: type[SimulatedBasket] = SimulatedBasket
     _offer_select_related_fields = [
         "offer_group",
         "benefit",
@@ -75,7 +149,202 @@ class Applicator(BaseApplicator):
         "condition__range",
     ]
 
-    def get_site_offers(self) -> QuerySet[ConditionalOffer]:
+    def apply(
+        self,
+        basket: Basket,
+        user: User | None = None,
+        request: HttpRequest | None = None,
+    ) -> None:
+        """
+        Apply all relevant offers to the given basket.
+
+        When the basket application cache is enabled, the result of applying offers to a basket
+        is cached, keyed by a fingerprint of the basket's contents and offers. Applying offers to
+        an identical basket then restores the cached discounts, offer applications, and upsells
+        instead of recalculating them.
+        """
+        offers = self.get_offers(basket, user, request)
+        self._apply(basket, user, offers)
+
+    async def aapply(
+        self,
+        basket: Basket,
+        user: User | None = None,
+        request: HttpRequest | None = None,
+    ) -> None:
+        """
+        Async version of :meth:`apply`, for ASGI deployments.
+
+        The basket's lines, the site, voucher, and user offers, and the range membership of the
+        basket's products are loaded first, without blocking the event loop. Offers are then
+        applied to the basket in a single ``sync_to_async`` call, with range membership answered
+        from memory.
+        """
+        lines = await sync_to_async(lambda: list(basket.all_lines()))()
+        offers = await self.aget_offers(basket, user, request)
+        products = [line.product for line in lines if line.product is not None]
+        ranges = await sync_to_async(get_offer_ranges)(offers)
+        membership = await Range.acontains_products_bulk(products, ranges)
+        snapshot = RangeMembershipSnapshot(
+            range_ids=(rng.pk for rng in ranges),
+            product_ids=(product.pk for product in products),
+            membership=membership,
+        )
+
+        def _apply() -> None:
+            with use_range_membership(snapshot):
+                self._apply(basket, user, offers)
+
+        await sync_to_async(_apply)()
+
+    def _apply(
+        self,
+        basket: Basket,
+        user: User | None,
+        offers: list[ConditionalOffer],
+    ) -> None:
+        if (
+            not getattr(settings, "BLUELIGHT_BASKET_APPLICATION_CACHE_ENABLED", False)
+            # Cached states always include the upsells and discount descriptions
+            or self._application_mode != FULL_APPLICATION
+        ):
+            self.apply_offers(basket, offers)
+            return
+        fingerprint = self.get_basket_fingerprint(basket, user, offers)
+        if fingerprint is None:
+            self.apply_offers(basket, offers)
+            return
+        concrete = basket_application_cache.concrete(fingerprint=fingerprint)
+        state = concrete.get()
+        if state is not None and self.restore_offer_applications(basket, offers, state):
+            return
+        self.apply_offers(basket, offers)
+        state = capture_offer_application_state(basket)
+        if state is not None:
+            concrete.set(state)
+
+    def get_basket_fingerprint(
+        self,
+        basket: Basket,
+        user: User | None,
+        offers: list[ConditionalOffer],
+    ) -> str | None:
+        product_ids = [line.product_id for line in basket.all_lines()]
+        product_versions = product_pricing_ns.get_values(product_ids)
+        return get_basket_fingerprint(
+            basket,
+            user,
+            offers,
+            versions=sorted(product_versions.items()),
+        )
+
+    def restore_offer_applications(
+        self,
+        basket: Basket,
+        offers: list[ConditionalOffer],
+        state: dict[str, Any],
+    ) -> bool:
+        """
+        Restore a cached offer application onto the basket. Sends the same ``pre_offers_apply``
+        and ``post_offers_apply`` signals as ``apply_offers``. The per-group signals aren't sent,
+        so applications involving system offer groups (whose receivers rely on them) are never
+        cached.
+        """
+        if not can_restore_offer_application_state(basket, offers, state):
+            return False
+        pre_offers_apply.send(sender=self.__class__, basket=basket, offers=offers)
+        restore_offer_application_state(basket, offers, state)
+        post_offers_apply.send(sender=self.__class__, basket=basket, offers=offers)
+        return True
+
+    def get_offers(
+        self,
+        basket: Basket,
+        user: User | None = None,
+        request: HttpRequest | None = None,
+    ) -> list[ConditionalOffer]:
+        site_offers = self.get_site_offers_for_basket(basket)
+        basket_offers = self.get_basket_offers(basket, user)
+        user_offers = self.get_user_offers(user)
+        session_offers = self.get_session_offers(request)
+        return sorted(
+            chain(session_offers, basket_offers, user_offers, site_offers),
+            key=lambda o: o.priority,
+            reverse=True,
+        )
+
+    async def aget_offers(
+        self,
+        basket: Basket,
+        user: User | None = None,
+        request: HttpRequest | None = None,
+    ) -> list[ConditionalOffer]:
+        """
+        Async version of :meth:`get_offers`.
+        """
+        site_offers = await self.aget_site_offers_for_basket(basket)
+        basket_offers = await self.aget_basket_offers(basket, user)
+        user_offers = await self.aget_user_offers(user)
+        session_offers = await self.aget_session_offers(request)
+        return sorted(
+            chain(session_offers, basket_offers, user_offers, site_offers),
+            key=lambda o: o.priority,
+            reverse=True,
+        )
+
+    def get_site_offers_for_basket(
+        self,
+        basket: Basket,
+    ) -> QuerySet[ConditionalOffer] | list[ConditionalOffer]:
+        """
+        Return the site offers which could apply to the given basket.
+
+        When offer prefiltering is enabled, this skips any offer whose condition
+        ranges don't contain any of the basket's products. Otherwise, it returns
+        every site offer.
+        """
+        if (
+            getattr(settings, "BLUELIGHT_OFFER_PREFILTER_ENABLED", False)
+            and getattr(settings, "BLUELIGHT_OFFER_CATALOG_ENABLED", False)
+            # Cosmetic pricing loads offers once and shares them between products
+            and not self._is_applying_cosmetic_prices
+        ):
+            product_ids = {line.product_id for line in basket.all_lines()}
+            return get_offer_catalog().get_candidate_offers(product_ids)
+        return self.get_site_offers()
+
+    async def aget_site_offers_for_basket(
+        self,
+        basket: Basket,
+    ) -> list[ConditionalOffer]:
+        """
+        Async version of :meth:`get_site_offers_for_basket`.
+        """
+        if (
+            getattr(settings, "BLUELIGHT_OFFER_PREFILTER_ENABLED", False)
+            and getattr(settings, "BLUELIGHT_OFFER_CATALOG_ENABLED", False)
+            and not self._is_applying_cosmetic_prices
+        ):
+            return list(await sync_to_async(self.get_site_offers_for_basket)(basket))
+        return await self.aget_site_offers()
+
+    def get_site_offers(self) -> QuerySet[ConditionalOffer] | list[ConditionalOffer]:
+        # When enabled, serve site offers from the per-process offer catalog
+        # instead of querying for them on every application.
+        if getattr(settings, "BLUELIGHT_OFFER_CATALOG_ENABLED", False):
+            return get_offer_catalog().get_offers()
+        return self._get_site_offers_queryset()
+
+    async def aget_site_offers(self) -> list[ConditionalOffer]:
+        """
+        Async version of :meth:`get_site_offers`.
+        """
+        if getattr(settings, "BLUELIGHT_OFFER_CATALOG_ENABLED", False):
+            # The catalog is usually already built, but (re)building it is synchronous
+            return list(await sync_to_async(self.get_site_offers)())
+        return [offer async for offer in self._get_site_offers_queryset()]
+
+    def _get_site_offers_queryset(self) -> QuerySet[ConditionalOffer]:
         qs = ConditionalOffer.active.filter(offer_type=ConditionalOffer.SITE)
         return qs.select_related(*self._offer_select_related_fields)
 
@@ -84,23 +353,62 @@ class Applicator(BaseApplicator):
         basket: Basket,
         user: User | None,
     ) -> list[ConditionalOffer]:
-        offers: list[ConditionalOffer] = []
         if not basket.pk or not user:
-            return offers
+            return []
+        vouchers = self._get_basket_vouchers(basket, user)
+        return self._get_available_voucher_offers(vouchers, user)
 
+    async def aget_basket_offers(
+        self,
+        basket: Basket,
+        user: User | None,
+    ) -> list[ConditionalOffer]:
+        """
+        Async version of :meth:`get_basket_offers`. The vouchers (and their offers) are loaded
+        through the async ORM. Voucher availability rules may be customized (and could therefore
+        query the database), so they're checked synchronously.
+        """
+        if not basket.pk or not user:
+            return []
+        vouchers = [
+            voucher async for voucher in self._get_basket_vouchers(basket, user)
+        ]
+        return await sync_to_async(self._get_available_voucher_offers)(vouchers, user)
+
+    def _get_basket_vouchers(
+        self,
+        basket: Basket,
+        user: User,
+    ) -> QuerySet[Voucher]:
         # Ordering by PK / Distinct is necessary here to avoid selecting
         # duplicate rows when a voucher has more than one offer associated with
-        # it.
-        vouchers = basket.vouchers.all().order_by("pk").distinct()
-        for voucher in vouchers.all():
+        # it. The availability data (and offers) of every voucher are fetched
+        # up-front, so that stacked vouchers don't cost extra queries each.
+        return (
+            basket.vouchers.all()
+            .order_by("pk")
+            .distinct()
+            .with_availability_data(
+                user,
+                offers_queryset=ConditionalOffer.objects.select_related(
+                    *self._offer_select_related_fields
+                ),
+            )
+        )
+
+    def _get_available_voucher_offers(
+        self,
+        vouchers: Iterable[Voucher],
+        user: User,
+    ) -> list[ConditionalOffer]:
+        offers: list[ConditionalOffer] = []
+        for voucher in vouchers:
             available_to_user, __ = voucher.is_available_to_user(user=user)
             if voucher.is_active() and available_to_user:
-                basket_offers = voucher.offers.select_related(
-                    *self._offer_select_related_fields
-                ).all()
+                basket_offers = list(voucher.offers.all())
                 for offer in basket_offers:
                     offer.set_voucher(voucher)
-                offers = list(chain(offers, basket_offers))
+                offers.extend(basket_offers)
         return offers
 
     def get_user_offers(self, user: User | None) -> QuerySet[ConditionalOffer]:
@@ -109,15 +417,28 @@ class Applicator(BaseApplicator):
         """
         if not user or user.is_anonymous:
             return ConditionalOffer.objects.none()
+        groups = [g for g in user.groups.all()]
+        return self._get_user_offers_queryset(groups)
+
+    async def aget_user_offers(self, user: User | None) -> list[ConditionalOffer]:
+        """
+        Async version of :meth:`get_user_offers`.
+        """
+        if not user or user.is_anonymous:
+            return []
+        groups = [g async for g in user.groups.all()]
+        return [offer async for offer in self._get_user_offers_queryset(groups)]
 
+    def _get_user_offers_queryset(
+        self,
+        groups: list[Group],
+    ) -> QuerySet[ConditionalOffer]:
         cutoff = now()
         date_based = Q(
             Q(start_datetime__lte=cutoff),
             Q(end_datetime__gte=cutoff) | Q(end_datetime=None),
         )
         nondate_based = Q(start_datetime=None, end_datetime=None)
-        groups = [g for g in user.groups.all()]
-
         qs = ConditionalOffer.objects.filter(
             date_based | nondate_based,
             offer_type=ConditionalOffer.USER,
@@ -128,10 +449,19 @@ class Applicator(BaseApplicator):
 
     def get_session_offers(
         self,
-        request: list[ConditionalOffer] | None,
+        request: HttpRequest | None,
     ) -> list[ConditionalOffer]:
         return []
 
+    async def aget_session_offers(
+        self,
+        request: HttpRequest | None,
+    ) -> list[ConditionalOffer]:
+        """
+        Async version of :meth:`get_session_offers`.
+        """
+        return await sync_to_async(self.get_session_offers)(request)
+
     def apply_offers(
         self,
         basket: Basket,
@@ -146,83 +476,201 @@ class Applicator(BaseApplicator):
         reset for each group. This makes it possible to apply multiple offers to a single line item.
         """
         pre_offers_apply.send(sender=self.__class__, basket=basket, offers=offers)
-        applications = results.OfferApplications()
+        applications = OfferApplications()
 
         # Reset any upsells that might already exist (e.g. if we've already
         # applied offers to this basket).
         basket.clear_offer_upsells()
 
+        mode = self._application_mode
+        bluelight_lines = [
+            line
+            for line in basket.all_lines()
+            if isinstance(line, BluelightBasketLineMixin)
+        ]
+        for line in bluelight_lines:
+            line.record_discount_descriptions = mode.discount_descriptions
+        deferred_upsells = (
+            DeferredOfferUpsells(basket, bluelight_lines)
+            if mode.upsells == UpsellMode.LAZY
+            else None
+        )
+
         # If this is a cosmetic application, filter out offers that shouldn't apply.
         if self._is_applying_cosmetic_prices:
             offers = [offer for offer in offers if offer.affects_cosmetic_pricing]
 
-        for group_priority, iter_offers_in_group in group_offers(offers):
-            # Get the OfferGroup object from the list of offers
-            offers_in_group = list(iter_offers_in_group)
-            group = offers_in_group[0].offer_group if len(offers_in_group) > 0 else None
-
-            # Signal the lines that we're about to start applying an offer group
-            pre_offer_group_apply.send(
-                sender=self.__class__,
-                basket=basket,
-                group=group,
-                offers=offers_in_group,
-            )
+        # Record timing / query stats for the configured instrumentation collector
+        recorder = get_offer_application_recorder(
+            basket, is_cosmetic=self._is_applying_cosmetic_prices
+        )
+        # Resolve which lines each upsell is relevant to in bulk, for every offer group at once
+        upsell_relevance = UpsellRelevance(
+            (line.product for line in bluelight_lines if line.product),
+            partial(get_offer_ranges, offers),
+        )
+        # Memoize range matches, unit prices, etc. for this application only
+        with recorder.record(), use_application_context(ApplicationContext()):
+            for group_priority, iter_offers_in_group in group_offers(offers):
+                # Get the OfferGroup object from the list of offers
+                offers_in_group = list(iter_offers_in_group)
+                group = (
+                    offers_in_group[0].offer_group if len(offers_in_group) > 0 else None
+                )
+                with recorder.record_group(group, group_priority):
+                    self._apply_offer_group(
+                        basket,
+                        group,
+                        offers_in_group,
+                        applications,
+                        recorder,
+                        deferred_upsells=deferred_upsells,
+                        upsell_relevance=upsell_relevance,
+                    )
+
+            # Signal the lines that we've finished applying all offer groups
             for line in basket.all_lines():
                 if isinstance(line, BluelightBasketLineMixin):
-                    line.begin_offer_group_application()
+                    line.finalize_offer_group_applications()
+
+        # Store this list of discounts with the basket so it can be rendered in templates
+        basket.offer_applications = applications
+        post_offers_apply.send(sender=self.__class__, basket=basket, offers=offers)
 
-            # Apply each offer in the group
-            for offer in offers_in_group:
+    def _apply_offer_group(
+        self,
+        basket: Basket,
+        group: OfferGroup | None,
+        offers_in_group: list[ConditionalOffer],
+        applications: OfferApplications,
+        recorder: OfferApplicationRecorder,
+        deferred_upsells: DeferredOfferUpsells | None = None,
+        upsell_relevance: UpsellRelevance | None = None,
+    ) -> None:
+        # Signal the lines that we're about to start applying an offer group
+        pre_offer_group_apply.send(
+            sender=self.__class__,
+            basket=basket,
+            group=group,
+            offers=offers_in_group,
+        )
+        for line in basket.all_lines():
+            if isinstance(line, BluelightBasketLineMixin):
+                line.begin_offer_group_application()
+        context = get_application_context()
+        if context is not None:
+            context.begin_offer_group_application()
+
+        # Apply each offer in the group
+        upsells: list[OfferUpsell] = []
+        for offer in offers_in_group:
+            with recorder.record_offer(offer) as offer_stats:
                 num_applications = 0
                 # Keep applying the offer until either
                 # (a) We reach the max number of applications for the offer.
                 # (b) The benefit can't be applied successfully.
                 max_applications = offer.get_max_applications(basket.owner)
+                # When possible, repeat the first application in a single step instead of
+                # re-evaluating the offer for each application.
+                probe = (
+                    RepeatedApplicationProbe.create(offer, basket)
+                    if max_applications > 1 and is_multi_application_enabled()
+                    else None
+                )
                 while num_applications < max_applications:
                     result = offer.apply_benefit(basket)
                     num_applications += 1
+                    offer_stats.num_iterations += 1
                     if not result.is_successful:
                         break
                     applications.add(offer, result)
                     if result.is_final:
                         break
+                    if probe is not None:
+                        num_repeats = probe.repeat(max_applications - num_applications)
+                        if num_repeats > 0:
+                            applications.add(offer, result, freq=num_repeats)
+                            num_applications += num_repeats
+                        probe = None
 
                 # Pre-compute upsell messages before closing out the offer
                 # group. Otherwise, the only visible upsells will be related to
                 # the last applied offer group.
-                is_fully_satisfied = offer.is_condition_satisfied(basket)
-                is_partially_satisfied = offer.is_condition_partially_satisfied(basket)
+                if deferred_upsells is not None:
+                    deferred_upsells.add_offer(offer)
+                    continue
+                if self._application_mode.upsells == UpsellMode.OFF:
+                    continue
+                is_fully_satisfied = recorder.time_call(
+                    offer_stats,
+                    "is_condition_satisfied_ns",
+                    offer.is_condition_satisfied,
+                    basket,
+                )
+                is_partially_satisfied = recorder.time_call(
+                    offer_stats,
+                    "is_condition_partially_satisfied_ns",
+                    offer.is_condition_partially_satisfied,
+                    basket,
+                )
                 if not is_fully_satisfied and is_partially_satisfied:
-                    upsell = offer.get_upsell_details(basket)
+                    upsell = recorder.time_call(
+                        offer_stats,
+                        "get_upsell_details_ns",
+                        offer.get_upsell_details,
+                        basket,
+                    )
                     if upsell:
-                        basket.add_offer_upsell(upsell)
+                        upsells.append(upsell)
 
-            # Signal the lines that we've finished applying an offer group
-            for line in basket.all_lines():
-                if isinstance(line, BluelightBasketLineMixin):
-                    line.end_offer_group_application()
-            post_offer_group_apply.send(
-                sender=self.__class__,
-                basket=basket,
-                group=group,
-                offers=offers_in_group,
-            )
+        # Attach the group's upsells to the relevant lines all at once
+        if upsells:
+            basket.add_offer_upsells(upsells, upsell_relevance)
 
-        # Signal the lines that we've finished applying all offer groups
+        # Signal the lines that we've finished applying an offer group
         for line in basket.all_lines():
             if isinstance(line, BluelightBasketLineMixin):
-                line.finalize_offer_group_applications()
+                line.end_offer_group_application()
+        post_offer_group_apply.send(
+            sender=self.__class__,
+            basket=basket,
+            group=group,
+            offers=offers_in_group,
+        )
 
-        # Store this list of discounts with the basket so it can be rendered in templates
-        basket.offer_applications = applications
-        post_offers_apply.send(sender=self.__class__, basket=basket, offers=offers)
+    @contextmanager
+    def application_mode(
+        self,
+        mode: ApplicationMode = LEAN_APPLICATION,
+    ) -> Generator[ApplicationMode]:
+        """
+        Apply offers using the given :class:`ApplicationMode <oscarbluelight.offer.modes.ApplicationMode>`
+        within the context, e.g. to skip calculating upsells and discount descriptions when only
+        the resulting prices matter::
+
+            with applicator.application_mode(LEAN_APPLICATION):
+                applicator.apply(basket, user, request)
+
+        The discounts and offer applications are the same in every mode.
+        """
+        previous = self._application_mode
+        self._application_mode = mode
+        try:
+            yield mode
+        finally:
+            self._application_mode = previous
 
     @contextmanager
     def _cosmetic_pricing(self) -> Generator[None]:
+        mode = (
+            LEAN_APPLICATION
+            if getattr(settings, "BLUELIGHT_COSMETIC_PRICING_LEAN_APPLICATION", False)
+            else self._application_mode
+        )
         self._is_applying_cosmetic_prices = True
         try:
-            yield
+            with self.application_mode(mode):
+                yield
         finally:
             self._is_applying_cosmetic_prices = False
 
@@ -232,38 +680,90 @@ class Applicator(BaseApplicator):
         product: Product,
         quantity: int = 1,
     ) -> Decimal:
-        price_cache = cosmetic_price_cache.concrete(
-            product=product.pk, quantity=quantity
+        prices = self.get_cosmetic_prices(strategy, [product], quantity=quantity)
+        return prices[product.pk]
+
+    def get_cosmetic_prices(
+        self,
+        strategy: BaseStrategy,
+        products: Iterable[Product],
+        quantity: int = 1,
+    ) -> dict[int, Decimal]:
+        """
+        Get the cosmetic unit price (excluding tax) of each of the given products
+
+        Returns a dictionary mapping product ID to price. Cached prices are fetched in a single
+        cache round trip. Any cache misses are then calculated together (sharing one set of
+        offers and one set of range membership data) and written back to the cache in one go.
+        """
+        products_by_id = {product.pk: product for product in products}
+
+        def _calculate(product_ids: list[int]) -> dict[int, Decimal]:
+            misses = [products_by_id[product_id] for product_id in product_ids]
+            return self._calculate_cosmetic_prices(strategy, misses, quantity)
+
+        return cosmetic_price_cache.get_many_or_set(
+            {
+                product_id: {"product": product_id, "quantity": quantity}
+                for product_id in products_by_id
+            },
+            _calculate,
         )
 
-        def _inner() -> Decimal:
-            BasketModel: type[Basket] = get_model("basket", "Basket")
-            # Calculate the price by simulating adding the product to the basket and comparing
-            # the basket's total price before and after the new line item
-            total_excl_tax_before: Decimal | None = None
-            total_excl_tax_after: Decimal | None = None
-            try:
-                with transaction.atomic():
-                    with self._cosmetic_pricing():
-                        basket = BasketModel()
-                        basket.strategy = strategy
-                        # Capture the total_excl_tax before altering the basket line
-                        total_excl_tax_before = basket.total_excl_tax
-                        # Add the product to the basket and re-apply offers and coupons.
-                        basket.add_product(product, quantity=quantity)
-                        self.apply(basket)
-                        # Get the price difference
-                        total_excl_tax_after = basket.total_excl_tax
-                    # Intentionally rollback the transaction to that the line item isn't actually saved
-                    raise RuntimeError("rollback")
-            except RuntimeError:
-                pass
-            # Use the before/after price difference to calculate the unit price for the product
-            if total_excl_tax_after is None or total_excl_tax_before is None:
-                raise ValueError("Failed to get cosmetic price")
-            unit_cosmetic_excl_tax = (
-                total_excl_tax_after - total_excl_tax_before
-            ) / quantity
-            return unit_cosmetic_excl_tax
-
-        return price_cache.get_or_set(_inner)
+    def _calculate_cosmetic_prices(
+        self,
+        strategy: BaseStrategy,
+        products: Sequence[Product],
+        quantity: int,
+    ) -> dict[int, Decimal]:
+        prices: dict[int, Decimal] = {}
+        with self._cosmetic_pricing():
+            # Load the offers (and the membership of the products in the offers' ranges) once, and
+            # share them between all of the products.
+            offers = [
+                offer
+                for offer in self.get_offers(
+                    self.simulated_basket_class(strategy),  # type: ignore[arg-type]  # duck-typed stand-in for Basket
+                    None,
+                    None,
+                )
+                if offer.affects_cosmetic_pricing
+            ]
+            ranges = get_offer_ranges(offers)
+            membership = Range.contains_products_bulk(products, ranges)
+            snapshot = RangeMembershipSnapshot(
+                range_ids=(rng.pk for rng in ranges),
+                product_ids=(product.pk for product in products),
+                membership=membership,
+            )
+            with use_range_membership(snapshot):
+                for product in products:
+                    prices[product.pk] = self._calculate_cosmetic_price(
+                        strategy, product, quantity, offers
+                    )
+        return prices
+
+    def _calculate_cosmetic_price(
+        self,
+        strategy: BaseStrategy,
+        product: Product,
+        quantity: int,
+        offers: Sequence[ConditionalOffer],
+    ) -> Decimal:
+        # Calculate the price by simulating adding the product to an in-memory basket and
+        # comparing the basket's total price before and after the new line item
+        basket = self.simulated_basket_class(strategy)
+        # Capture the total_excl_tax before altering the basket line
+        total_excl_tax_before: Decimal = basket.total_excl_tax
+        # Add the product to the basket and re-apply offers and coupons.
+        basket.add_product(product, quantity=quantity)
+        self.apply_offers(
+            basket,  # type: ignore[arg-type]  # duck-typed stand-in for Basket
+            [copy_offer(offer) for offer in offers],
+        )
+        # Use the before/after price difference to calculate the unit price for the product
+        total_excl_tax_after: Decimal = basket.total_excl_tax
+        unit_cosmetic_excl_tax = (
+            total_excl_tax_after - total_excl_tax_before
+        ) / quantity
+        return unit_cosmetic_excl_tax
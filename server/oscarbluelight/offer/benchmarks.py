@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Generator, Iterable, Sequence
+from contextlib import contextmanager
+from decimal import Decimal
+from importlib import metadata
+from typing import TYPE_CHECKING, Any, NamedTuple, TypedDict
+import itertools
+import logging
+import platform
+import random
+import statistics
+import time
+import uuid
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from oscar.core.loading import get_class, get_model
+import django
+
+from .applicator import Applicator, pricing_cache_ns
+from .catalog import clear_offer_catalog
+from .constants import Conjunction
+from .membership import clear_range_membership_cache
+from .models import (
+    Benefit,
+    CompoundCondition,
+    Condition,
+    ConditionalOffer,
+    OfferGroup,
+    Range,
+    RangeProductSet,
+)
+
+if TYPE_CHECKING:
+    from django.core.cache.backends.base import BaseCache
+    from oscar.apps.basket.models import Basket
+    from oscar.apps.catalogue.models import Product
+    from oscar.apps.partner.strategy import Base as BaseStrategy
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the structure of the results document changes
+RESULTS_FORMAT_VERSION = 1
+
+BENEFIT_PROXY_CLASSES: Sequence[tuple[str, Decimal]] = (
+    ("oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit", Decimal(10)),
+    ("oscarbluelight.offer.benefits.BluelightAbsoluteDiscountBenefit", Decimal("1.00")),
+    ("oscarbluelight.offer.benefits.BluelightMultibuyDiscountBenefit", Decimal(0)),
+)
+CONDITION_PROXY_CLASSES: Sequence[tuple[str, Decimal]] = (
+    ("oscarbluelight.offer.conditions.BluelightCountCondition", Decimal(2)),
+    ("oscarbluelight.offer.conditions.BluelightCoverageCondition", Decimal(2)),
+    ("oscarbluelight.offer.conditions.BluelightValueCondition", Decimal("20.00")),
+)
+
+
+class BenchmarkScenario(NamedTuple):
+    """
+    One point of the benchmark matrix.
+    """
+
+    #: Number of basket lines (each for a distinct product)
+    num_lines: int
+    #: Number of site offers
+    num_offers: int
+    #: Number of offer groups the offers are spread across
+    num_groups: int
+    #: Depth of each offer's condition tree. ``0`` is a plain condition; each level above that
+    #: is a compound condition of two sub-conditions.
+    condition_depth: int
+    #: Quantity of each basket line
+    line_quantity: int = 1
+
+
+class TimingStats(TypedDict):
+    runs: int
+    min_ms: float
+    median_ms: float
+    mean_ms: float
+    max_ms: float
+    num_queries: int
+
+
+class ScenarioResult(TypedDict):
+    scenario: dict[str, int]
+    apply_offers: TimingStats
+    get_cosmetic_price: TimingStats
+    get_price_breakdown: TimingStats
+
+
+class BenchmarkResults(TypedDict):
+    format_version: int
+    created_at: str
+    environment: dict[str, str]
+    options: dict[str, Any]
+    results: list[ScenarioResult]
+
+
+def get_scenarios(
+    num_lines: Iterable[int],
+    num_offers: Iterable[int],
+    num_groups: Iterable[int],
+    condition_depths: Iterable[int],
+    line_quantity: int = 1,
+) -> list[BenchmarkScenario]:
+    """
+    Build the full matrix of scenarios from the given dimensions.
+    """
+    return [
+        BenchmarkScenario(lines, offers, groups, depth, line_quantity)
+        for lines, offers, groups, depth in itertools.product(
+            num_lines, num_offers, num_groups, condition_depths
+        )
+    ]
+
+
+class SyntheticCatalog:
+    """
+    Synthetic products, ranges, offer groups, and site offers for a single benchmark scenario.
+
+    Everything is written to the database, so this should be built inside a transaction which
+    gets rolled back afterwards (see :func:`run_scenario`).
+    """
+
+    def __init__(
+        self,
+        scenario: BenchmarkScenario,
+        seed: int = 0,
+        num_ranges: int = 10,
+    ):
+        self.scenario = scenario
+        self.rand = random.Random(seed)
+        self.num_ranges = max(1, num_ranges)
+        self.products: list[Product] = []
+        self.ranges: list[Range] = []
+        self.offer_groups: list[OfferGroup] = []
+        self.offers: list[ConditionalOffer] = []
+
+    def build(self) -> None:
+        self._build_products()
+        self._build_ranges()
+        self._build_offer_groups()
+        for i in range(self.scenario.num_offers):
+            self.offers.append(self._build_offer(i))
+        # Range saves queue a refresh of the view (and offer saves an invalidation of the pricing
+        # cache) on commit, which never comes.
+        RangeProductSet.refresh()
+        pricing_cache_ns.invalidate()
+
+    def build_basket(self, strategy: BaseStrategy) -> Basket:
+        BasketModel: type[Basket] = get_model("basket", "Basket")
+        basket = BasketModel.objects.create()
+        basket.strategy = strategy
+        for product in self.products:
+            basket.add_product(product, quantity=self.scenario.line_quantity)
+        return basket
+
+    def _build_products(self) -> None:
+        ProductClass = get_model("catalogue", "ProductClass")
+        ProductModel = get_model("catalogue", "Product")
+        Partner = get_model("partner", "Partner")
+        StockRecord = get_model("partner", "StockRecord")
+        product_class = ProductClass.objects.create(
+            name="Bluelight Benchmark", requires_shipping=False, track_stock=False
+        )
+        partner = Partner.objects.create(name="Bluelight Benchmark")
+        # Always create at least one product, so that there's something to get a cosmetic price for
+        self.products = ProductModel.objects.bulk_create(
+            [
+                ProductModel(
+                    title=f"Benchmark Product {i}",
+                    structure=ProductModel.STANDALONE,
+                    product_class=product_class,
+                )
+                for i in range(max(1, self.scenario.num_lines))
+            ]
+        )
+        StockRecord.objects.bulk_create(
+            [
+                StockRecord(
+                    product=product,
+                    partner=partner,
+                    partner_sku=f"bluelight-benchmark-{product.pk}",
+                    price=Decimal(self.rand.randint(100, 10000)) / 100,
+                    num_in_stock=self.scenario.line_quantity * 1000,
+                )
+                for product in self.products
+            ]
+        )
+
+    def _build_ranges(self) -> None:
+        self.ranges = [
+            Range.objects.create(name="Benchmark: All", includes_all_products=True)
+        ]
+        RangeProduct = Range.included_products.through
+        range_products = []
+        for i in range(self.num_ranges):
+            rng = Range.objects.create(name=f"Benchmark: Range {i}")
+            self.ranges.append(rng)
+            sample_size = max(1, len(self.products) // 2)
+            for product in self.rand.sample(self.products, sample_size):
+                range_products.append(RangeProduct(range=rng, product=product))
+        RangeProduct.objects.bulk_create(range_products)
+
+    def _build_offer_groups(self) -> None:
+        # Offer group priorities are unique, so start above any existing group
+        max_priority = OfferGroup.objects.aggregate(Max("priority"))["priority__max"]
+        start = (max_priority or 0) + 1
+        self.offer_groups = [
+            OfferGroup.objects.create(
+                name=f"Benchmark Group {i}",
+                priority=start + i,
+            )
+            for i in range(max(1, self.scenario.num_groups))
+        ]
+
+    def _build_condition(self, depth: int) -> Condition:
+        if depth <= 0:
+            proxy_class, value = self.rand.choice(CONDITION_PROXY_CLASSES)
+            return Condition.objects.create(
+                proxy_class=proxy_class,
+                value=value,
+                range=self.rand.choice(self.ranges),
+            )
+        compound = CompoundCondition.objects.create(
+            conjunction=self.rand.choice((Conjunction.AND, Conjunction.OR)),
+        )
+        compound.subconditions.set(
+            [self._build_condition(depth - 1), self._build_condition(depth - 1)]
+        )
+        return compound
+
+    def _build_offer(self, index: int) -> ConditionalOffer:
+        proxy_class, value = self.rand.choice(BENEFIT_PROXY_CLASSES)
+        benefit = Benefit.objects.create(
+            proxy_class=proxy_class,
+            value=value,
+            range=self.rand.choice(self.ranges),
+        )
+        return ConditionalOffer.objects.create(
+            name=f"Benchmark Offer {index}",
+            offer_type=ConditionalOffer.SITE,
+            offer_group=self.offer_groups[index % len(self.offer_groups)],
+            priority=self.rand.randint(0, 10),
+            condition=self._build_condition(self.scenario.condition_depth),
+            benefit=benefit,
+        )
+
+
+def time_calls(
+    func: Callable[[], Any],
+    repeat: int,
+    warmup: int = 1,
+    setup: Callable[[], Any] | None = None,
+) -> TimingStats:
+    """
+    Time ``repeat`` calls to ``func`` (after ``warmup`` untimed calls). ``setup`` is called, untimed,
+    before every call. The number of queries is counted during the first timed call.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+    timings_ns: list[int] = []
+    num_queries = 0
+    for i in range(max(1, repeat)):
+        if setup:
+            setup()
+        with CaptureQueriesContext(connection) as ctx:
+            start_ns = time.perf_counter_ns()
+            func()
+            timings_ns.append(time.perf_counter_ns() - start_ns)
+        if i == 0:
+            num_queries = len(ctx.captured_queries)
+    timings_ms = [t / 1_000_000 for t in timings_ns]
+    return {
+        "runs": len(timings_ms),
+        "min_ms": min(timings_ms),
+        "median_ms": statistics.median(timings_ms),
+        "mean_ms": statistics.mean(timings_ms),
+        "max_ms": max(timings_ms),
+        "num_queries": num_queries,
+    }
+
+
+@contextmanager
+def use_private_cache() -> Generator[BaseCache]:
+    """
+    Replace the default cache with a connection to the same cache, but under a key prefix unique
+    to this run, so that the cache namespaces invalidated by the benchmarks (e.g. the pricing
+    cache namespace) and anything cached for the synthetic catalog are private to the run. Keys
+    under the prefix are deleted afterwards, if the cache backend supports ``delete_pattern``
+    (e.g. django-redis).
+    """
+    original = caches[DEFAULT_CACHE_ALIAS]
+    private = caches.create_connection(DEFAULT_CACHE_ALIAS)
+    private.key_prefix = (
+        f"{original.key_prefix}oscarbluelight-benchmark-{uuid.uuid4().hex}"
+    )
+    caches[DEFAULT_CACHE_ALIAS] = private
+    try:
+        yield private
+    finally:
+        caches[DEFAULT_CACHE_ALIAS] = original
+        delete_pattern = getattr(private, "delete_pattern", None)
+        if delete_pattern is not None:
+            delete_pattern("*")
+        private.close()
+        # Don't leave anything built from the synthetic catalog in this process
+        clear_offer_catalog()
+        clear_range_membership_cache()
+
+
+def run_scenario(
+    scenario: BenchmarkScenario,
+    repeat: int = 5,
+    warmup: int = 1,
+    seed: int = 0,
+) -> ScenarioResult:
+    """
+    Build a synthetic catalog for the scenario and time offer application, cosmetic pricing, and
+    line price breakdowns against it. Nothing is left behind in the database or in the shared
+    cache (see :func:`use_private_cache`).
+
+    Note that refreshing the range product set view for the synthetic catalog locks the view
+    until the scenario's transaction is rolled back, which blocks offer application by other
+    processes using the same database in the meantime.
+    """
+    with use_private_cache(), transaction.atomic():
+        catalog = SyntheticCatalog(scenario, seed=seed)
+        catalog.build()
+        Selector = get_class("partner.strategy", "Selector")
+        strategy = Selector().strategy()
+        basket = catalog.build_basket(strategy)
+        applicator = Applicator()
+        offers: list[ConditionalOffer] = []
+
+        def _reset_basket() -> None:
+            nonlocal offers
+            basket.reset_offer_applications()
+            basket.all_lines()
+            offers = applicator.get_offers(basket)
+
+        apply_offers = time_calls(
+            lambda: applicator.apply_offers(basket, offers),
+            repeat=repeat,
+            warmup=warmup,
+            setup=_reset_basket,
+        )
+
+        # Leave the basket with offers applied, for the price breakdowns
+        _reset_basket()
+        applicator.apply_offers(basket, offers)
+        lines = list(basket.all_lines())
+        get_price_breakdown = time_calls(
+            lambda: [line.get_price_breakdown() for line in lines],
+            repeat=repeat,
+            warmup=warmup,
+        )
+
+        # Invalidate the cache before each call, so that the price is actually calculated
+        product = catalog.products[0]
+        get_cosmetic_price = time_calls(
+            lambda: applicator.get_cosmetic_price(strategy, product),
+            repeat=repeat,
+            warmup=warmup,
+            setup=pricing_cache_ns.invalidate,
+        )
+
+        transaction.set_rollback(True)
+    return {
+        "scenario": scenario._asdict(),
+        "apply_offers": apply_offers,
+        "get_cosmetic_price": get_cosmetic_price,
+        "get_price_breakdown": get_price_breakdown,
+    }
+
+
+def _get_package_version(name: str) -> str:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def run_benchmarks(
+    scenarios: Sequence[BenchmarkScenario],
+    repeat: int = 5,
+    warmup: int = 1,
+    seed: int = 0,
+    on_result: Callable[[ScenarioResult], None] | None = None,
+) -> BenchmarkResults:
+    """
+    Run every scenario and return the results as a JSON-serializable document.
+    """
+    results: list[ScenarioResult] = []
+    for scenario in scenarios:
+        logger.info("Running benchmark scenario %r", scenario)
+        result = run_scenario(scenario, repeat=repeat, warmup=warmup, seed=seed)
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "created_at": now().isoformat(),
+        "environment": {
+            "django-oscar-bluelight": _get_package_version("django-oscar-bluelight"),
+            "django-oscar": _get_package_version("django-oscar"),
+            "django": django.get_version(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+        },
+        "options": {
+            "repeat": repeat,
+            "warmup": warmup,
+            "seed": seed,
+        },
+        "results": results,
+    }
@@ -40,6 +40,7 @@ if TYPE_CHECKING:
     from oscar.apps.basket.models import Basket
     from oscar.apps.order.models import Order
 
+    from .compound import CompoundTreeNode
     from .models import Condition, ConditionalOffer
     from .types import AffectedLines
 
@@ -74,6 +75,7 @@ class BluelightPercentageDiscountBenefit(
     """
 
     _description = _("%(value)s%% discount on %(range)s, %(max_affected_items)s")
+    supports_multi_application = True
 
     class Meta:
         app_label = "offer"
@@ -205,6 +207,7 @@ class BluelightAbsoluteDiscountBenefit(BluelightBenefitMixin, AbsoluteDiscountBe
     """
 
     _description = _("%(value)s discount on %(range)s, %(max_affected_items)s")
+    supports_multi_application = True
 
     class Meta:
         app_label = "offer"
@@ -559,6 +562,7 @@ class BluelightFixedPricePerItemBenefit(BluelightBenefitMixin, FixedPriceBenefit
 
 class BluelightMultibuyDiscountBenefit(BluelightBenefitMixin, MultibuyDiscountBenefit):
     _description = _("Second most expensive product from %(range)s is free")
+    supports_multi_application = True
 
     class Meta:
         app_label = "offer"
@@ -835,6 +839,9 @@ class CompoundBenefit(Benefit):
         verbose_name = _("Compound benefit")
         verbose_name_plural = _("Compound benefits")
 
+    #: Set when this benefit's tree was compiled (see :mod:`oscarbluelight.offer.compound`)
+    _compiled_node: CompoundTreeNode[Benefit] | None = None
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.proxy_class = f"{CompoundBenefit.__module__}.{CompoundBenefit.__name__}"
@@ -843,6 +850,8 @@ class CompoundBenefit(Benefit):
     def children(self) -> list[Benefit]:
         if self.pk is None:
             return []
+        if self._compiled_node is not None:
+            return [node.proxy for node in self._compiled_node.children]
         chil = [
             c.proxy()
             for c in self.subbenefits.order_by("-value", "id").all()
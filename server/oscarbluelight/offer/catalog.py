@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+from collections.abc import Collection, Mapping, Sequence
+from datetime import datetime, timedelta
+from typing import Any
+import copy
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils.timezone import now
+from oscar.apps.offer.conditions import (
+    CountCondition,
+    CoverageCondition,
+    ValueCondition,
+)
+
+from .compound import compile_compound_benefits, compile_compound_conditions
+from .models import (
+    Benefit,
+    CompoundCondition,
+    Condition,
+    ConditionalOffer,
+    RangeProductSet,
+)
+
+logger = logging.getLogger(__name__)
+
+_catalog_lock = threading.Lock()
+_catalog: OfferCatalog | None = None
+
+
+def _get_offer_sort_key(offer: ConditionalOffer) -> tuple[int, int, int]:
+    # Offers without an offer group sort after every grouped offer, matching
+    # the "null-group" behavior of :func:`.applicator.group_offers`.
+    group_priority = (
+        offer.offer_group.priority if offer.offer_group is not None else -(2**63)
+    )
+    return (-group_priority, -offer.priority, offer.pk or 0)
+
+
+def _get_condition_range_ids(condition: Condition) -> set[int] | None:
+    """
+    Get the IDs of the ranges which a basket must contain a product from in order for the
+    condition to be (even partially) satisfied, or ``None`` if that can't be determined from the
+    range product set view.
+    """
+    condition = condition.proxy()
+    if isinstance(condition, CompoundCondition):
+        children = condition.children
+        # An empty AND-condition is always satisfied
+        if not children:
+            return None
+        range_ids: set[int] = set()
+        for child in children:
+            child_range_ids = _get_condition_range_ids(child)
+            if child_range_ids is None:
+                return None
+            range_ids |= child_range_ids
+        return range_ids
+    # Only trust the range of condition types which are known to only consider lines in it.
+    if not isinstance(condition, CountCondition | CoverageCondition | ValueCondition):
+        return None
+    # A condition with a value of zero is satisfied by any basket
+    if condition.value is None or condition.value <= 0:
+        return None
+    rng = condition.range
+    if rng is None or rng.proxy_class or rng.includes_all_products:
+        return None
+    return {rng.pk}
+
+
+class OfferCatalog:
+    """
+    Immutable snapshot of the active site offers.
+
+    Offers are loaded (along with their offer group, condition, benefit, and
+    ranges), sorted into application order, and have their condition and
+    benefit proxy classes resolved up-front. The snapshot is valid until either
+    the pricing cache namespace changes version or the next offer
+    start / end boundary passes, whichever happens first.
+
+    The catalog also holds an inverted index from condition range ID to the
+    offers using that range, which (combined with the range product set view)
+    lets :meth:`get_candidate_offers` skip offers which can't possibly be
+    satisfied by a given basket.
+    """
+
+    select_related_fields: Sequence[str] = (
+        "offer_group",
+        "benefit",
+        "benefit__range",
+        "condition",
+        "condition__range",
+    )
+
+    def __init__(
+        self,
+        version: Any,
+        offers: Sequence[ConditionalOffer],
+        expires_at: datetime | None,
+        built_at: float,
+        offer_range_ids: Mapping[int, Collection[int] | None] | None = None,
+    ):
+        self.version = version
+        self.offers: tuple[ConditionalOffer, ...] = tuple(offers)
+        self.expires_at = expires_at
+        self.built_at = built_at
+        # Build the inverted index (range ID -> offer positions). Offers
+        # without known condition ranges are always candidates.
+        offer_range_ids = offer_range_ids or {}
+        self._offers_by_range: dict[int, list[int]] = {}
+        self._unindexed_offers: list[int] = []
+        for i, offer in enumerate(self.offers):
+            range_ids = offer_range_ids.get(offer.pk) if offer.pk else None
+            if range_ids is None:
+                self._unindexed_offers.append(i)
+                continue
+            for range_id in range_ids:
+                self._offers_by_range.setdefault(range_id, []).append(i)
+
+    def __repr__(self) -> str:
+        return f"<OfferCatalog version={self.version} offers={len(self.offers)}>"
+
+    @classmethod
+    def build(cls, version: Any) -> OfferCatalog:
+        cutoff = now()
+        qs = ConditionalOffer.active.filter(
+            offer_type=ConditionalOffer.SITE
+        ).select_related(*cls.select_related_fields)
+        offers = sorted(qs, key=_get_offer_sort_key)
+        for offer in offers:
+            offer.condition = offer.condition.proxy()
+            offer.benefit = offer.benefit.proxy()
+        # Load compound condition / benefit trees up-front, so evaluating them doesn't query
+        compile_compound_conditions(offer.condition for offer in offers)
+        compile_compound_benefits(offer.benefit for offer in offers)
+        return cls(
+            version=version,
+            offers=offers,
+            expires_at=cls._get_next_boundary(offers, cutoff),
+            built_at=time.monotonic(),
+            offer_range_ids={
+                offer.pk: _get_condition_range_ids(offer.condition) for offer in offers
+            },
+        )
+
+    @classmethod
+    def _get_next_boundary(
+        cls,
+        offers: Sequence[ConditionalOffer],
+        cutoff: datetime,
+    ) -> datetime | None:
+        # The snapshot goes stale as soon as either (a) an active offer ends, or
+        # (b) an open offer which hasn't started yet starts.
+        boundaries: list[datetime] = [
+            # ActiveOfferManager uses ``end_datetime >= now``, so the offer is
+            # still active at its end time and drops out right after it.
+            offer.end_datetime + timedelta(microseconds=1)
+            for offer in offers
+            if offer.end_datetime is not None
+        ]
+        next_start: datetime | None = ConditionalOffer.objects.filter(
+            offer_type=ConditionalOffer.SITE,
+            status=ConditionalOffer.OPEN,
+            start_datetime__gt=cutoff,
+        ).aggregate(next_start=Min("start_datetime"))["next_start"]
+        if next_start is not None:
+            boundaries.append(next_start)
+        return min(boundaries) if boundaries else None
+
+    def is_valid(self, version: Any, at: datetime | None = None) -> bool:
+        if version != self.version:
+            return False
+        if self.expires_at is not None and (at or now()) >= self.expires_at:
+            return False
+        max_age: int | None = getattr(settings, "BLUELIGHT_OFFER_CATALOG_MAX_AGE", 300)
+        return max_age is None or (time.monotonic() - self.built_at) < max_age
+
+    def get_offers(self) -> list[ConditionalOffer]:
+        """
+        Return the catalog's offers, in application order.
+
+        Applying an offer stores per-basket state on the offer and its
+        condition / benefit (satisfying lines, match memos, the attached
+        voucher, etc.), so each caller gets its own shallow copies. Ranges and
+        offer groups are shared between copies, since they're only read.
+        """
+        return [copy_offer(offer) for offer in self.offers]
+
+    def get_candidate_offers(
+        self,
+        product_ids: Collection[int],
+    ) -> list[ConditionalOffer]:
+        """
+        Return (copies of) the catalog's offers which could apply to a basket
+        containing the given products, in application order.
+
+        Offers whose condition ranges don't contain any of the products are
+        skipped, since their conditions can't be satisfied (even partially).
+        Range membership is checked with a single query against the range
+        product set view.
+        """
+        positions = set(self._unindexed_offers)
+        if product_ids and self._offers_by_range:
+            matched_range_ids = (
+                RangeProductSet.objects.filter(
+                    range_id__in=self._offers_by_range.keys(),
+                    product_id__in=product_ids,
+                )
+                .values_list("range_id", flat=True)
+                .distinct()
+            )
+            for range_id in matched_range_ids:
+                positions.update(self._offers_by_range[range_id])
+        return [copy_offer(self.offers[i]) for i in sorted(positions)]
+
+
+def copy_offer(offer: ConditionalOffer) -> ConditionalOffer:
+    """
+    Shallow-copy an offer, along with its condition and benefit, so that it can
+    be applied to a basket without leaking state into the original.
+    """
+    offer_copy = copy.copy(offer)
+    condition: Condition = copy.copy(offer.condition)
+    benefit: Benefit = copy.copy(offer.benefit)
+    offer_copy.condition = condition
+    offer_copy.benefit = benefit
+    return offer_copy
+
+
+def get_offer_catalog() -> OfferCatalog:
+    """
+    Get the current process's offer catalog, rebuilding it if it has gone stale.
+    """
+    global _catalog
+    from .applicator import pricing_cache_ns
+
+    version = pricing_cache_ns.value
+    catalog = _catalog
+    if catalog is not None and catalog.is_valid(version):
+        return catalog
+    with _catalog_lock:
+        # Another thread may have rebuilt the catalog while we waited on the lock
+        catalog = _catalog
+        if catalog is not None and catalog.is_valid(version):
+            return catalog
+        catalog = OfferCatalog.build(version)
+        logger.debug("Built %r", catalog)
+        _catalog = catalog
+    return catalog
+
+
+def clear_offer_catalog() -> None:
+    """
+    Drop this process's offer catalog, forcing it to be rebuilt on next use.
+    """
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+from django.db import connection
+
+from .models import Benefit, CompoundBenefit, CompoundCondition, Condition
+from .sql import get_compound_tree_edges_sql
+
+
+class CompoundTreeNode[T: (Condition, Benefit)](NamedTuple):
+    """
+    A compiled node of a compound condition / benefit tree.
+    """
+
+    #: The node's condition / benefit, with its proxy class already resolved
+    proxy: T
+    #: The node's children, in the same order as ``CompoundCondition.children`` /
+    #: ``CompoundBenefit.children``
+    children: tuple[CompoundTreeNode[T], ...]
+
+
+def _get_condition_sort_key(condition: Condition) -> tuple[Any, ...]:
+    # Matches ``CompoundCondition.subconditions.order_by("id")``
+    return (condition.pk,)
+
+
+def _get_benefit_sort_key(benefit: Benefit) -> tuple[Any, ...]:
+    # Matches ``CompoundBenefit.subbenefits.order_by("-value", "id")``. PostgreSQL sorts nulls
+    # first in descending order.
+    value = benefit.value
+    return (value is not None, -(value or Decimal(0)), benefit.pk)
+
+
+def compile_compound_conditions(conditions: Iterable[Condition]) -> None:
+    """
+    Compile the trees of each of the given (proxied) compound conditions, so that walking
+    their children, at any depth, doesn't run any queries.
+    """
+    _compile_compound_trees(
+        conditions,
+        CompoundCondition,
+        "subconditions",
+        _get_condition_sort_key,
+    )
+
+
+def compile_compound_benefits(benefits: Iterable[Benefit]) -> None:
+    """
+    Compile the trees of each of the given (proxied) compound benefits, so that walking their
+    children, at any depth, doesn't run any queries.
+    """
+    _compile_compound_trees(
+        benefits,
+        CompoundBenefit,
+        "subbenefits",
+        _get_benefit_sort_key,
+    )
+
+
+def _compile_compound_trees[T: (Condition, Benefit)](
+    objs: Iterable[T],
+    Compound: type[T],
+    m2m_field_name: str,
+    sort_key: Callable[[T], tuple[Any, ...]],
+) -> None:
+    roots: dict[int, T] = {
+        obj.pk: obj for obj in objs if isinstance(obj, Compound) and obj.pk is not None
+    }
+    if not roots:
+        return
+    # Load the edges of every tree, at any depth, with a single recursive query
+    field = Compound._meta.get_field(m2m_field_name)
+    edges_sql = get_compound_tree_edges_sql(
+        field.remote_field.through._meta.db_table,  # type: ignore[union-attr]  # subconditions / subbenefits are ManyToManyFields
+        field.m2m_column_name(),  # type: ignore[union-attr]  # subconditions / subbenefits are ManyToManyFields
+        field.m2m_reverse_name(),  # type: ignore[union-attr]  # subconditions / subbenefits are ManyToManyFields
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(edges_sql, [list(roots.keys())])
+        edges: list[tuple[int, int]] = cursor.fetchall()
+    child_ids: dict[int, list[int]] = defaultdict(list)
+    for parent_id, child_id in edges:
+        if parent_id != child_id:
+            child_ids[parent_id].append(child_id)
+    # Load and resolve every node in the trees. Selecting the compound child row lets nested
+    # compounds resolve their proxy without another query.
+    proxies: dict[int, T] = {}
+    node_ids = {child_id for ids in child_ids.values() for child_id in ids} - set(roots)
+    if node_ids:
+        Base = field.related_model
+        qs = Base.objects.filter(pk__in=node_ids).select_related(  # type: ignore[union-attr]  # related_model is the Condition / Benefit model
+            "range",
+            Compound._meta.model_name,
+        )
+        proxies.update((obj.pk, obj.proxy()) for obj in qs)
+    proxies.update(roots)
+
+    nodes: dict[int, CompoundTreeNode[T]] = {}
+
+    def build(pk: int, path: frozenset[int]) -> CompoundTreeNode[T]:
+        if pk in nodes:
+            return nodes[pk]
+        obj = proxies[pk]
+        # Leave cyclic compounds uncompiled, so they keep loading their children lazily
+        if not isinstance(obj, Compound) or pk in path:
+            return CompoundTreeNode(obj, ())
+        children = sorted(
+            (proxies[child_id] for child_id in child_ids[pk] if child_id in proxies),
+            key=sort_key,
+        )
+        node = CompoundTreeNode(
+            obj,
+            tuple(build(child.pk, path | {pk}) for child in children),
+        )
+        obj._compiled_node = node  # type: ignore[attr-defined]  # declared on CompoundCondition / CompoundBenefit
+        nodes[pk] = node
+        return node
+
+    for pk in roots:
+        build(pk, frozenset())
@@ -3,6 +3,7 @@ from __future__ import annotations
 from decimal import ROUND_UP, Decimal
 from typing import TYPE_CHECKING, Any, Literal
 import operator
+import time
 
 from django.core import exceptions
 from django.db import models
@@ -20,12 +21,20 @@ from oscarbluelight.offer.models import Condition
 
 from . import upsells
 from .constants import Conjunction
+from .context import get_application_context, get_unit_price
+from .evaluation import (
+    get_condition_evaluation_stats,
+    is_compound_adaptive_order_enabled,
+    is_compound_short_circuit_enabled,
+    order_for_evaluation,
+)
 from .utils import human_readable_conjoin
 
 if TYPE_CHECKING:
     from django_stubs_ext import StrOrPromise
     from oscar.apps.basket.models import Basket, Line
 
+    from .compound import CompoundTreeNode
     from .models import ConditionalOffer
     from .types import AffectedLines, LinesTuple
 
@@ -50,7 +59,8 @@ def _add_condition_satisfying_lines(
 
 class BluelightCountCondition(CountCondition):
     _description = _("Basket includes %(count)d item(s) from %(range)s")
-    _num_matches: int
+    supports_multi_application = True
+    evaluation_cost = 1
 
     class Meta:
         app_label = "offer"
@@ -93,14 +103,20 @@ class BluelightCountCondition(CountCondition):
         return False
 
     def _get_num_matches(self, basket: Basket, offer: ConditionalOffer) -> int:
-        if hasattr(self, "_num_matches"):
-            return self._num_matches
-        num_matches = 0
-        for line in basket.all_lines():
-            if self.can_apply_condition(line):
-                num_matches += line.quantity_without_offer_discount(offer)
-        self._num_matches = num_matches
-        return num_matches
+        def get_num_matches() -> int:
+            num_matches = 0
+            for line in basket.all_lines():
+                if self.can_apply_condition(line):
+                    num_matches += line.quantity_without_offer_discount(offer)
+            return num_matches
+
+        context = get_application_context()
+        if context is None or self.pk is None:
+            return get_num_matches()
+        return context.memoize(
+            ("num_matches", self.pk, offer.pk, id(basket)),
+            get_num_matches,
+        )
 
     def get_upsell_details(
         self,
@@ -157,6 +173,8 @@ class BluelightCountCondition(CountCondition):
 
 class BluelightCoverageCondition(CoverageCondition):
     _description = _("Basket includes %(count)d distinct item(s) from %(range)s")
+    supports_multi_application = True
+    evaluation_cost = 1
 
     class Meta:
         app_label = "offer"
@@ -277,8 +295,8 @@ class BluelightCoverageCondition(CoverageCondition):
 
 class BluelightValueCondition(ValueCondition):
     _description = _("Basket includes %(amount)s (%(tax)s) from %(range)s")
+    supports_multi_application = True
     _tax_inclusive = False
-    _value_of_matches: Decimal
 
     class Meta:
         app_label = "offer"
@@ -343,19 +361,25 @@ class BluelightValueCondition(ValueCondition):
         return None
 
     def _get_value_of_matches(self, offer: ConditionalOffer, basket: Basket) -> Decimal:
-        if hasattr(self, "_value_of_matches"):
-            return self._value_of_matches
-        value_of_matches = Decimal("0.00")
-        for line in basket.all_lines():
-            if self.can_apply_condition(line):
-                price = self._get_unit_price(offer, line)
-                quantity_available = line.quantity_without_offer_discount(offer)
-                value_of_matches += price * int(quantity_available)
-        self._value_of_matches = value_of_matches
-        return value_of_matches
+        def get_value_of_matches() -> Decimal:
+            value_of_matches = Decimal("0.00")
+            for line in basket.all_lines():
+                if self.can_apply_condition(line):
+                    price = self._get_unit_price(offer, line)
+                    quantity_available = line.quantity_without_offer_discount(offer)
+                    value_of_matches += price * int(quantity_available)
+            return value_of_matches
+
+        context = get_application_context()
+        if context is None or self.pk is None:
+            return get_value_of_matches()
+        return context.memoize(
+            ("value_of_matches", self.pk, offer.pk, id(basket)),
+            get_value_of_matches,
+        )
 
     def _get_unit_price(self, offer: ConditionalOffer, line: Line) -> Decimal:
-        price = utils.unit_price(offer, line)
+        price = get_unit_price(offer, line)
         if price is None:
             return Decimal("0.00")
         if self._tax_inclusive and line.is_tax_known and line.unit_tax is not None:
@@ -408,6 +432,8 @@ class BluelightValueCondition(ValueCondition):
 
 class BluelightTaxInclusiveValueCondition(BluelightValueCondition):
     _tax_inclusive = True
+    # Needs line tax data
+    evaluation_cost = 3
 
     class Meta:
         app_label = "offer"
@@ -444,6 +470,9 @@ class CompoundCondition(Condition):
         verbose_name = _("Compound condition")
         verbose_name_plural = _("Compound conditions")
 
+    #: Set when this condition's tree was compiled (see :mod:`oscarbluelight.offer.compound`)
+    _compiled_node: CompoundTreeNode[Condition] | None = None
+
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self.proxy_class = (
@@ -454,6 +483,8 @@ class CompoundCondition(Condition):
     def children(self) -> list[Condition]:
         if self.pk is None:
             return []
+        if self._compiled_node is not None:
+            return [node.proxy for node in self._compiled_node.children]
         chil = [c for c in self.subconditions.order_by("id").all() if c.pk != self.pk]
         return chil
 
@@ -467,6 +498,9 @@ class CompoundCondition(Condition):
         descrs = (c.description for c in self.children if c.description is not None)
         return human_readable_conjoin(self.conjunction, descrs, _("Empty Condition"))
 
+    def get_evaluation_cost(self) -> int:
+        return sum(c.proxy().get_evaluation_cost() for c in self.children)
+
     def _clean(self) -> None:
         if self.range:
             raise exceptions.ValidationError(
@@ -582,12 +616,32 @@ class CompoundCondition(Condition):
         offer: ConditionalOffer,
         basket: Basket,
     ) -> bool:
-        result = self._get_conjunction_root_memo(conjunction)
-        for c in self.children:
-            condition = c.proxy()
+        initial = self._get_conjunction_root_memo(conjunction)
+        result = initial
+        conditions = [c.proxy() for c in self.children]
+        # Once an AND has failed or an OR has succeeded, the remaining children can't change
+        # the result. They're still evaluated by default, since evaluating them records which
+        # lines satisfied them (see ``ConditionalOffer.get_condition_satisfying_lines``).
+        short_circuit = is_compound_short_circuit_enabled()
+        adaptive_order = short_circuit and is_compound_adaptive_order_enabled()
+        if adaptive_order:
+            conditions = order_for_evaluation(conditions, conjunction, method_name)
+        for condition in conditions:
             fn = getattr(condition, method_name)
-            subresult = fn(offer, basket)
+            stats = (
+                get_condition_evaluation_stats(condition, method_name)
+                if adaptive_order
+                else None
+            )
+            if stats is None:
+                subresult = fn(offer, basket)
+            else:
+                start = time.perf_counter()
+                subresult = fn(offer, basket)
+                stats.record(time.perf_counter() - start, subresult)
             result = self._apply_conjunction(conjunction, result, subresult)
+            if short_circuit and result != initial:
+                break
         return result
 
     def _get_conjunction_root_memo(self, conjunction: str) -> bool:
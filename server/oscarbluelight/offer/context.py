@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Generator, Hashable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any
+
+from oscar.apps.offer.utils import unit_price
+
+if TYPE_CHECKING:
+    from oscar.apps.basket.models import Line
+    from oscar.apps.catalogue.models import Product
+
+    from .models import ConditionalOffer, Range
+
+
+class ApplicationContext:
+    """
+    Memoized facts about a basket, for the duration of a single call to
+    :meth:`Applicator.apply_offers <oscarbluelight.offer.applicator.Applicator.apply_offers>`.
+
+    While a context is active (see :func:`use_application_context`), these facts are shared by
+    every offer applied to the basket:
+
+    - Range membership of each product, which can't change during application.
+    - Unit prices of each line, which only change between offer groups.
+    - Anything else memoized with :meth:`memoize` (e.g. the quantity of a condition's range
+      which is still available to an offer), which is dropped whenever a line is consumed or
+      discounted.
+
+    The context is discarded once offers have been applied, so nothing outlives the application.
+    """
+
+    def __init__(self) -> None:
+        self._range_matches: dict[tuple[int, int], bool] = {}
+        self._unit_prices: dict[int, Decimal | None] = {}
+        self._memos: dict[Hashable, Any] = {}
+
+    def contains_product(
+        self,
+        rng: Range,
+        product: Product,
+        func: Callable[[], bool],
+    ) -> bool:
+        """
+        Return whether the product is in the range, calling ``func`` to find out the first time.
+        """
+        key = (rng.pk, product.pk)
+        try:
+            return self._range_matches[key]
+        except KeyError:
+            result = self._range_matches[key] = func()
+            return result
+
+    def get_unit_price(self, offer: ConditionalOffer, line: Line) -> Decimal | None:
+        """
+        Memoized version of ``oscar.apps.offer.utils.unit_price``.
+        """
+        key = id(line)
+        try:
+            return self._unit_prices[key]
+        except KeyError:
+            price = self._unit_prices[key] = unit_price(offer, line)
+            return price
+
+    def memoize[T](self, key: Hashable, func: Callable[[], T]) -> T:
+        """
+        Return the memoized result for ``key``, calling ``func`` to calculate it if needed. The
+        result is dropped as soon as any basket line is consumed or discounted.
+        """
+        try:
+            return self._memos[key]  # type: ignore[no-any-return]  # memos are keyed by the caller, which knows their type
+        except KeyError:
+            result = self._memos[key] = func()
+            return result
+
+    def on_consumption(self) -> None:
+        """
+        Signal that a basket line was consumed or discounted.
+        """
+        if self._memos:
+            self._memos.clear()
+
+    def begin_offer_group_application(self) -> None:
+        """
+        Signal that the Applicator will begin to apply a new group of offers, which resets line
+        consumption and changes the lines' unit prices.
+        """
+        self._unit_prices.clear()
+        self._memos.clear()
+
+
+_active_context: ContextVar[ApplicationContext | None] = ContextVar(
+    "oscarbluelight_application_context",
+    default=None,
+)
+
+
+def get_application_context() -> ApplicationContext | None:
+    return _active_context.get()
+
+
+@contextmanager
+def use_application_context(
+    context: ApplicationContext,
+) -> Generator[ApplicationContext]:
+    token = _active_context.set(context)
+    try:
+        yield context
+    finally:
+        _active_context.reset(token)
+
+
+def get_unit_price(offer: ConditionalOffer, line: Line) -> Decimal | None:
+    """
+    Same as ``oscar.apps.offer.utils.unit_price``, but memoized by the active application context.
+    """
+    context = get_application_context()
+    if context is None:
+        return unit_price(offer, line)
+    return context.get_unit_price(offer, line)
+
+
+def notify_consumption() -> None:
+    """
+    Drop the active application context's consumption-dependent memos.
+    """
+    context = get_application_context()
+    if context is not None:
+        context.on_consumption()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+import threading
+
+from django.conf import settings
+
+from .constants import Conjunction
+
+if TYPE_CHECKING:
+    from .models import Condition
+
+#: How many times a condition must have been evaluated before its observed cost and selectivity
+#: are trusted over its static evaluation cost.
+MIN_OBSERVATIONS = 20
+
+_stats_lock = threading.Lock()
+_stats: dict[tuple[int, str], ConditionEvaluationStats] = {}
+
+
+def is_compound_short_circuit_enabled() -> bool:
+    return getattr(settings, "BLUELIGHT_COMPOUND_CONDITION_SHORT_CIRCUIT", False)
+
+
+def is_compound_adaptive_order_enabled() -> bool:
+    return getattr(settings, "BLUELIGHT_COMPOUND_CONDITION_ADAPTIVE_ORDER", False)
+
+
+class ConditionEvaluationStats:
+    """
+    Observed cost and outcomes of evaluating a sub-condition, within this process.
+    """
+
+    __slots__ = ("num_evaluations", "num_satisfied", "total_duration")
+
+    def __init__(self) -> None:
+        self.num_evaluations = 0
+        self.num_satisfied = 0
+        self.total_duration = 0.0
+
+    def record(self, duration: float, result: bool) -> None:
+        self.num_evaluations += 1
+        self.num_satisfied += int(result)
+        self.total_duration += duration
+
+    def get_rank(self, conjunction: str) -> float:
+        """
+        Rank the condition for evaluation within the given conjunction (lowest goes first), by
+        its mean cost divided by the chance that it decides the conjunction's result on its own
+        (i.e. that it's unsatisfied in an AND, or satisfied in an OR).
+        """
+        mean_duration = self.total_duration / max(self.num_evaluations, 1)
+        # Laplace smoothing, so that a condition which has always (or never) been satisfied so
+        # far isn't ranked as infinitely bad (or good).
+        p_satisfied = (self.num_satisfied + 1) / (self.num_evaluations + 2)
+        p_decisive = (
+            (1 - p_satisfied) if conjunction == Conjunction.AND else p_satisfied
+        )
+        return mean_duration / p_decisive
+
+
+def get_condition_evaluation_stats(
+    condition: Condition,
+    method_name: str,
+) -> ConditionEvaluationStats | None:
+    if condition.pk is None:
+        return None
+    key = (condition.pk, method_name)
+    stats = _stats.get(key)
+    if stats is None:
+        with _stats_lock:
+            stats = _stats.setdefault(key, ConditionEvaluationStats())
+    return stats
+
+
+def clear_condition_evaluation_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def order_for_evaluation(
+    conditions: Sequence[Condition],
+    conjunction: str,
+    method_name: str,
+) -> list[Condition]:
+    """
+    Sort the given (proxied) sub-conditions into the order in which a short-circuiting
+    conjunction should evaluate them: cheap and decisive conditions first.
+
+    Once every condition has been observed often enough, they're sorted by their observed cost
+    and selectivity. Until then, they're sorted by their static evaluation cost. Ties keep
+    their original order.
+    """
+    stats = [get_condition_evaluation_stats(c, method_name) for c in conditions]
+    if all(s is not None and s.num_evaluations >= MIN_OBSERVATIONS for s in stats):
+        ranks = [s.get_rank(conjunction) for s in stats]  # type: ignore[union-attr]  # checked above
+    else:
+        ranks = [float(c.get_evaluation_cost()) for c in conditions]
+    order = sorted(range(len(conditions)), key=ranks.__getitem__)
+    return [conditions[i] for i in order]
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 from collections.abc import Callable, Hashable
-from typing import TYPE_CHECKING, Any, TypedDict, TypeVar, Unpack
+from typing import TYPE_CHECKING, Any, NamedTuple, TypedDict, TypeVar, Unpack
 import collections
 import logging
+import threading
 
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Max
 from django.dispatch.dispatcher import Signal
 from django.utils.functional import SimpleLazyObject
 
+from ..caching import CacheNamespace
 from .signals import post_offer_group_apply, pre_offer_group_apply
 
 if TYPE_CHECKING:
@@ -18,10 +21,25 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 _system_group_registry: collections.deque[SimpleLazyObject] = collections.deque()
 _receivers: collections.deque[Callable[[Any], Any]] = collections.deque()
+_offer_group_keys_lock = threading.Lock()
+_offer_group_keys: VersionedOfferGroupKeys | None = None
+
+# Bumped whenever an offer group changes, so that every process reloads its offer group keys
+offer_group_ns = CacheNamespace(cache, "oscarbluelight.offer-groups")
 
 T = TypeVar("T", bound=Callable)
 
 
+class OfferGroupKey(NamedTuple):
+    pk: int
+    is_system_group: bool
+
+
+class VersionedOfferGroupKeys(NamedTuple):
+    version: Any
+    keys: dict[str, OfferGroupKey]
+
+
 class ConnectKwargs(TypedDict, total=False):
     sender: type[Any]
     weak: bool
@@ -83,6 +101,53 @@ def ensure_all_system_groups_exist() -> None:
             group._setup()
 
 
+def get_offer_group_keys() -> dict[str, OfferGroupKey]:
+    """
+    Get the primary key (and whether it's a system group) of every offer group, by slug.
+
+    Loaded with a single query the first time it's needed, after making sure every registered
+    system group exists, and kept until the version of ``offer_group_ns`` changes (i.e. until an
+    offer group is saved or deleted, by any process; see :func:`invalidate_offer_group_keys`).
+    Checking the version costs one cache lookup, and no database queries.
+    """
+    global _offer_group_keys
+    if len(_system_group_registry) > 0:
+        ensure_all_system_groups_exist()
+    version = offer_group_ns.value
+    current = _offer_group_keys
+    if current is not None and current.version == version:
+        return current.keys
+    from .models import OfferGroup
+
+    with _offer_group_keys_lock:
+        keys = {
+            slug: OfferGroupKey(pk, is_system_group)
+            for slug, pk, is_system_group in OfferGroup.objects.exclude(
+                slug=None
+            ).values_list("slug", "pk", "is_system_group")
+        }
+        # Store the version read before the query, so any change since then causes a reload
+        _offer_group_keys = VersionedOfferGroupKeys(version, keys)
+    return keys
+
+
+def clear_offer_group_keys() -> None:
+    """
+    Drop this process's offer group keys, forcing them to be reloaded on next use.
+    """
+    global _offer_group_keys
+    with _offer_group_keys_lock:
+        _offer_group_keys = None
+
+
+def invalidate_offer_group_keys() -> None:
+    """
+    Force every process to reload its offer group keys on next use.
+    """
+    offer_group_ns.invalidate()
+    clear_offer_group_keys()
+
+
 def pre_offer_group_apply_receiver(
     offer_group_slug: str,
     **decorator_kwargs: Unpack[ConnectKwargs],
@@ -121,12 +186,9 @@ def _offer_group_receiver(
     """
 
     def _decorator(func: T) -> T:
-        from .models import OfferGroup
-
         # Build an interim lambda function to filter signal events down to just the group instance we're looking for
         def _receiver(sender: type[Any], **kwargs: Any) -> Any:
-            ensure_all_system_groups_exist()
-            offer_group = OfferGroup.objects.filter(slug=offer_group_slug).first()
+            offer_group = get_offer_group_keys().get(offer_group_slug)
             if not offer_group:
                 logger.error(
                     f"Listener is attached to offer group {offer_group_slug}, but no such offer group exists!"
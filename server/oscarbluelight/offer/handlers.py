@@ -1,27 +1,36 @@
 from __future__ import annotations
 
+from collections.abc import Iterable
 from datetime import datetime, timedelta
 from functools import partial
 from typing import Any
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models.signals import m2m_changed, post_migrate, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from oscar.core.loading import get_model
 
 from . import tasks
 from .applicator import pricing_cache_ns
-from .groups import ensure_all_system_groups_exist
+from .groups import (
+    clear_offer_group_keys,
+    ensure_all_system_groups_exist,
+    invalidate_offer_group_keys,
+)
+from .membership import clear_range_membership_cache
 from .models import (
     Benefit,
+    CompoundBenefit,
+    CompoundCondition,
     Condition,
     ConditionalOffer,
     OfferGroup,
     Range,
     RangeProduct,
 )
+from .signals import range_product_set_view_updated
 
 Category = get_model("catalogue", "Category")
 ProductCategory = get_model("catalogue", "ProductCategory")
@@ -32,29 +41,182 @@ Order = get_model("order", "Order")
 OrderDiscount = get_model("order", "OrderDiscount")
 
 
-# Invalidate cosmetic price cache whenever any Offer or StockRecord data changes
+# Invalidate the entire cosmetic price cache (and the offer catalog) whenever any
+# Offer data changes. Ranges are included since the offer catalog caches them, and
+# since changes to e.g. ``includes_all_products`` aren't reflected in the range
+# product set view.
 @receiver(post_save, sender=OfferGroup)
 @receiver(post_save, sender=ConditionalOffer)
+@receiver(post_delete, sender=OfferGroup)
+@receiver(post_delete, sender=ConditionalOffer)
 @receiver(post_save, sender=Benefit)
 @receiver(post_save, sender=Condition)
-@receiver(post_save, sender=StockRecord)
+@receiver(post_save, sender=Range)
 def invalidate_pricing_cache_ns(
-    sender: (type[OfferGroup | ConditionalOffer | Benefit | Condition | StockRecord]),
-    instance: OfferGroup | ConditionalOffer | Benefit | Condition | StockRecord,
+    sender: type[OfferGroup | ConditionalOffer | Benefit | Condition | Range],
+    instance: OfferGroup | ConditionalOffer | Benefit | Condition | Range,
+    **kwargs: Any,
+) -> None:
+    transaction.on_commit(_invalidate_pricing_cache_ns)
+
+
+# Changing the children of a compound condition / benefit changes the ranges
+# (and therefore, the products) an offer applies to.
+@receiver(m2m_changed, sender=CompoundCondition.subconditions.through)
+@receiver(m2m_changed, sender=CompoundBenefit.subbenefits.through)
+def invalidate_pricing_cache_ns_on_compound_change(
+    *args: Any,
+    action: str,
+    **kwargs: Any,
+) -> None:
+    if action.startswith("post_"):
+        transaction.on_commit(_invalidate_pricing_cache_ns)
+
+
+def _invalidate_pricing_cache_ns() -> None:
+    pricing_cache_ns.invalidate()
+    tasks.queue_cosmetic_price_cache_warming()
+
+
+# StockRecord changes only affect the price of the StockRecord's product, so only
+# invalidate that product's cosmetic prices.
+@receiver(post_save, sender=StockRecord)
+@receiver(post_delete, sender=StockRecord)
+def invalidate_stockrecord_product_pricing(
+    sender: type[StockRecord],
+    instance: StockRecord,
+    **kwargs: Any,
+) -> None:
+    transaction.on_commit(
+        partial(tasks.invalidate_product_pricing, [instance.product_id])
+    )
+
+
+# Product changes (e.g. to ``is_discountable`` or the product class) can affect the
+# prices of the product and its children.
+@receiver(post_save, sender=Product)
+def invalidate_product_family_pricing(
+    sender: type[Product],
+    instance: Product,
+    **kwargs: Any,
+) -> None:
+    queue_product_family_pricing_invalidation([instance.pk])
+
+
+# Adding products to or removing them from a range only affects the prices of those
+# products (and their children). Invalidate them directly, rather than waiting for the
+# range product set view to be refreshed.
+@receiver(post_save, sender=RangeProduct)
+@receiver(post_delete, sender=RangeProduct)
+def invalidate_range_product_pricing(
+    sender: type[RangeProduct],
+    instance: RangeProduct,
+    **kwargs: Any,
+) -> None:
+    queue_product_family_pricing_invalidation([instance.product_id])
+
+
+# Changing a range's included or excluded products only affects the prices of those
+# products. Changing its product classes or categories can affect any number of products,
+# but is rare, so invalidate everything. Excluded categories aren't in the range product
+# set view (which doesn't model ``includes_all_products`` or proxy ranges), and only
+# matter to includes-all ranges.
+@receiver(m2m_changed, sender=Range.included_products.through)
+@receiver(m2m_changed, sender=Range.excluded_products.through)
+@receiver(m2m_changed, sender=Range.classes.through)
+@receiver(m2m_changed, sender=Range.included_categories.through)
+@receiver(m2m_changed, sender=Range.excluded_categories.through)
+def invalidate_pricing_on_range_m2m_change(
+    sender: type[Any],
+    instance: Range | Product,
+    action: str,
+    reverse: bool,
+    pk_set: set[int] | None,
+    **kwargs: Any,
+) -> None:
+    if not action.startswith("post_"):
+        return
+    if sender in (
+        Range.included_products.through,
+        Range.excluded_products.through,
+    ):
+        product_ids = [instance.pk] if reverse else pk_set
+        if product_ids is not None:
+            queue_product_family_pricing_invalidation(product_ids)
+            return
+    elif sender is Range.excluded_categories.through:
+        if reverse:
+            ranges = (
+                list(Range.objects.filter(pk__in=pk_set))
+                if pk_set is not None
+                else None
+            )
+        else:
+            ranges = [instance]  # type: ignore[list-item]  # instance is a Range when not reversed
+        if ranges is not None and not any(
+            rng.includes_all_products or rng.proxy_class for rng in ranges
+        ):
+            return
+    transaction.on_commit(_invalidate_pricing_cache_ns)
+
+
+# Excluded categories of includes-all ranges aren't in the range product set view either,
+# so invalidate the prices of products whose categories change, and everything when the
+# category tree changes while any includes-all range excludes categories.
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def invalidate_product_category_pricing(
+    sender: type[Any],
+    instance: Any,
+    **kwargs: Any,
+) -> None:
+    queue_product_family_pricing_invalidation([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_pricing(
+    sender: type[Any],
+    instance: Any,
     **kwargs: Any,
 ) -> None:
-    transaction.on_commit(lambda: pricing_cache_ns.invalidate())
+    def _on_commit() -> None:
+        if Range.objects.filter(
+            includes_all_products=True, excluded_categories__isnull=False
+        ).exists():
+            _invalidate_pricing_cache_ns()
+
+    transaction.on_commit(_on_commit)
+
+
+def queue_product_family_pricing_invalidation(product_ids: Iterable[int]) -> None:
+    """
+    Invalidate the cosmetic prices of the given products and their children, once the
+    current transaction commits.
+    """
+    transaction.on_commit(
+        partial(_invalidate_product_family_pricing, list(product_ids))
+    )
+
+
+def _invalidate_product_family_pricing(product_ids: Iterable[int]) -> None:
+    product_ids = list(product_ids)
+    child_ids = Product.objects.filter(parent_id__in=product_ids).values_list(
+        "pk", flat=True
+    )
+    tasks.invalidate_product_pricing([*product_ids, *child_ids])
 
 
 # Whenever anything changes that might affect the range membership data, queue
 # a refresh of the materialized view. Once the MV refresh is done, the task will
-# also invalidate pricing_cache_ns
+# also invalidate the cosmetic prices of any products whose membership of a
+# category-backed range changed (e.g. because the category tree changed).
 @receiver(post_save, sender=Category)
 @receiver(post_save, sender=ProductCategory)
 @receiver(post_save, sender=Product)
 @receiver(post_save, sender=ProductClass)
 @receiver(post_save, sender=Range)
 @receiver(post_save, sender=RangeProduct)
+@receiver(post_delete, sender=RangeProduct)
 @receiver(m2m_changed, sender=Range.included_products.through)
 @receiver(m2m_changed, sender=Range.excluded_products.through)
 @receiver(m2m_changed, sender=Range.classes.through)
@@ -68,6 +230,23 @@ def queue_rps_view_refresh(*args: Any, **kwargs: Any) -> None:
     transaction.on_commit(_queue)
 
 
+# Drop this process's copy of the range product set view once the view has been
+# refreshed. Other processes notice the refresh via ViewRefreshLog.
+@receiver(range_product_set_view_updated)
+def clear_range_membership_cache_on_refresh(*args: Any, **kwargs: Any) -> None:
+    clear_range_membership_cache()
+
+
+# Drop the cached offer group keys (used to filter system offer group signal receivers) whenever
+# an offer group changes: immediately in this process, and in every process (by bumping the
+# offer group namespace) once the change is committed.
+@receiver(post_save, sender=OfferGroup)
+@receiver(post_delete, sender=OfferGroup)
+def invalidate_offer_group_keys_on_change(*args: Any, **kwargs: Any) -> None:
+    clear_offer_group_keys()
+    transaction.on_commit(invalidate_offer_group_keys)
+
+
 # Create system groups post-migration
 @receiver(post_migrate)
 def post_migrate_ensure_all_system_groups_exist(
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+if TYPE_CHECKING:
+    from oscar.apps.basket.models import Basket
+
+    from .models import ConditionalOffer, OfferGroup
+
+logger = logging.getLogger(__name__)
+
+
+class OfferStats:
+    """
+    Timing and iteration counts for applying a single offer to a basket.
+    """
+
+    def __init__(self, offer: ConditionalOffer):
+        self.offer = offer
+        self.wall_time_ns = 0
+        self.num_iterations = 0
+        self.is_condition_satisfied_ns = 0
+        self.is_condition_partially_satisfied_ns = 0
+        self.get_upsell_details_ns = 0
+        self.num_queries = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<OfferStats offer={self.offer.pk} wall_time_ns={self.wall_time_ns} "
+            f"num_iterations={self.num_iterations} num_queries={self.num_queries}>"
+        )
+
+
+class OfferGroupStats:
+    """
+    Timing for applying a group of offers to a basket, along with the stats of each offer in the
+    group.
+    """
+
+    def __init__(self, group: OfferGroup | None, priority: int):
+        self.group = group
+        self.priority = priority
+        self.wall_time_ns = 0
+        self.num_queries = 0
+        self.offers: list[OfferStats] = []
+
+    def __repr__(self) -> str:
+        group_id = self.group.pk if self.group else None
+        return (
+            f"<OfferGroupStats group={group_id} wall_time_ns={self.wall_time_ns} "
+            f"num_queries={self.num_queries} offers={len(self.offers)}>"
+        )
+
+
+class OfferApplicationStats:
+    """
+    Stats for a single call to ``Applicator.apply_offers``.
+    """
+
+    def __init__(self, basket: Basket, is_cosmetic: bool = False):
+        self.basket = basket
+        self.is_cosmetic = is_cosmetic
+        self.wall_time_ns = 0
+        self.num_queries = 0
+        self.groups: list[OfferGroupStats] = []
+
+    @property
+    def offers(self) -> list[OfferStats]:
+        return [offer for group in self.groups for offer in group.offers]
+
+
+class BaseOfferInstrumentationCollector:
+    """
+    Receives the stats recorded while applying offers to a basket.
+
+    Downstream projects may subclass this to ship the stats to their metrics system of choice.
+
+    Configure in settings.py:
+        BLUELIGHT_OFFER_INSTRUMENTATION_COLLECTOR = 'myapp.metrics.StatsdOfferCollector'
+    """
+
+    #: Whether offer applications should be recorded at all. Collectors which discard the stats
+    #: should set this to ``False``, so that the recording overhead is skipped.
+    enabled = True
+
+    def collect(self, stats: OfferApplicationStats) -> None:
+        pass
+
+
+class NullOfferInstrumentationCollector(BaseOfferInstrumentationCollector):
+    """
+    Default collector, which doesn't record anything.
+    """
+
+    enabled = False
+
+
+class LoggingOfferInstrumentationCollector(BaseOfferInstrumentationCollector):
+    """
+    Collector which logs the stats of every offer and offer group at ``DEBUG`` level.
+    """
+
+    def collect(self, stats: OfferApplicationStats) -> None:
+        logger.debug(
+            "Applied offers to basket %s in %.3fms (%d queries)",
+            stats.basket.pk,
+            stats.wall_time_ns / 1_000_000,
+            stats.num_queries,
+        )
+        for group_stats in stats.groups:
+            logger.debug(
+                "Applied offer group %s (priority %d) in %.3fms (%d queries)",
+                group_stats.group,
+                group_stats.priority,
+                group_stats.wall_time_ns / 1_000_000,
+                group_stats.num_queries,
+            )
+            for offer_stats in group_stats.offers:
+                logger.debug(
+                    "Applied offer %s in %.3fms (%d iterations, %d queries). "
+                    "is_condition_satisfied: %.3fms. "
+                    "is_condition_partially_satisfied: %.3fms. "
+                    "get_upsell_details: %.3fms.",
+                    offer_stats.offer.pk,
+                    offer_stats.wall_time_ns / 1_000_000,
+                    offer_stats.num_iterations,
+                    offer_stats.num_queries,
+                    offer_stats.is_condition_satisfied_ns / 1_000_000,
+                    offer_stats.is_condition_partially_satisfied_ns / 1_000_000,
+                    offer_stats.get_upsell_details_ns / 1_000_000,
+                )
+
+
+class OfferApplicationRecorder:
+    """
+    Records an ``OfferApplicationStats`` while offers are applied, then hands it to the collector.
+    """
+
+    def __init__(
+        self,
+        collector: BaseOfferInstrumentationCollector,
+        stats: OfferApplicationStats,
+    ):
+        self.collector = collector
+        self.stats = stats
+        self._num_queries = 0
+
+    def _count_query(
+        self,
+        execute: Callable[..., Any],
+        sql: str,
+        params: Any,
+        many: bool,
+        context: dict[str, Any],
+    ) -> Any:
+        self._num_queries += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def record(self) -> Generator[None]:
+        start_ns = time.perf_counter_ns()
+        with connection.execute_wrapper(self._count_query):
+            yield
+        self.stats.wall_time_ns = time.perf_counter_ns() - start_ns
+        self.stats.num_queries = self._num_queries
+        try:
+            self.collector.collect(self.stats)
+        except Exception:
+            logger.exception("Failed to collect offer application stats")
+
+    @contextmanager
+    def record_group(
+        self,
+        group: OfferGroup | None,
+        priority: int,
+    ) -> Generator[OfferGroupStats]:
+        group_stats = OfferGroupStats(group, priority)
+        self.stats.groups.append(group_stats)
+        start_queries = self._num_queries
+        start_ns = time.perf_counter_ns()
+        yield group_stats
+        group_stats.wall_time_ns = time.perf_counter_ns() - start_ns
+        group_stats.num_queries = self._num_queries - start_queries
+
+    @contextmanager
+    def record_offer(self, offer: ConditionalOffer) -> Generator[OfferStats]:
+        offer_stats = OfferStats(offer)
+        if self.stats.groups:
+            self.stats.groups[-1].offers.append(offer_stats)
+        start_queries = self._num_queries
+        start_ns = time.perf_counter_ns()
+        yield offer_stats
+        offer_stats.wall_time_ns = time.perf_counter_ns() - start_ns
+        offer_stats.num_queries = self._num_queries - start_queries
+
+    def time_call[**P, T](
+        self,
+        offer_stats: OfferStats,
+        attr: str,
+        func: Callable[P, T],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        """
+        Call ``func``, adding the time it took to the given attribute of ``offer_stats``.
+        """
+        start_ns = time.perf_counter_ns()
+        result = func(*args, **kwargs)
+        setattr(
+            offer_stats,
+            attr,
+            getattr(offer_stats, attr) + time.perf_counter_ns() - start_ns,
+        )
+        return result
+
+
+class NullOfferApplicationRecorder(OfferApplicationRecorder):
+    """
+    Recorder used when instrumentation is disabled (or the application wasn't sampled). Doesn't
+    time or count anything.
+    """
+
+    @contextmanager
+    def record(self) -> Generator[None]:
+        yield
+
+    @contextmanager
+    def record_group(
+        self,
+        group: OfferGroup | None,
+        priority: int,
+    ) -> Generator[OfferGroupStats]:
+        yield OfferGroupStats(group, priority)
+
+    @contextmanager
+    def record_offer(self, offer: ConditionalOffer) -> Generator[OfferStats]:
+        yield OfferStats(offer)
+
+    def time_call[**P, T](
+        self,
+        offer_stats: OfferStats,
+        attr: str,
+        func: Callable[P, T],
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> T:
+        return func(*args, **kwargs)
+
+
+@functools.lru_cache(maxsize=10)
+def _get_collector_inst(cls_path: str | None) -> BaseOfferInstrumentationCollector:
+    if cls_path:
+        collector_class = import_string(cls_path)
+        return collector_class()
+    return NullOfferInstrumentationCollector()
+
+
+def get_offer_instrumentation_collector() -> BaseOfferInstrumentationCollector:
+    """
+    Get the collector instance configured by the ``BLUELIGHT_OFFER_INSTRUMENTATION_COLLECTOR``
+    setting.
+    """
+    cls_path = getattr(settings, "BLUELIGHT_OFFER_INSTRUMENTATION_COLLECTOR", None)
+    return _get_collector_inst(cls_path)
+
+
+def get_offer_application_recorder(
+    basket: Basket,
+    is_cosmetic: bool = False,
+) -> OfferApplicationRecorder:
+    """
+    Get a recorder for a single offer application. Applications are sampled at the rate set by
+    ``BLUELIGHT_OFFER_INSTRUMENTATION_SAMPLE_RATE``; the rest get a no-op recorder.
+    """
+    collector = get_offer_instrumentation_collector()
+    stats = OfferApplicationStats(basket, is_cosmetic=is_cosmetic)
+    sample_rate: float = getattr(
+        settings, "BLUELIGHT_OFFER_INSTRUMENTATION_SAMPLE_RATE", 1.0
+    )
+    if not collector.enabled or random.random() >= sample_rate:
+        return NullOfferApplicationRecorder(collector, stats)
+    return OfferApplicationRecorder(collector, stats)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from argparse import ArgumentParser, ArgumentTypeError
+from typing import Any
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...benchmarks import ScenarioResult, get_scenarios, run_benchmarks
+
+
+def _int_list(value: str) -> list[int]:
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise ArgumentTypeError(f"Expected a comma-separated list of integers: {value}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark offer application against synthetic baskets and offers. Every combination of "
+        "the given line / offer / offer group / condition depth counts is run, inside a "
+        "transaction which is rolled back afterwards, with cache keys private to the run. Note "
+        "that refreshing the range product set view locks it until each scenario's transaction "
+        "ends, which blocks offer application by anything else using the same database. Only "
+        "runs when DEBUG is enabled, unless --force is given."
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--lines",
+            type=_int_list,
+            default=[1, 10, 50],
+            help="Comma-separated numbers of basket lines",
+        )
+        parser.add_argument(
+            "--offers",
+            type=_int_list,
+            default=[10, 100],
+            help="Comma-separated numbers of site offers",
+        )
+        parser.add_argument(
+            "--groups",
+            type=_int_list,
+            default=[1, 5],
+            help="Comma-separated numbers of offer groups",
+        )
+        parser.add_argument(
+            "--depth",
+            type=_int_list,
+            default=[0, 2],
+            help="Comma-separated compound condition depths",
+        )
+        parser.add_argument(
+            "--quantity",
+            type=int,
+            default=1,
+            help="Quantity of each basket line",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of timed runs of each operation",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=1,
+            help="Number of untimed runs of each operation",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed used to build the synthetic catalogs",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Run even though DEBUG is disabled (e.g. against a shared database)",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the JSON results to this file instead of stdout",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError(
+                "Refusing to run benchmarks with DEBUG disabled, since they lock the range "
+                "product set view while they run. Pass --force to run anyway."
+            )
+        scenarios = get_scenarios(
+            num_lines=options["lines"],
+            num_offers=options["offers"],
+            num_groups=options["groups"],
+            condition_depths=options["depth"],
+            line_quantity=options["quantity"],
+        )
+
+        def _report(result: ScenarioResult) -> None:
+            self.stderr.write(
+                "{scenario}: apply_offers {apply:.3f}ms, get_cosmetic_price {cosmetic:.3f}ms, "
+                "get_price_breakdown {breakdown:.3f}ms".format(
+                    scenario=", ".join(
+                        f"{k}={v}" for k, v in result["scenario"].items()
+                    ),
+                    apply=result["apply_offers"]["median_ms"],
+                    cosmetic=result["get_cosmetic_price"]["median_ms"],
+                    breakdown=result["get_price_breakdown"]["median_ms"],
+                )
+            )
+
+        results = run_benchmarks(
+            scenarios,
+            repeat=options["repeat"],
+            warmup=options["warmup"],
+            seed=options["seed"],
+            on_result=_report if options["verbosity"] > 0 else None,
+        )
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+            self.stderr.write(f"Wrote results to {options['output']}")
+        else:
+            self.stdout.write(output)
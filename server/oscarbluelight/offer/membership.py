@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Generator, Iterable, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_membership_cache_lock = threading.Lock()
+_membership_cache: RangeMembershipCache | None = None
+
+
+class RangeMembershipSnapshot:
+    """
+    Pre-computed range membership for a fixed set of ranges and products.
+
+    While a snapshot is active (see :func:`use_range_membership`),
+    ``Range.contains_product`` answers from the snapshot instead of querying the
+    database, as long as both the range and the product are covered by it.
+    """
+
+    def __init__(
+        self,
+        range_ids: Iterable[int],
+        product_ids: Iterable[int],
+        membership: Mapping[int, Iterable[int]],
+    ):
+        self.range_ids = frozenset(range_ids)
+        self.product_ids = frozenset(product_ids)
+        self._pairs = frozenset(
+            (range_id, product_id)
+            for product_id, product_range_ids in membership.items()
+            for range_id in product_range_ids
+        )
+
+    def contains(self, range_id: int | None, product_id: int | None) -> bool | None:
+        """
+        Return whether the product is in the range, or ``None`` if this
+        snapshot doesn't know.
+        """
+        if range_id not in self.range_ids or product_id not in self.product_ids:
+            return None
+        return (range_id, product_id) in self._pairs
+
+
+_active_snapshot: ContextVar[RangeMembershipSnapshot | None] = ContextVar(
+    "oscarbluelight_range_membership",
+    default=None,
+)
+
+
+def get_range_membership() -> RangeMembershipSnapshot | None:
+    return _active_snapshot.get()
+
+
+@contextmanager
+def use_range_membership(
+    snapshot: RangeMembershipSnapshot,
+) -> Generator[RangeMembershipSnapshot]:
+    token = _active_snapshot.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _active_snapshot.reset(token)
+
+
+def is_range_membership_cache_enabled() -> bool:
+    return getattr(settings, "BLUELIGHT_RANGE_MEMBERSHIP_CACHE_ENABLED", False)
+
+
+class RangeMembershipCache:
+    """
+    Per-process copy of the range product set view, for standard ranges (i.e. not proxy ranges or
+    ``includes_all_products`` ranges).
+
+    The products of each range are loaded lazily (in a single query) the first time the range is
+    checked, and are stored as a sorted array of product IDs, so checking membership doesn't need
+    a query. The cache is tied to a version of the view (the time it was last refreshed, according
+    to :class:`ViewRefreshLog <oscarbluelight.offer.models.ViewRefreshLog>`), and is replaced once
+    the view is refreshed.
+    """
+
+    def __init__(self, version: Any):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self._ranges: dict[int, array[int]] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<RangeMembershipCache version={self.version!r} ranges={len(self._ranges)}>"
+
+    def is_check_due(self) -> bool:
+        interval: float = getattr(
+            settings, "BLUELIGHT_RANGE_MEMBERSHIP_CACHE_CHECK_INTERVAL", 30
+        )
+        return (time.monotonic() - self.checked_at) >= interval
+
+    def contains(self, range_id: int, product_id: int) -> bool:
+        product_ids = self._ranges.get(range_id)
+        if product_ids is None:
+            product_ids = self._load(range_id)
+        i = bisect_left(product_ids, product_id)
+        return i < len(product_ids) and product_ids[i] == product_id
+
+    def _load(self, range_id: int) -> array[int]:
+        from .models import RangeProductSet
+
+        with self._lock:
+            # Another thread may have loaded the range while we waited on the lock
+            product_ids = self._ranges.get(range_id)
+            if product_ids is not None:
+                return product_ids
+            product_ids = array(
+                "Q",
+                RangeProductSet.objects.filter(range_id=range_id)
+                .order_by("product_id")
+                .values_list("product_id", flat=True),
+            )
+            self._ranges[range_id] = product_ids
+        return product_ids
+
+
+def _get_range_product_set_version() -> datetime | None:
+    from .models import ViewRefreshLog
+
+    return ViewRefreshLog.get_last_refresh_dt(ViewRefreshLog.ViewType.RANGE_PRODUCT_SET)
+
+
+def get_range_membership_cache() -> RangeMembershipCache:
+    """
+    Get the current process's range membership cache. Every
+    ``BLUELIGHT_RANGE_MEMBERSHIP_CACHE_CHECK_INTERVAL`` seconds, this checks (with a single query)
+    whether the range product set view has been refreshed since the cache was created, and if so,
+    replaces the cache.
+    """
+    global _membership_cache
+    cache = _membership_cache
+    if cache is not None and not cache.is_check_due():
+        return cache
+    version = _get_range_product_set_version()
+    with _membership_cache_lock:
+        cache = _membership_cache
+        if cache is not None and cache.version == version:
+            cache.checked_at = time.monotonic()
+            return cache
+        cache = RangeMembershipCache(version)
+        logger.debug("Built %r", cache)
+        _membership_cache = cache
+    return cache
+
+
+def clear_range_membership_cache() -> None:
+    """
+    Drop this process's range membership cache, forcing it to be rebuilt on next use.
+    """
+    global _membership_cache
+    with _membership_cache_lock:
+        _membership_cache = None
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
-from collections.abc import Collection, Iterable, Sequence
+from collections import defaultdict
+from collections.abc import Collection, Iterable, Iterator, Sequence
 from datetime import datetime, timedelta
 from decimal import Decimal
+from itertools import chain
 from typing import TYPE_CHECKING, Any, TypedDict
+import asyncio
 import copy
 import logging
 import math
 import operator
 import time
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core import exceptions
 from django.db import IntegrityError, connection, models
@@ -28,12 +32,18 @@ from oscar.apps.offer.abstract_models import (
     AbstractRangeProductFileUpload,
 )
 from oscar.apps.offer.results import ApplicationResult
-from oscar.apps.offer.utils import load_proxy, unit_price
+from oscar.apps.offer.utils import load_proxy
 from oscar.core.loading import get_class, get_model
 from oscar.models.fields import AutoSlugField
 from oscar.templatetags.currency_filters import currency
 from thelabdb.pgviews import view as pg
 
+from .context import get_application_context, get_unit_price
+from .membership import (
+    get_range_membership,
+    get_range_membership_cache,
+    is_range_membership_cache_enabled,
+)
 from .results import (
     SHIPPING_DISCOUNT,
     ZERO_DISCOUNT,
@@ -52,7 +62,6 @@ if TYPE_CHECKING:
     from oscar.apps.order.models import Order as _Order
     from oscar.apps.order.models import OrderDiscount as _OrderDiscount
 
-    from ..mixins import BluelightBasketLineMixin as BasketLine
     from ..voucher.models import Voucher as _Voucher
     from .types import LinesTuple
     from .upsells import OfferUpsell
@@ -258,6 +267,10 @@ class ConditionalOffer(AbstractConditionalOffer):
 
 
 class Benefit(AbstractBenefit):
+    # Whether repeated applications of an offer using this benefit can be collapsed into a
+    # single step. See :class:`oscarbluelight.offer.multi_application.RepeatedApplicationProbe`.
+    supports_multi_application = False
+
     # Use this field to provide an hard-cap on the discount amount than a benefit
     # can provide.
     max_discount = models.DecimalField(
@@ -383,7 +396,14 @@ class Benefit(AbstractBenefit):
 
 
 class Condition(AbstractCondition):
-    _satisfying_lines: list[BasketLine] = []
+    # Whether repeated applications of an offer using this condition can be collapsed into a
+    # single step. See :class:`oscarbluelight.offer.multi_application.RepeatedApplicationProbe`.
+    supports_multi_application = False
+
+    # Relative cost of checking whether this condition is satisfied, used to decide which
+    # sub-conditions of a compound condition to check first. See
+    # :func:`oscarbluelight.offer.evaluation.order_for_evaluation`.
+    evaluation_cost = 2
 
     def proxy(self) -> Condition:
         if self.proxy_class:
@@ -410,6 +430,9 @@ class Condition(AbstractCondition):
         )
         return names.get(self.proxy_class, self.proxy_class)  # type: ignore[return-value]  # dict.get returns str|StrOrPromise but that matches return type
 
+    def get_evaluation_cost(self) -> int:
+        return self.evaluation_cost
+
     @property
     def non_voucher_offers(self) -> QuerySet[ConditionalOffer]:
         return self.offers.exclude(offer_type=ConditionalOffer.VOUCHER).all()
@@ -449,7 +472,7 @@ class Condition(AbstractCondition):
         for line in basket.all_lines():
             if not self.can_apply_condition(line):
                 continue
-            price = unit_price(offer, line)
+            price = get_unit_price(offer, line)
             if price is None:
                 continue
             line_tuples.append((price, line))
@@ -538,18 +561,9 @@ class Range(AbstractRange):
         query), and falls back to individual contains_product() calls only for
         proxy ranges whose logic can't be batched.
         """
-        standard_range_ids: set[int] = set()
-        all_products_range_ids: set[int] = set()
-        proxy_ranges: list[Range] = []
-
-        for rng in ranges:
-            if rng.proxy_class:
-                proxy_ranges.append(rng)
-            elif rng.includes_all_products:
-                all_products_range_ids.add(rng.pk)
-            else:
-                standard_range_ids.add(rng.pk)
-
+        standard_range_ids, all_products_range_ids, proxy_ranges = (
+            cls._partition_membership_ranges(ranges)
+        )
         result: set[int] = set()
 
         # Batch 1: Standard ranges — single query against the materialized view
@@ -578,6 +592,222 @@ class Range(AbstractRange):
 
         return result
 
+    @classmethod
+    def contains_products_bulk(
+        cls,
+        products: Iterable[Product],
+        ranges: Iterable[Range],
+    ) -> dict[int, set[int]]:
+        """
+        Check which of the given ranges contain each of the given products, in bulk.
+
+        Returns a mapping of product ID to the set of Range primary keys that contain the product.
+        Uses a single query against the RangeProductSet materialized view for standard ranges, and
+        a fixed number of set-based queries (for excluded products and excluded categories) for
+        includes_all_products ranges, regardless of how many products and ranges are given. Proxy
+        ranges are checked with the proxy's ``contains_products`` batch hook, if it has one (see
+        :meth:`_get_proxy_membership`).
+        """
+        products = list(products)
+        standard_range_ids, all_products_range_ids, proxy_ranges = (
+            cls._partition_membership_ranges(ranges)
+        )
+        membership: dict[int, set[int]] = {product.pk: set() for product in products}
+        if not products:
+            return membership
+
+        # Standard ranges — single query against the materialized view
+        if standard_range_ids:
+            rows = RangeProductSet.objects.filter(
+                product_id__in=membership.keys(),
+                range_id__in=standard_range_ids,
+            ).values_list("product_id", "range_id")
+            for product_id, range_id in rows:
+                membership[product_id].add(range_id)
+
+        for product_id, range_id in chain(
+            cls._get_all_products_membership(products, all_products_range_ids),
+            cls._get_proxy_membership(products, proxy_ranges),
+        ):
+            membership[product_id].add(range_id)
+        return membership
+
+    @classmethod
+    async def acontains_products_bulk(
+        cls,
+        products: Iterable[Product],
+        ranges: Iterable[Range],
+    ) -> dict[int, set[int]]:
+        """
+        Async version of :meth:`contains_products_bulk`.
+
+        The materialized view query runs through the async ORM, concurrently with the checks for
+        includes_all_products and proxy ranges (which run synchronously, since proxy ranges are
+        arbitrary Python code).
+        """
+        products = list(products)
+        standard_range_ids, all_products_range_ids, proxy_ranges = (
+            cls._partition_membership_ranges(ranges)
+        )
+        membership: dict[int, set[int]] = {product.pk: set() for product in products}
+        if not products:
+            return membership
+
+        async def _get_standard_membership() -> list[tuple[int, int]]:
+            if not standard_range_ids:
+                return []
+            return [
+                row
+                async for row in RangeProductSet.objects.filter(
+                    product_id__in=membership.keys(),
+                    range_id__in=standard_range_ids,
+                ).values_list("product_id", "range_id")
+            ]
+
+        def _get_other_membership() -> list[tuple[int, int]]:
+            return [
+                *cls._get_all_products_membership(products, all_products_range_ids),
+                *cls._get_proxy_membership(products, proxy_ranges),
+            ]
+
+        async def _aget_other_membership() -> list[tuple[int, int]]:
+            if not all_products_range_ids and not proxy_ranges:
+                return []
+            return await sync_to_async(_get_other_membership)()
+
+        for rows in await asyncio.gather(
+            _get_standard_membership(),
+            _aget_other_membership(),
+        ):
+            for product_id, range_id in rows:
+                membership[product_id].add(range_id)
+        return membership
+
+    @classmethod
+    def _partition_membership_ranges(
+        cls,
+        ranges: Iterable[Range],
+    ) -> tuple[set[int], set[int], list[Range]]:
+        """
+        Split ranges into the IDs of standard ranges (resolved via the materialized view), the IDs
+        of includes_all_products ranges, and proxy ranges.
+        """
+        standard_range_ids: set[int] = set()
+        all_products_range_ids: set[int] = set()
+        proxy_ranges: list[Range] = []
+        for rng in ranges:
+            if rng.proxy_class:
+                proxy_ranges.append(rng)
+            elif rng.includes_all_products:
+                all_products_range_ids.add(rng.pk)
+            else:
+                standard_range_ids.add(rng.pk)
+        return standard_range_ids, all_products_range_ids, proxy_ranges
+
+    @classmethod
+    def _get_all_products_membership(
+        cls,
+        products: Sequence[Product],
+        range_ids: Collection[int],
+    ) -> Iterator[tuple[int, int]]:
+        """
+        Yield ``(product_id, range_id)`` for each of the given includes_all_products ranges
+        which contains each of the given products, i.e. which doesn't exclude it (either directly
+        or via a category of the product or of its parent).
+        """
+        if not range_ids:
+            return
+        product_ids = {product.pk for product in products}
+        excluded: set[tuple[int, int]] = set(
+            cls.excluded_products.through.objects.filter(  # type: ignore[misc]  # m2m through model manager
+                range_id__in=range_ids,
+                product_id__in=product_ids,
+            ).values_list("product_id", "range_id")
+        )
+        excluded_category_paths: dict[int, list[str]] = defaultdict(list)
+        for range_id, path in cls.excluded_categories.through.objects.filter(  # type: ignore[misc]  # m2m through model manager
+            range_id__in=range_ids,
+        ).values_list("range_id", "category__path"):
+            excluded_category_paths[range_id].append(path)
+        if excluded_category_paths:
+            # A product is excluded by a category if it (or its parent) is in that category or
+            # in any of its descendants.
+            ProductCategory = get_model("catalogue", "ProductCategory")
+            parent_ids = {
+                product.pk: product.parent_id
+                for product in products
+                if product.parent_id is not None
+            }
+            category_paths: dict[int, list[str]] = defaultdict(list)
+            for product_id, path in ProductCategory.objects.filter(
+                product_id__in=product_ids | set(parent_ids.values())
+            ).values_list("product_id", "category__path"):
+                category_paths[product_id].append(path)
+            for product_id in product_ids:
+                paths = category_paths[product_id]
+                if product_id in parent_ids:
+                    paths = paths + category_paths[parent_ids[product_id]]
+                for range_id, excluded_paths in excluded_category_paths.items():
+                    if any(
+                        path.startswith(excluded_path)
+                        for path in paths
+                        for excluded_path in excluded_paths
+                    ):
+                        excluded.add((product_id, range_id))
+        for product_id in product_ids:
+            for range_id in range_ids:
+                if (product_id, range_id) not in excluded:
+                    yield product_id, range_id
+
+    @classmethod
+    def _get_proxy_membership(
+        cls,
+        products: Sequence[Product],
+        proxy_ranges: Sequence[Range],
+    ) -> Iterator[tuple[int, int]]:
+        """
+        Yield ``(product_id, range_id)`` for each of the given proxy ranges which contains each of
+        the given products.
+
+        Proxy classes may implement ``contains_products(products)``, returning the IDs of the
+        given products which are in the range, to check many products at once. Otherwise, each
+        product is checked individually with ``contains_product(product)``.
+        """
+        for rng in proxy_ranges:
+            contains_products = getattr(rng.proxy, "contains_products", None)
+            if contains_products is not None:
+                for product_id in contains_products(products):
+                    yield product_id, rng.pk
+                continue
+            for product in products:
+                if rng.proxy.contains_product(product):
+                    yield product.pk, rng.pk
+
+    def contains_product(self, product: Product) -> bool:
+        # Answer from the active membership snapshot, when it covers this lookup
+        snapshot = get_range_membership()
+        if snapshot is not None:
+            result = snapshot.contains(self.pk, product.pk)
+            if result is not None:
+                return result
+        # Answer repeated lookups during offer application from the application context
+        context = get_application_context()
+        if context is not None and self.pk is not None and product.pk is not None:
+            return context.contains_product(
+                self, product, lambda: self._contains_product(product)
+            )
+        return self._contains_product(product)
+
+    def _contains_product(self, product: Product) -> bool:
+        # Answer standard ranges from the per-process copy of the range product set view
+        if (
+            is_range_membership_cache_enabled()
+            and not self.proxy_class
+            and not self.includes_all_products
+        ):
+            return get_range_membership_cache().contains(self.pk, product.pk)
+        return super().contains_product(product)
+
     def all_products_consistent(self) -> QuerySet[Product]:
         """
         Get the list of products without using the materialized view.
@@ -593,7 +823,10 @@ class Range(AbstractRange):
         Same as Range.add_product, but works on a batch of products (in order to optimize the number
         of queries run on the DB)
         """
-        from .handlers import queue_rps_view_refresh
+        from .handlers import (
+            queue_product_family_pricing_invalidation,
+            queue_rps_view_refresh,
+        )
 
         # Insert new rows into the included_products relationship
         RangeProduct = self.included_products.through
@@ -606,8 +839,10 @@ class Range(AbstractRange):
             range=self,
             product__in=products,
         ).all().delete()
-        # Queue a view refresh
+        # Queue a view refresh, and invalidate the products' cosmetic prices (bulk
+        # operations don't send the signals which would otherwise do so)
         queue_rps_view_refresh()
+        queue_product_family_pricing_invalidation(product.pk for product in products)
         # Invalidate cache because queryset has changed
         self.invalidate_cached_queryset()
 
@@ -615,7 +850,10 @@ class Range(AbstractRange):
         """
         Inverse of add_product_batch
         """
-        from .handlers import queue_rps_view_refresh
+        from .handlers import (
+            queue_product_family_pricing_invalidation,
+            queue_rps_view_refresh,
+        )
 
         # Insert new rows into the excluded_products relationship
         ExcludedProduct = self.excluded_products.through
@@ -628,8 +866,10 @@ class Range(AbstractRange):
         # re-added again, thus it returns back to the range product list.
         RangeProduct = self.included_products.through
         RangeProduct.objects.filter(range=self, product__in=products).all().delete()  # type: ignore[misc]  # m2m through model manager
-        # Queue a view refresh
+        # Queue a view refresh, and invalidate the products' cosmetic prices (bulk
+        # operations don't send the signals which would otherwise do so)
         queue_rps_view_refresh()
+        queue_product_family_pricing_invalidation(product.pk for product in products)
         # Invalidate cache because queryset has changed
         self.invalidate_cached_queryset()
 
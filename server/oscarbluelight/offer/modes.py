@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+from ..mixins import BluelightBasketLineMixin, ConsumptionSnapshot
+
+if TYPE_CHECKING:
+    from oscar.apps.basket.models import Basket
+
+    from .models import ConditionalOffer
+    from .upsells import OfferUpsell
+
+
+class UpsellMode:
+    #: Calculate each offer's upsell right after applying it
+    EAGER = "eager"
+    #: Record what's needed to calculate the upsells, but only calculate them once they're read
+    #: (e.g. by ``basket.get_offer_upsells()``)
+    LAZY = "lazy"
+    #: Don't calculate upsells at all
+    OFF = "off"
+
+
+class ApplicationMode(NamedTuple):
+    """
+    Controls the bookkeeping done by :class:`Applicator <oscarbluelight.offer.applicator.Applicator>`
+    while applying offers, on top of calculating the basket's discounts.
+
+    Skipping it doesn't change the discounts or offer applications, so it's safe whenever the
+    caller only cares about prices (e.g. cosmetic pricing, shipping estimates, or background
+    repricing).
+    """
+
+    #: How to calculate offer upsells (see :class:`UpsellMode`)
+    upsells: str = UpsellMode.EAGER
+    #: Whether to record a ``LineDiscountDescription`` for each line discount
+    discount_descriptions: bool = True
+
+
+#: Do all of the bookkeeping. This is the default.
+FULL_APPLICATION = ApplicationMode()
+#: Only calculate discounts
+LEAN_APPLICATION = ApplicationMode(
+    upsells=UpsellMode.OFF,
+    discount_descriptions=False,
+)
+
+
+class DeferredOfferUpsells:
+    """
+    Offer upsells which haven't been calculated yet.
+
+    An offer's upsell depends on how much of each line was still available to the offer right
+    after it was applied. So, while applying offers, we record a snapshot of each line's
+    consumption state after every offer. The first time the upsells are read, we temporarily
+    put the lines back into each of those states to calculate the upsell, exactly as if it had
+    been calculated right after applying the offer.
+    """
+
+    def __init__(self, basket: Basket, lines: list[BluelightBasketLineMixin]):
+        self.basket = basket
+        self.lines = lines
+        self._offers: list[tuple[ConditionalOffer, list[ConsumptionSnapshot]]] = []
+        self._is_resolved = False
+        for line in lines:
+            line.defer_offer_upsells(self)
+
+    def add_offer(self, offer: ConditionalOffer) -> None:
+        """
+        Record the state of the basket lines right after applying the given offer.
+        """
+        snapshots = [line.get_consumption_snapshot() for line in self.lines]
+        self._offers.append((offer, snapshots))
+
+    def resolve(self) -> None:
+        """
+        Calculate the upsells and add them to the lines. Only does anything the first time it's
+        called.
+        """
+        if self._is_resolved:
+            return
+        self._is_resolved = True
+        for line in self.lines:
+            line.defer_offer_upsells(None)
+        final_snapshots = [line.get_consumption_snapshot() for line in self.lines]
+        upsells: list[OfferUpsell] = []
+        try:
+            for offer, snapshots in self._offers:
+                for line, snapshot in zip(self.lines, snapshots, strict=True):
+                    line.restore_consumption_snapshot(snapshot)
+                if not offer.is_condition_satisfied(
+                    self.basket
+                ) and offer.is_condition_partially_satisfied(self.basket):
+                    upsell = offer.get_upsell_details(self.basket)
+                    if upsell:
+                        upsells.append(upsell)
+        finally:
+            for line, snapshot in zip(self.lines, final_snapshots, strict=True):
+                line.restore_consumption_snapshot(snapshot)
+        self._add_upsells(upsells)
+        self._offers = []
+
+    def _add_upsells(self, upsells: list[OfferUpsell]) -> None:
+        # Same as BluelightBasketMixin.add_offer_upsells, but limited to the lines the offers
+        # were applied to (in case the basket's lines have since been reloaded).
+        from .upsells import UpsellRelevance
+
+        relevance = UpsellRelevance(line.product for line in self.lines if line.product)
+        relevance.prefetch(upsells)
+        for upsell in upsells:
+            product_ids = relevance.get_relevant_product_ids(upsell)
+            for line in self.lines:
+                if line.product and line.product.pk in product_ids:
+                    line.add_offer_upsell(upsell)
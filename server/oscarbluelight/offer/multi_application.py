@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+
+from ..basket_utils import BluelightLineDiscountRegistry
+from ..mixins import BluelightBasketLineMixin
+
+if TYPE_CHECKING:
+    from oscar.apps.basket.models import Basket
+
+    from .models import ConditionalOffer
+
+
+def is_multi_application_enabled() -> bool:
+    return getattr(settings, "BLUELIGHT_OFFER_MULTI_APPLICATION_ENABLED", False)
+
+
+class RepeatedApplicationProbe:
+    """
+    Finds out how many more times an offer's last application could be repeated, and repeats it
+    in a single aggregated step, instead of re-evaluating the condition and benefit for every
+    application.
+
+    This is only possible when the offer's condition and benefit both support it (see
+    ``supports_multi_application``) and they both apply to the same single basket line. Each
+    application then consumes a fixed quantity of that line and gives a fixed discount, for as
+    long as the line has at least that quantity left, so the applications are identical up until
+    the line runs out. Any applications after that (e.g. a final partial application) are left to
+    the normal application loop.
+
+    Create the probe right before the offer's first application, then call :meth:`repeat` right
+    after it.
+    """
+
+    def __init__(
+        self,
+        offer: ConditionalOffer,
+        line: BluelightBasketLineMixin,
+        discounts: BluelightLineDiscountRegistry,
+    ):
+        self.offer = offer
+        self.line = line
+        self.discounts = discounts
+        self._num_discounts = len(discounts.all())
+        self._num_consumed = discounts.num_consumed()
+
+    @classmethod
+    def create(
+        cls,
+        offer: ConditionalOffer,
+        basket: Basket,
+    ) -> RepeatedApplicationProbe | None:
+        """
+        Return a probe for applying the offer to the basket, or ``None`` if the offer's
+        applications can't be repeated in a single step.
+        """
+        condition = offer.condition.proxy()
+        benefit = offer.benefit.proxy()
+        if not getattr(condition, "supports_multi_application", False):
+            return None
+        if not getattr(benefit, "supports_multi_application", False):
+            return None
+        condition_lines = [
+            line for line in basket.all_lines() if condition.can_apply_condition(line)
+        ]
+        benefit_lines = [
+            line for __, line in benefit.get_applicable_lines(offer, basket)
+        ]
+        if len(condition_lines) != 1 or condition_lines != benefit_lines:
+            return None
+        line = condition_lines[0]
+        if not isinstance(line, BluelightBasketLineMixin) or not isinstance(
+            line.discounts, BluelightLineDiscountRegistry
+        ):
+            return None
+        return cls(offer, line, line.discounts)
+
+    def get_num_repeats(self, max_repeats: int) -> int:
+        """
+        Get the number of times the application made since the probe was created can be repeated
+        with an identical result.
+        """
+        consumed = self.discounts.num_consumed() - self._num_consumed
+        if consumed <= 0 or max_repeats <= 0:
+            return 0
+        available = min(
+            self.line.quantity_without_discount,
+            self.line.quantity_without_offer_discount(self.offer),
+        )
+        return min(max_repeats, available // consumed)
+
+    def repeat(self, max_repeats: int) -> int:
+        """
+        Repeat the application made since the probe was created as many times as possible (up to
+        ``max_repeats``), and return the number of repeats. Each of the application's line
+        discounts is repeated as a single discount of the combined amount and quantity.
+        """
+        num_repeats = self.get_num_repeats(max_repeats)
+        if num_repeats <= 0:
+            return 0
+        consumed = self.discounts.num_consumed() - self._num_consumed
+        new_discounts = self.discounts.all()[self._num_discounts :]
+        discounted = 0
+        for discount in new_discounts:
+            self.line.discount(
+                discount.amount * num_repeats,
+                discount.quantity * num_repeats,
+                incl_tax=discount.incl_tax,
+                offer=self.offer,
+            )
+            discounted += discount.quantity
+        # Items which were consumed by the condition without being discounted
+        if consumed > discounted:
+            self.line.consume((consumed - discounted) * num_repeats, offer=self.offer)
+        return num_repeats
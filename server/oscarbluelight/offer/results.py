@@ -28,8 +28,19 @@ class OfferApplications(BaseOfferApplications):
     def __init__(self) -> None:
         self.applications: dict[int, OfferApplication] = {}  # type: ignore[assignment]  # bluelight OfferApplication TypedDict extends Oscar's with extra fields
 
-    def add(self, offer: ConditionalOffer, result: BasketDiscount) -> None:
+    def add(
+        self,
+        offer: ConditionalOffer,
+        result: BasketDiscount,
+        freq: int = 1,
+    ) -> None:
+        """
+        Record ``freq`` identical applications of the offer, each giving the result's discount.
+        """
         super().add(offer, result)
+        if freq > 1:
+            self.applications[offer.id]["discount"] += result.discount * (freq - 1)
+            self.applications[offer.id]["freq"] += freq - 1
         self.applications[offer.id]["is_hidden"] = getattr(result, "is_hidden", False)
         # Add the discount index (application order) as a key. Useful for merging the
         # basket.voucher_discounts and basket.offer_discounts lists together for display
@@ -8,7 +8,7 @@ if TYPE_CHECKING:
     from oscar.apps.order.models import Order, OrderDiscount
     from psycopg2.sql import Composed
 
-    from .models import ConditionalOffer
+    from .models import ConditionalOffer, RangeProductSet
 
 try:
     try:
@@ -184,3 +184,92 @@ def get_recalculate_offer_application_totals_sql(
         status_filter=status_filter,
     )
     return update_sql
+
+
+def get_snapshot_range_product_set_sql(
+    RangeProductSet: type[RangeProductSet],
+    snapshot_table: str,
+) -> Composed:
+    """
+    Copy the rows of the range product set view for the ranges given by the ``range_ids``
+    parameter into a temporary table, which is dropped at the end of the transaction.
+    """
+    return sql.SQL(
+        """
+        CREATE TEMPORARY TABLE {snapshot} ON COMMIT DROP AS
+        SELECT range_id, product_id
+          FROM {rps}
+         WHERE range_id = ANY(%(range_ids)s)
+    """
+    ).format(
+        snapshot=sql.Identifier(snapshot_table),
+        rps=sql.Identifier(RangeProductSet._meta.db_table),
+    )
+
+
+def get_changed_range_product_ids_sql(
+    RangeProductSet: type[RangeProductSet],
+    snapshot_table: str,
+    limit: int,
+) -> Composed:
+    """
+    Select (up to ``limit``) IDs of the products which have been added to or removed from any
+    of the ranges given by the ``range_ids`` parameter, since the given snapshot of the range
+    product set view was taken.
+    """
+    return sql.SQL(
+        """
+        SELECT DISTINCT changed.product_id
+          FROM (
+            (
+                SELECT range_id, product_id FROM {snapshot}
+                EXCEPT
+                SELECT range_id, product_id FROM {rps}
+                 WHERE range_id = ANY(%(range_ids)s)
+            )
+            UNION ALL
+            (
+                SELECT range_id, product_id FROM {rps}
+                 WHERE range_id = ANY(%(range_ids)s)
+                EXCEPT
+                SELECT range_id, product_id FROM {snapshot}
+            )
+          ) changed
+         LIMIT {limit}
+    """
+    ).format(
+        snapshot=sql.Identifier(snapshot_table),
+        rps=sql.Identifier(RangeProductSet._meta.db_table),
+        limit=sql.Literal(limit),
+    )
+
+
+def get_compound_tree_edges_sql(
+    through_table: str,
+    parent_column: str,
+    child_column: str,
+) -> Composed:
+    """
+    Select every (parent, child) edge of the compound conditions / benefits reachable from the
+    compound IDs passed as the query's only parameter (an array), at any depth.
+    """
+    return sql.SQL(
+        """
+        WITH RECURSIVE tree(parent_id, child_id) AS (
+            SELECT t.{parent}, t.{child}
+              FROM {through} t
+             WHERE t.{parent} = ANY(%s)
+            UNION
+            SELECT t.{parent}, t.{child}
+              FROM {through} t
+              JOIN tree
+                ON t.{parent} = tree.child_id
+        )
+        SELECT parent_id, child_id
+          FROM tree
+    """
+    ).format(
+        through=sql.Identifier(through_table),
+        parent=sql.Identifier(parent_column),
+        child=sql.Identifier(child_column),
+    )
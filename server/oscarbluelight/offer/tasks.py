@@ -1,18 +1,31 @@
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from datetime import UTC, datetime
+from functools import partial
+from itertools import batched
 import logging
 
+from django.conf import settings
 from django.db import connection, transaction
+from django.utils.module_loading import import_string
 from django_tasks import task
+from oscar.core.loading import get_class, get_model
 
-from .applicator import pricing_cache_ns
-from .models import RangeProductSet, ViewRefreshLog
+from .applicator import (
+    Applicator,
+    get_offer_ranges,
+    pricing_cache_ns,
+    product_pricing_ns,
+)
+from .models import ConditionalOffer, Range, RangeProductSet, ViewRefreshLog
 from .signals import range_product_set_view_updated
+from .sql import get_changed_range_product_ids_sql, get_snapshot_range_product_set_sql
 
 logger = logging.getLogger(__name__)
 
+RPS_SNAPSHOT_TABLE = "oscarbluelight_rangeproductset_snapshot"
+
 
 def _do_view_refresh(
     view_type: ViewRefreshLog.ViewType,
@@ -58,17 +71,202 @@ def recalculate_offer_application_totals(
 @task()
 @transaction.atomic
 def refresh_rps_view(requested_on_timestamp: float) -> None:
-    # Invalidate the pricing cache (since range membership may affect pricing)
-    def _on_commit() -> None:
-        pricing_cache_ns.invalidate()
+    def _on_commit(product_ids: list[int]) -> None:
+        invalidate_product_pricing(product_ids)
         range_product_set_view_updated.send(sender=RangeProductSet)
 
     def _inner() -> None:
-        RangeProductSet.refresh(concurrently=True)
-        transaction.on_commit(_on_commit)
+        # Changes to range membership are invalidated where they're made (see ``handlers``),
+        # except for changes to the category tree, which can change the products of any range
+        # which includes categories. Diff those ranges' rows of the view, to invalidate the
+        # cosmetic prices of the products whose membership changed.
+        range_ids = list(
+            Range.included_categories.through.objects.values_list(
+                "range_id", flat=True
+            ).distinct()
+        )
+        if not range_ids:
+            RangeProductSet.refresh(concurrently=True)
+            transaction.on_commit(partial(_on_commit, []))
+            return
+        max_products = get_max_product_invalidations()
+        params = {"range_ids": range_ids}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                get_snapshot_range_product_set_sql(RangeProductSet, RPS_SNAPSHOT_TABLE),
+                params,
+            )
+            RangeProductSet.refresh(concurrently=True)
+            # Fetch one more than the max, so that we can tell when the max has been exceeded
+            cursor.execute(
+                get_changed_range_product_ids_sql(
+                    RangeProductSet, RPS_SNAPSHOT_TABLE, limit=max_products + 1
+                ),
+                params,
+            )
+            product_ids = [row[0] for row in cursor.fetchall()]
+        transaction.on_commit(partial(_on_commit, product_ids))
 
     _do_view_refresh(
         ViewRefreshLog.ViewType.RANGE_PRODUCT_SET,
         requested_on_timestamp,
         _inner,
     )
+
+
+def get_max_product_invalidations() -> int:
+    return getattr(settings, "BLUELIGHT_PRICING_CACHE_MAX_PRODUCT_INVALIDATIONS", 1000)
+
+
+def invalidate_product_pricing(product_ids: Iterable[int]) -> None:
+    """
+    Invalidate the cached cosmetic prices of the given products, and queue a warm-up of them.
+
+    Should be called after the change that affected their prices has been committed. If more than
+    ``BLUELIGHT_PRICING_CACHE_MAX_PRODUCT_INVALIDATIONS`` products are given, the entire pricing
+    cache is invalidated instead, since that's cheaper than bumping each product's namespace.
+    """
+    unique_ids = sorted(set(product_ids))
+    if not unique_ids:
+        return
+    if len(unique_ids) > get_max_product_invalidations():
+        pricing_cache_ns.invalidate()
+        queue_cosmetic_price_cache_warming()
+        return
+    product_pricing_ns.invalidate(unique_ids)
+    queue_cosmetic_price_cache_warming(product_ids=unique_ids)
+
+
+def _get_cosmetic_product_ids() -> Iterator[int]:
+    """
+    Yield the IDs of every product which could be affected by an active, cosmetic-affecting site
+    offer. IDs may be yielded more than once.
+    """
+    offers = ConditionalOffer.active.filter(
+        offer_type=ConditionalOffer.SITE,
+        affects_cosmetic_pricing=True,
+    ).select_related("condition", "condition__range", "benefit", "benefit__range")
+    ranges = get_offer_ranges(offers)
+    standard_range_ids = [
+        rng.pk
+        for rng in ranges
+        if not rng.proxy_class and not rng.includes_all_products
+    ]
+    if standard_range_ids:
+        yield from (
+            RangeProductSet.objects.filter(range_id__in=standard_range_ids)
+            .order_by("product_id")
+            .values_list("product_id", flat=True)
+            .distinct()
+            .iterator()
+        )
+    # Ranges which can't use the materialized view
+    for rng in ranges:
+        if rng.proxy_class or rng.includes_all_products:
+            yield from (
+                rng.all_products()
+                .order_by("pk")
+                .values_list("pk", flat=True)
+                .iterator()
+            )
+
+
+def get_cosmetic_price_warming_priority() -> list[int]:
+    """
+    Get the IDs of the products whose cosmetic prices should be warmed first, using the function
+    named by the ``BLUELIGHT_COSMETIC_PRICE_WARMING_PRIORITY_FUNC`` setting.
+    """
+    func_path: str | None = getattr(
+        settings, "BLUELIGHT_COSMETIC_PRICE_WARMING_PRIORITY_FUNC", None
+    )
+    if not func_path:
+        return []
+    func: Callable[[], Sequence[int]] = import_string(func_path)
+    return list(func())
+
+
+def queue_cosmetic_price_cache_warming(product_ids: list[int] | None = None) -> None:
+    """
+    Queue a warm-up of the cosmetic price cache, if enabled.
+
+    Should be called after ``pricing_cache_ns`` (or, if ``product_ids`` is given, the
+    ``product_pricing_ns`` of those products) is invalidated and that invalidation has been
+    committed.
+    """
+    if not getattr(settings, "BLUELIGHT_COSMETIC_PRICE_WARMING_ENABLED", False):
+        return
+    if product_ids is not None:
+        warm_cosmetic_price_cache.enqueue(
+            namespace_version=pricing_cache_ns.value,
+            product_ids=product_ids,
+        )
+        return
+    warm_cosmetic_price_cache.enqueue(
+        namespace_version=pricing_cache_ns.value,
+        priority_product_ids=get_cosmetic_price_warming_priority(),
+    )
+
+
+@task()
+def warm_cosmetic_price_cache(
+    namespace_version: int | None = None,
+    priority_product_ids: list[int] | None = None,
+    product_ids: list[int] | None = None,
+) -> None:
+    """
+    Pre-compute the cosmetic prices of the products in the ranges of cosmetic-affecting offers.
+
+    Products listed in ``priority_product_ids`` are warmed first. If ``product_ids`` is given, only
+    those products are warmed (whether or not any cosmetic-affecting offer applies to them). If ``namespace_version`` is given
+    and the pricing cache has been invalidated again since, the task is skipped in favor of the
+    task queued by that later invalidation.
+    """
+    if namespace_version is not None and namespace_version != pricing_cache_ns.value:
+        logger.info("Skipping stale cosmetic price cache warm-up")
+        return
+
+    Product = get_model("catalogue", "Product")
+    Selector = get_class("partner.strategy", "Selector")
+    strategy = Selector().strategy()
+    applicator = Applicator()
+    chunk_size: int = getattr(
+        settings, "BLUELIGHT_COSMETIC_PRICE_WARMING_CHUNK_SIZE", 100
+    )
+
+    def _iter_product_ids() -> Iterator[int]:
+        if product_ids is not None:
+            yield from dict.fromkeys(product_ids)
+            return
+        seen: set[int] = set()
+        for product_id in priority_product_ids or []:
+            if product_id not in seen:
+                seen.add(product_id)
+                yield product_id
+        for product_id in _get_cosmetic_product_ids():
+            if product_id not in seen:
+                seen.add(product_id)
+                yield product_id
+
+    num_products = 0
+    for chunk in batched(_iter_product_ids(), chunk_size):
+        # Stop early if the prices we're calculating have already been invalidated
+        if (
+            namespace_version is not None
+            and namespace_version != pricing_cache_ns.value
+        ):
+            logger.info("Pricing cache invalidated during warm-up. Stopping.")
+            break
+        products = Product.objects.filter(pk__in=chunk).prefetch_related("stockrecords")
+        # Skip anything which can't be added to a basket (e.g. parent products)
+        priceable = []
+        for product in products:
+            info = strategy.fetch_for_product(product)
+            if info.price.exists and info.stockrecord is not None:
+                priceable.append(product)
+        try:
+            applicator.get_cosmetic_prices(strategy, priceable)
+        except Exception:
+            logger.exception("Failed to warm cosmetic prices for products %s", chunk)
+            continue
+        num_products += len(priceable)
+    logger.info("Warmed cosmetic prices for %d products", num_products)
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Iterable, Sequence
 from decimal import Decimal
 from typing import TYPE_CHECKING
 
 from django.utils.translation import gettext_lazy as _
 from oscar.templatetags.currency_filters import currency
 
+from .membership import get_range_membership
 from .utils import human_readable_conjoin
 
 if TYPE_CHECKING:
@@ -30,6 +32,14 @@ class OfferUpsell:
     def is_relevant_to_product(self, product: Product) -> bool:
         return False
 
+    def get_relevant_ranges(self) -> list[Range] | None:
+        """
+        Return the ranges whose products this upsell is relevant to, or ``None`` if relevance
+        can't be described by ranges (in which case ``is_relevant_to_product`` is used instead).
+        Subclasses which override ``is_relevant_to_product`` should override this too.
+        """
+        return None
+
     def get_cta_text(self) -> StrOrPromise:
         context = self.get_summary_tmpl_context()
         return self.get_cta_tmpl() % context
@@ -74,6 +84,9 @@ class SimpleUpsell(OfferUpsell):
     def is_relevant_to_product(self, product: Product) -> bool:
         return self.product_range.contains_product(product)
 
+    def get_relevant_ranges(self) -> list[Range] | None:
+        return [self.product_range]
+
     def get_summary_tmpl_context(self) -> dict[str, str | Decimal]:
         ctx = super().get_summary_tmpl_context()
         ctx["range"] = self.product_range.name
@@ -146,9 +159,103 @@ class CompoundUpsell(OfferUpsell):
                 return True
         return False
 
+    def get_relevant_ranges(self) -> list[Range] | None:
+        ranges: list[Range] = []
+        for upsell in self.subupsells:
+            subranges = upsell.get_relevant_ranges()
+            if subranges is None:
+                return None
+            ranges += subranges
+        return ranges
+
     def get_summary(self) -> StrOrPromise:
         ctas = [upsell.get_cta_text() for upsell in self.subupsells]
         return _("%(cta)s %(reward)s") % {
             "cta": human_readable_conjoin(self.conjunction, ctas),
             "reward": self.get_reward_text(),
         }
+
+
+class UpsellRelevance:
+    """
+    Resolves which of a basket's products each offer upsell is relevant to.
+
+    Instead of checking every upsell against every product (i.e. a range membership lookup per
+    basket line and upsell), the membership of the basket's products in every range the upsells
+    need is looked up in bulk with ``Range.contains_products_bulk``, and reused for each upsell.
+    ``get_candidate_ranges``, if given, is called the first time membership is needed, to
+    resolve every range that upsells might need up-front (e.g. the ranges of every offer being
+    applied).
+    """
+
+    def __init__(
+        self,
+        products: Iterable[Product],
+        get_candidate_ranges: Callable[[], Iterable[Range]] | None = None,
+    ):
+        self.products: dict[int, Product] = {
+            product.pk: product for product in products
+        }
+        self._get_candidate_ranges = get_candidate_ranges
+        # Range ID -> IDs of the basket products in the range
+        self._range_product_ids: dict[int, set[int]] = {}
+
+    def _resolve(self, ranges: Sequence[Range]) -> None:
+        from .models import Range
+
+        if all(rng.pk in self._range_product_ids for rng in ranges):
+            return
+        if self._get_candidate_ranges is not None:
+            ranges = [*ranges, *self._get_candidate_ranges()]
+            self._get_candidate_ranges = None
+        unresolved = {
+            rng.pk: rng for rng in ranges if rng.pk not in self._range_product_ids
+        }
+        for range_id in unresolved:
+            self._range_product_ids[range_id] = set()
+        # Ranges covered by the active membership snapshot don't need a query
+        snapshot = get_range_membership()
+        if snapshot is not None and snapshot.product_ids.issuperset(self.products):
+            for range_id in [r for r in unresolved if r in snapshot.range_ids]:
+                del unresolved[range_id]
+                self._range_product_ids[range_id] = {
+                    product_id
+                    for product_id in self.products
+                    if snapshot.contains(range_id, product_id)
+                }
+        if not unresolved:
+            return
+        membership = Range.contains_products_bulk(
+            self.products.values(), unresolved.values()
+        )
+        for product_id, range_ids in membership.items():
+            for range_id in range_ids:
+                if range_id in unresolved:
+                    self._range_product_ids[range_id].add(product_id)
+
+    def prefetch(self, upsells: Iterable[OfferUpsell]) -> None:
+        """
+        Resolve the membership of the basket's products in the ranges of all the given upsells
+        at once.
+        """
+        ranges: list[Range] = []
+        for upsell in upsells:
+            ranges += upsell.get_relevant_ranges() or []
+        self._resolve(ranges)
+
+    def get_relevant_product_ids(self, upsell: OfferUpsell) -> set[int]:
+        """
+        Return the IDs of the basket products the given upsell is relevant to.
+        """
+        ranges = upsell.get_relevant_ranges()
+        if ranges is None:
+            return {
+                product_id
+                for product_id, product in self.products.items()
+                if upsell.is_relevant_to_product(product)
+            }
+        self._resolve(ranges)
+        product_ids: set[int] = set()
+        for rng in ranges:
+            product_ids |= self._range_product_ids[rng.pk]
+        return product_ids
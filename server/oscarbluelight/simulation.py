@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any
+import itertools
+
+from oscar.apps.basket.abstract_models import AbstractBasket as OscarAbstractBasket
+from oscar.core.loading import get_model
+
+from .mixins import BluelightBasketLineMixin, BluelightBasketMixin
+from .offer.results import OfferApplications
+
+if TYPE_CHECKING:
+    from oscar.apps.basket.models import Line
+    from oscar.apps.catalogue.models import Product
+    from oscar.apps.partner.strategy import Base as BaseStrategy
+
+
+class SimulatedBasket(BluelightBasketMixin):
+    """
+    In-memory stand-in for a ``Basket``, used to price products without touching the database.
+
+    Supports the subset of the basket API which offer application relies on: ``all_lines``,
+    ``add_product``, the ``total_*`` properties, and the offer upsell methods of
+    :class:`BluelightBasketMixin <oscarbluelight.mixins.BluelightBasketMixin>`. Lines are unsaved
+    instances of the project's ``basket.Line`` model, given synthetic (negative) primary keys so
+    that they can be told apart, hashed, and never collide with real rows. Since simulated lines
+    aren't attached to a ``Basket`` row, their purchase info is fetched from the strategy up-front
+    rather than via ``line.basket.strategy``.
+    """
+
+    id: None = None
+    pk: None = None
+    owner: None = None
+
+    # Borrow Oscar's implementations for everything which is derived purely from the lines.
+    _get_total = OscarAbstractBasket._get_total
+    _create_line_reference = OscarAbstractBasket._create_line_reference
+    get_stock_info = OscarAbstractBasket.get_stock_info
+    total_excl_tax = OscarAbstractBasket.total_excl_tax
+    total_tax = OscarAbstractBasket.total_tax
+    total_incl_tax = OscarAbstractBasket.total_incl_tax
+    total_incl_tax_excl_discounts = OscarAbstractBasket.total_incl_tax_excl_discounts
+    total_excl_tax_excl_discounts = OscarAbstractBasket.total_excl_tax_excl_discounts
+    total_discount = OscarAbstractBasket.total_discount
+    offer_discounts = OscarAbstractBasket.offer_discounts
+    voucher_discounts = OscarAbstractBasket.voucher_discounts
+    has_shipping_discounts = OscarAbstractBasket.has_shipping_discounts
+    shipping_discounts = OscarAbstractBasket.shipping_discounts
+    post_order_actions = OscarAbstractBasket.post_order_actions
+    num_items = OscarAbstractBasket.num_items
+    num_items_without_discount = OscarAbstractBasket.num_items_without_discount
+    num_items_with_discount = OscarAbstractBasket.num_items_with_discount
+    currency = OscarAbstractBasket.currency
+    applied_offers = OscarAbstractBasket.applied_offers
+
+    def __init__(self, strategy: BaseStrategy) -> None:
+        self.strategy = strategy
+        self.offer_applications = OfferApplications()
+        self._lines: list[Line] = []
+        self._line_ids = itertools.count(-1, -1)
+
+    def __str__(self) -> str:
+        return f"Simulated basket (lines: {self.num_lines})"
+
+    def all_lines(self) -> Sequence[Line]:
+        return self._lines
+
+    @property
+    def is_empty(self) -> bool:
+        return self.num_lines == 0
+
+    @property
+    def is_tax_known(self) -> bool:
+        return (not self.is_empty) and all(
+            line.is_tax_known for line in self.all_lines()
+        )
+
+    @property
+    def num_lines(self) -> int:
+        return len(self._lines)
+
+    def add_product(
+        self,
+        product: Product,
+        quantity: int = 1,
+        options: Sequence[dict[str, Any]] | None = None,
+    ) -> tuple[Line, bool]:
+        """
+        Add a product to the basket. Mirrors ``AbstractBasket.add_product``, minus the writes.
+
+        Returns (line, created).
+        """
+        if options:
+            raise ValueError("Simulated baskets don't support product options")
+
+        price_currency = self.currency
+        stock_info = self.get_stock_info(product, [])
+        if not stock_info.price.exists:
+            raise ValueError(f"Strategy hasn't found a price for product {product}")
+        if price_currency and stock_info.price.currency != price_currency:
+            raise ValueError(
+                "Basket lines must all have the same currency. Proposed line has currency "
+                f"{stock_info.price.currency}, while basket has currency {price_currency}"
+            )
+        if stock_info.stockrecord is None:
+            raise ValueError(
+                "Basket lines must all have stock records. Strategy hasn't found any stock "
+                f"record for product {product}"
+            )
+
+        line_ref = self._create_line_reference(product, stock_info.stockrecord, [])
+        for line in self._lines:
+            if line.line_reference == line_ref:
+                line.quantity = max(0, line.quantity + quantity)
+                self.reset_offer_applications()
+                return line, False
+
+        LineModel: type[Line] = get_model("basket", "Line")
+        line = LineModel(
+            id=next(self._line_ids),
+            line_reference=line_ref,
+            product=product,
+            stockrecord=stock_info.stockrecord,
+            quantity=max(0, quantity),
+            price_excl_tax=stock_info.price.excl_tax,
+            price_currency=stock_info.price.currency,
+            tax_code=stock_info.price.tax_code,
+        )
+        if stock_info.price.is_tax_known:
+            line.price_incl_tax = stock_info.price.incl_tax
+        self._lines.append(line)
+        self.reset_offer_applications()
+        return line, True
+
+    add = add_product
+
+    def reset_offer_applications(self) -> None:
+        """
+        Remove any discounts so they get recalculated. A real basket does this by reloading its lines
+        from the database, so we reset the in-memory lines to that same state.
+        """
+        self.offer_applications = OfferApplications()
+        for line in self._lines:
+            line.clear_discount()
+            if isinstance(line, BluelightBasketLineMixin):
+                line.clear_offer_upsells()
+            line._info = self.strategy.fetch_for_line(line, line.stockrecord)  # type: ignore[attr-defined]  # Oscar caches purchase info on this private attribute
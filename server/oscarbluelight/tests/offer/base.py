@@ -13,10 +13,11 @@ class BaseTest(TransactionTestCase):
         conn = get_redis_connection("redis")
         conn.flushall()
 
-    def _build_basket(self, item_price=D("10.00"), item_quantity=5):
+    def _build_basket(self, item_price=D("10.00"), item_quantity=5, product=None):
         basket = create_basket(empty=True)
-        product = create_product()
-        create_stockrecord(product, item_price, num_in_stock=item_quantity * 2)
+        if product is None:
+            product = create_product()
+            create_stockrecord(product, item_price, num_in_stock=item_quantity * 2)
         basket.add_product(product, quantity=item_quantity)
         return basket
 
@@ -41,6 +42,54 @@ class BaseTest(TransactionTestCase):
         offer.save()
         return offer
 
+    def _create_offer(
+        self,
+        condition_cls,
+        condition_value,
+        benefit_cls,
+        benefit_value,
+        rng=None,
+        max_affected_items=None,
+        **kwargs,
+    ):
+        # Condition and benefit both use the given range, or else ``self.range``
+        rng = rng or self.range
+        condition = Condition.objects.create(
+            proxy_class=condition_cls,
+            value=condition_value,
+            range=rng,
+        )
+        benefit = Benefit.objects.create(
+            proxy_class=benefit_cls,
+            value=benefit_value,
+            range=rng,
+            max_affected_items=max_affected_items,
+        )
+        kwargs.setdefault("name", f"{condition_value} / {benefit_value}")
+        kwargs.setdefault("offer_type", ConditionalOffer.SITE)
+        return ConditionalOffer.objects.create(
+            condition=condition,
+            benefit=benefit,
+            **kwargs,
+        )
+
+    def _get_summary(self, basket, with_index=False):
+        line = basket.all_lines()[0]
+        return {
+            "total_excl_tax": basket.total_excl_tax,
+            "applications": [
+                (a["offer"].pk, a["discount"], a["freq"])
+                + ((a["index"],) if with_index else ())
+                for a in basket.offer_applications
+            ],
+            "discount_descriptions": line.get_discount_descriptions(),
+            "price_breakdown": line.get_price_breakdown(),
+            "quantity_with_discount": line.quantity_with_discount,
+            "upsells": [
+                (u.offer.pk, str(u.get_summary())) for u in basket.get_offer_upsells()
+            ],
+        }
+
     def assertLineConsumption(
         self,
         line,
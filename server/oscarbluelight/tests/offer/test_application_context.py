@@ -0,0 +1,107 @@
+from decimal import Decimal as D
+from unittest import mock
+
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.conditions import BluelightCountCondition
+from oscarbluelight.offer.context import (
+    ApplicationContext,
+    get_application_context,
+    use_application_context,
+)
+from oscarbluelight.offer.models import (
+    Benefit,
+    Condition,
+    ConditionalOffer,
+    Range,
+)
+
+from .base import BaseTest
+
+
+class ApplicationContextTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.product = create_product()
+        create_stockrecord(self.product, D("10.00"), num_in_stock=100)
+        self.range = Range.objects.create(name="Stuff")
+        self.range.add_product(self.product)
+        self.condition = Condition.objects.create(
+            proxy_class="oscarbluelight.offer.conditions.BluelightCountCondition",
+            value=3,
+            range=self.range,
+        )
+        benefit = Benefit.objects.create(
+            proxy_class="oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            value=10,
+            range=self.range,
+        )
+        self.offer = ConditionalOffer.objects.create(
+            name="Buy 3, get 10% off",
+            offer_type=ConditionalOffer.SITE,
+            condition=self.condition,
+            benefit=benefit,
+        )
+        self.basket = create_basket(empty=True)
+        self.basket.add_product(self.product, quantity=2)
+        self.basket.reset_offer_applications()
+        self.line = self.basket.all_lines()[0]
+
+    def test_no_context_by_default(self):
+        self.assertIsNone(get_application_context())
+
+    def test_range_matches_memoized(self):
+        rng = Range.objects.get(pk=self.range.pk)
+        with mock.patch.object(
+            Range,
+            "_contains_product",
+            autospec=True,
+            return_value=True,
+        ) as contains_product:
+            with use_application_context(ApplicationContext()):
+                self.assertTrue(rng.contains_product(self.product))
+                self.assertTrue(rng.contains_product(self.product))
+                self.assertEqual(contains_product.call_count, 1)
+            # Discarded once the context exits
+            self.assertTrue(rng.contains_product(self.product))
+            self.assertEqual(contains_product.call_count, 2)
+
+    def test_unit_prices_memoized_per_offer_group(self):
+        context = ApplicationContext()
+        with mock.patch(
+            "oscarbluelight.offer.context.unit_price",
+            return_value=D("10.00"),
+        ) as unit_price:
+            context.get_unit_price(self.offer, self.line)
+            context.get_unit_price(self.offer, self.line)
+            self.assertEqual(unit_price.call_count, 1)
+            context.begin_offer_group_application()
+            context.get_unit_price(self.offer, self.line)
+            self.assertEqual(unit_price.call_count, 2)
+
+    def test_num_matches_invalidated_by_consumption(self):
+        condition = self.condition.proxy()
+        with use_application_context(ApplicationContext()):
+            self.assertEqual(condition._get_num_matches(self.basket, self.offer), 2)
+            with mock.patch.object(
+                BluelightCountCondition,
+                "can_apply_condition",
+            ) as can_apply_condition:
+                self.assertEqual(condition._get_num_matches(self.basket, self.offer), 2)
+            can_apply_condition.assert_not_called()
+            self.line.consume(1)
+            self.assertEqual(condition._get_num_matches(self.basket, self.offer), 1)
+
+    def test_upsells_not_stale_across_applications(self):
+        Applicator().apply_offers(self.basket, [self.offer])
+        self.assertEqual(
+            [u.delta for u in self.basket.get_offer_upsells()],
+            [D(1)],
+        )
+        self.basket.add_product(self.product, quantity=1)
+        self.basket.reset_offer_applications()
+        Applicator().apply_offers(self.basket, [self.offer])
+        self.assertEqual(self.basket.get_offer_upsells(), [])
+        self.assertEqual(self.basket.total_excl_tax, D("27.00"))
+        self.assertIsNone(get_application_context())
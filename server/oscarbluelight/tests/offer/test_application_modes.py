@@ -0,0 +1,140 @@
+from decimal import Decimal as D
+from unittest import mock
+
+from django.test import override_settings
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.models import (
+    ConditionalOffer,
+    Range,
+)
+from oscarbluelight.offer.modes import (
+    FULL_APPLICATION,
+    LEAN_APPLICATION,
+    ApplicationMode,
+    UpsellMode,
+)
+
+from .base import BaseTest
+
+LAZY_UPSELLS = ApplicationMode(upsells=UpsellMode.LAZY)
+
+
+class ApplicationModeTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.product = create_product()
+        create_stockrecord(self.product, D("10.00"), num_in_stock=100)
+        self.range = Range.objects.create(name="All", includes_all_products=True)
+        # $5 off when buying 3 or more. Applied first, and gives an upsell for smaller baskets.
+        self.offer_upsell = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            3,
+            "oscarbluelight.offer.benefits.BluelightAbsoluteDiscountBenefit",
+            5,
+            priority=10,
+        )
+        # 10% off everything. Consumes every item after the upsell offer is applied, so the upsell
+        # offer's upsell only exists if it's calculated right after applying that offer.
+        self.offer_discount = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            1,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            10,
+        )
+
+    def _apply(self, mode=None):
+        basket = self._build_basket(item_quantity=2, product=self.product)
+        applicator = Applicator()
+        if mode is None:
+            applicator.apply(basket)
+        else:
+            with applicator.application_mode(mode):
+                applicator.apply(basket)
+        return basket
+
+    def _patch_get_upsell_details(self):
+        return mock.patch.object(
+            ConditionalOffer,
+            "get_upsell_details",
+            autospec=True,
+            side_effect=ConditionalOffer.get_upsell_details,
+        )
+
+    def test_full_application(self):
+        summary = self._get_summary(self._apply(FULL_APPLICATION))
+        self.assertEqual(summary, self._get_summary(self._apply()))
+        self.assertEqual(summary["total_excl_tax"], D("18.00"))
+        self.assertEqual(len(summary["discount_descriptions"]), 1)
+        self.assertEqual(
+            [offer_id for offer_id, __ in summary["upsells"]],
+            [self.offer_upsell.pk],
+        )
+
+    def test_lean_application(self):
+        expected = self._get_summary(self._apply())
+        with self._patch_get_upsell_details() as get_upsell_details:
+            summary = self._get_summary(self._apply(LEAN_APPLICATION))
+        get_upsell_details.assert_not_called()
+        self.assertEqual(summary["upsells"], [])
+        self.assertEqual(summary["discount_descriptions"], [])
+        for key in (
+            "total_excl_tax",
+            "applications",
+            "price_breakdown",
+            "quantity_with_discount",
+        ):
+            self.assertEqual(summary[key], expected[key])
+
+    def test_lazy_upsells(self):
+        expected = self._get_summary(self._apply())
+        with self._patch_get_upsell_details() as get_upsell_details:
+            basket = self._apply(LAZY_UPSELLS)
+            get_upsell_details.assert_not_called()
+            summary = self._get_summary(basket)
+            self.assertEqual(get_upsell_details.call_count, 1)
+            # Reading the upsells again doesn't recalculate them
+            basket.get_offer_upsells()
+            self.assertEqual(get_upsell_details.call_count, 1)
+        self.assertEqual(summary, expected)
+        # Calculating the upsells leaves the basket as it was
+        self.assertEqual(basket.all_lines()[0].quantity_without_discount, 0)
+
+    def test_lazy_upsells_cleared(self):
+        basket = self._apply(LAZY_UPSELLS)
+        basket.clear_offer_upsells()
+        with self._patch_get_upsell_details() as get_upsell_details:
+            self.assertEqual(basket.get_offer_upsells(), [])
+        get_upsell_details.assert_not_called()
+
+    def test_application_mode_context(self):
+        applicator = Applicator()
+        with applicator.application_mode() as mode:
+            self.assertEqual(mode, LEAN_APPLICATION)
+            with applicator.application_mode(LAZY_UPSELLS):
+                self.assertEqual(applicator._application_mode, LAZY_UPSELLS)
+            self.assertEqual(applicator._application_mode, LEAN_APPLICATION)
+        self.assertEqual(applicator._application_mode, FULL_APPLICATION)
+
+    @override_settings(BLUELIGHT_BASKET_APPLICATION_CACHE_ENABLED=True)
+    def test_skips_basket_application_cache(self):
+        self._apply(LEAN_APPLICATION)
+        # The lean application wasn't cached, so the full application gets recalculated
+        summary = self._get_summary(self._apply())
+        self.assertEqual(len(summary["discount_descriptions"]), 1)
+        self.assertEqual(len(summary["upsells"]), 1)
+
+    def test_cosmetic_pricing(self):
+        basket = create_basket(empty=True)
+        price = Applicator().get_cosmetic_price(basket.strategy, self.product)
+        with (
+            override_settings(BLUELIGHT_COSMETIC_PRICING_LEAN_APPLICATION=True),
+            self._patch_get_upsell_details() as get_upsell_details,
+        ):
+            lean_price = Applicator()._calculate_cosmetic_prices(
+                basket.strategy, [self.product], 1
+            )[self.product.pk]
+        get_upsell_details.assert_not_called()
+        self.assertEqual(lean_price, price)
+        self.assertEqual(price, D("9.00"))
@@ -0,0 +1,130 @@
+from decimal import Decimal as D
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group, User
+from django.utils import timezone
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.models import (
+    ConditionalOffer,
+    Range,
+)
+from oscarbluelight.voucher.models import Voucher
+
+from .base import BaseTest
+
+
+class AsyncApplicatorTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username="bob", email="bob@example.com", password="foo"
+        )
+        customers = Group.objects.create(name="Customers")
+        self.user.groups.set([customers])
+
+        self.product = create_product()
+        create_stockrecord(self.product, D("10.00"), num_in_stock=100)
+        self.range = Range.objects.create(name="Products")
+        self.range.add_product(self.product)
+        self.all_products = Range.objects.create(name="All", includes_all_products=True)
+
+        # 10% off everything
+        self.site_offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            1,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            10,
+            rng=self.all_products,
+            name="Site offer",
+            offer_type=ConditionalOffer.SITE,
+        )
+        # 10% off for customers
+        self.user_offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            1,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            10,
+            rng=self.range,
+            name="User offer",
+            offer_type=ConditionalOffer.USER,
+        )
+        self.user_offer.groups.set([customers])
+        # 10% off with a voucher
+        self.voucher_offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            1,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            10,
+            rng=self.range,
+            name="Voucher offer",
+            offer_type=ConditionalOffer.VOUCHER,
+        )
+        self.voucher = Voucher.objects.create(
+            name="Test Voucher",
+            code="test-voucher",
+            usage=Voucher.MULTI_USE,
+            start_datetime=timezone.now(),
+            end_datetime=timezone.now() + timezone.timedelta(days=1),
+        )
+        self.voucher.offers.add(self.voucher_offer)
+
+    def _build_customer_basket(self):
+        basket = self._build_basket(item_quantity=2, product=self.product)
+        basket.owner = self.user
+        basket.save()
+        basket.vouchers.add(self.voucher)
+        basket.reset_offer_applications()
+        return basket
+
+    def _get_application_summary(self, basket):
+        return (
+            basket.total_excl_tax,
+            sorted(
+                (a["offer"].pk, a["discount"], a["freq"])
+                for a in basket.offer_applications
+            ),
+        )
+
+    def _apply(self):
+        basket = self._build_customer_basket()
+        Applicator().apply(basket, self.user)
+        return self._get_application_summary(basket)
+
+    async def test_aget_offers(self):
+        basket = await sync_to_async(self._build_customer_basket)()
+        applicator = Applicator()
+        offers = await applicator.aget_offers(basket, self.user)
+        self.assertEqual(
+            sorted(offer.pk for offer in offers),
+            sorted(
+                [self.site_offer.pk, self.user_offer.pk, self.voucher_offer.pk],
+            ),
+        )
+        expected = await sync_to_async(applicator.get_offers)(basket, self.user)
+        self.assertEqual(
+            [offer.pk for offer in offers],
+            [offer.pk for offer in expected],
+        )
+        voucher_offers = await applicator.aget_basket_offers(basket, self.user)
+        self.assertEqual(voucher_offers[0].get_voucher(), self.voucher)
+
+    async def test_aget_offers_anonymous(self):
+        basket = await sync_to_async(create_basket)(empty=True)
+        applicator = Applicator()
+        self.assertEqual(await applicator.aget_user_offers(None), [])
+        self.assertEqual(await applicator.aget_basket_offers(basket, None), [])
+        self.assertEqual(
+            [offer.pk for offer in await applicator.aget_site_offers()],
+            [self.site_offer.pk],
+        )
+
+    async def test_aapply(self):
+        expected = await sync_to_async(self._apply)()
+        self.assertEqual(expected[0], D("18.00"))
+        self.assertEqual(len(expected[1]), 1)
+        basket = await sync_to_async(self._build_customer_basket)()
+        await Applicator().aapply(basket, self.user)
+        summary = await sync_to_async(self._get_application_summary)(basket)
+        self.assertEqual(summary, expected)
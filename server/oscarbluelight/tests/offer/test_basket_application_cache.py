@@ -0,0 +1,119 @@
+from decimal import Decimal as D
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from oscar.test.factories import create_order, create_product, create_stockrecord
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.models import (
+    ConditionalOffer,
+    OfferGroup,
+    Range,
+)
+
+from .base import BaseTest
+
+
+@override_settings(BLUELIGHT_BASKET_APPLICATION_CACHE_ENABLED=True)
+class BasketApplicationCacheTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.product = create_product()
+        create_stockrecord(self.product, D("10.00"), num_in_stock=100)
+        self.range = Range.objects.create(name="All", includes_all_products=True)
+        # 10% off everything, applied first
+        self.offer_discount = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            1,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            10,
+        )
+        self.offer_discount.offer_group = OfferGroup.objects.create(
+            name="First", priority=10
+        )
+        self.offer_discount.save()
+        # $5 off when buying 3 or more. Gives an upsell for smaller baskets.
+        self.offer_upsell = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            3,
+            "oscarbluelight.offer.benefits.BluelightAbsoluteDiscountBenefit",
+            5,
+        )
+
+    def test_restores_cached_application(self):
+        basket = self._build_basket(item_quantity=2, product=self.product)
+        Applicator().apply(basket)
+        expected = self._get_summary(basket, with_index=True)
+        self.assertEqual(expected["total_excl_tax"], D("18.00"))
+        self.assertEqual(len(expected["upsells"]), 1)
+
+        # An identical basket gets the cached application
+        basket = self._build_basket(item_quantity=2, product=self.product)
+        with mock.patch.object(Applicator, "apply_offers") as apply_offers:
+            Applicator().apply(basket)
+        apply_offers.assert_not_called()
+        self.assertEqual(self._get_summary(basket, with_index=True), expected)
+        self.assertIs(basket.get_offer_upsells()[0].basket, basket)
+
+    def test_recalculates_when_basket_changes(self):
+        Applicator().apply(self._build_basket(item_quantity=2, product=self.product))
+        basket = self._build_basket(item_quantity=3, product=self.product)
+        with mock.patch.object(
+            Applicator, "apply_offers", wraps=Applicator().apply_offers
+        ) as apply_offers:
+            Applicator().apply(basket)
+        apply_offers.assert_called_once()
+        self.assertEqual(basket.total_excl_tax, D("22.00"))
+        self.assertEqual(basket.get_offer_upsells(), [])
+
+    def test_recalculates_when_offers_change(self):
+        Applicator().apply(self._build_basket(item_quantity=2, product=self.product))
+        self.offer_upsell.status = ConditionalOffer.SUSPENDED
+        self.offer_upsell.save()
+        basket = self._build_basket(item_quantity=2, product=self.product)
+        Applicator().apply(basket)
+        self.assertEqual(basket.total_excl_tax, D("18.00"))
+        self.assertEqual(basket.get_offer_upsells(), [])
+
+    def test_recalculates_when_offer_is_used_up(self):
+        user = User.objects.create_user(
+            username="bob", email="bob@example.com", password="foo"
+        )
+        self.offer_discount.max_user_applications = 1
+        self.offer_discount.save()
+        basket = self._build_basket(item_quantity=2, product=self.product)
+        basket.owner = user
+        basket.save()
+        Applicator().apply(basket, user)
+        self.assertEqual(basket.total_excl_tax, D("18.00"))
+
+        # Re-apply offers before the order's transaction commits, i.e. before recording the
+        # offer's usage invalidates any caches.
+        with mock.patch("django.db.transaction.on_commit"):
+            create_order(basket=basket, user=user)
+            basket = self._build_basket(item_quantity=2, product=self.product)
+            basket.owner = user
+            basket.save()
+            Applicator().apply(basket, user)
+        self.assertEqual(basket.total_excl_tax, D("20.00"))
+
+    def test_skips_system_offer_groups(self):
+        self.offer_discount.offer_group.is_system_group = True
+        self.offer_discount.offer_group.save()
+        Applicator().apply(self._build_basket(item_quantity=2, product=self.product))
+        basket = self._build_basket(item_quantity=2, product=self.product)
+        with mock.patch.object(
+            Applicator, "apply_offers", wraps=Applicator().apply_offers
+        ) as apply_offers:
+            Applicator().apply(basket)
+        apply_offers.assert_called_once()
+        self.assertEqual(basket.total_excl_tax, D("18.00"))
+
+    @override_settings(BLUELIGHT_BASKET_APPLICATION_CACHE_ENABLED=False)
+    def test_disabled(self):
+        Applicator().apply(self._build_basket(item_quantity=2, product=self.product))
+        basket = self._build_basket(item_quantity=2, product=self.product)
+        with mock.patch.object(Applicator, "apply_offers") as apply_offers:
+            Applicator().apply(basket)
+        apply_offers.assert_called_once()
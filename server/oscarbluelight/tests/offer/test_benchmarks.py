@@ -0,0 +1,76 @@
+from io import StringIO
+import json
+
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from django_redis import get_redis_connection
+
+from oscarbluelight.offer.applicator import pricing_cache_ns
+from oscarbluelight.offer.benchmarks import (
+    BenchmarkScenario,
+    get_scenarios,
+    run_scenario,
+)
+from oscarbluelight.offer.models import ConditionalOffer, OfferGroup, Range
+
+
+class BenchmarkTest(TransactionTestCase):
+    def setUp(self):
+        # Flush the cache
+        conn = get_redis_connection("redis")
+        conn.flushall()
+
+    def test_get_scenarios(self):
+        scenarios = get_scenarios([1, 5], [10], [1, 2], [0, 1, 2])
+        self.assertEqual(len(scenarios), 12)
+        self.assertEqual(scenarios[0], BenchmarkScenario(1, 10, 1, 0, 1))
+        self.assertEqual(scenarios[-1], BenchmarkScenario(5, 10, 2, 2, 1))
+
+    def test_run_scenario(self):
+        scenario = BenchmarkScenario(
+            num_lines=3,
+            num_offers=4,
+            num_groups=2,
+            condition_depth=2,
+            line_quantity=2,
+        )
+        namespace_version = pricing_cache_ns.value
+        result = run_scenario(scenario, repeat=2, warmup=0)
+        self.assertEqual(result["scenario"], scenario._asdict())
+        for name in ("apply_offers", "get_cosmetic_price", "get_price_breakdown"):
+            stats = result[name]
+            self.assertEqual(stats["runs"], 2)
+            self.assertLessEqual(stats["min_ms"], stats["max_ms"])
+        # The synthetic catalog is rolled back
+        self.assertFalse(ConditionalOffer.objects.exists())
+        self.assertFalse(
+            OfferGroup.objects.filter(name__startswith="Benchmark").exists()
+        )
+        self.assertFalse(Range.objects.filter(name__startswith="Benchmark").exists())
+        # The shared pricing cache namespace isn't invalidated
+        self.assertEqual(pricing_cache_ns.value, namespace_version)
+
+    @override_settings(DEBUG=False)
+    def test_command_requires_debug_or_force(self):
+        with self.assertRaises(CommandError):
+            call_command("bluelight_benchmark", lines=[1], offers=[1], verbosity=0)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command(
+            "bluelight_benchmark",
+            lines=[2],
+            offers=[3],
+            groups=[1],
+            depth=[0, 1],
+            repeat=1,
+            force=True,
+            verbosity=0,
+            stdout=stdout,
+        )
+        results = json.loads(stdout.getvalue())
+        self.assertEqual(results["format_version"], 1)
+        self.assertEqual(len(results["results"]), 2)
+        self.assertEqual(
+            [r["scenario"]["condition_depth"] for r in results["results"]], [0, 1]
+        )
@@ -0,0 +1,144 @@
+from decimal import Decimal as D
+from unittest import mock
+
+from django.test import override_settings
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.constants import Conjunction
+from oscarbluelight.offer.evaluation import (
+    MIN_OBSERVATIONS,
+    clear_condition_evaluation_stats,
+    get_condition_evaluation_stats,
+    order_for_evaluation,
+)
+from oscarbluelight.offer.models import (
+    Benefit,
+    BluelightCountCondition,
+    BluelightValueCondition,
+    CompoundCondition,
+    Condition,
+    ConditionalOffer,
+    Range,
+)
+
+from .base import BaseTest
+
+
+class CompoundConditionEvaluationTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        clear_condition_evaluation_stats()
+        self.addCleanup(clear_condition_evaluation_stats)
+        self.range = Range.objects.create(name="All", includes_all_products=True)
+
+    def _build_offer(self, conjunction, value, count):
+        # The value condition is created first, so it's the compound's first child
+        cond_value = Condition.objects.create(
+            proxy_class="oscarbluelight.offer.conditions.BluelightValueCondition",
+            value=value,
+            range=self.range,
+        )
+        cond_count = Condition.objects.create(
+            proxy_class="oscarbluelight.offer.conditions.BluelightCountCondition",
+            value=count,
+            range=self.range,
+        )
+        condition = CompoundCondition.objects.create(conjunction=conjunction)
+        condition.subconditions.set([cond_value, cond_count])
+        benefit = Benefit.objects.create(
+            proxy_class="oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            value=10,
+            range=self.range,
+        )
+        return ConditionalOffer.objects.create(
+            name="Compound",
+            offer_type=ConditionalOffer.SITE,
+            condition=condition,
+            benefit=benefit,
+        )
+
+    def _patch_is_satisfied(self, Klass):
+        return mock.patch.object(
+            Klass,
+            "is_satisfied",
+            autospec=True,
+            side_effect=Klass.is_satisfied,
+        )
+
+    def _is_satisfied(self, offer, basket):
+        with (
+            self._patch_is_satisfied(BluelightValueCondition) as value_satisfied,
+            self._patch_is_satisfied(BluelightCountCondition) as count_satisfied,
+        ):
+            result = offer.condition.proxy().is_satisfied(offer, basket)
+        return result, value_satisfied.call_count, count_satisfied.call_count
+
+    def test_evaluates_every_child_by_default(self):
+        offer = self._build_offer(Conjunction.AND, D("100.00"), 1)
+        basket = self._build_basket(item_quantity=1)
+        self.assertEqual(self._is_satisfied(offer, basket), (False, 1, 1))
+
+    @override_settings(BLUELIGHT_COMPOUND_CONDITION_SHORT_CIRCUIT=True)
+    def test_short_circuit_and(self):
+        offer = self._build_offer(Conjunction.AND, D("100.00"), 1)
+        basket = self._build_basket(item_quantity=1)
+        self.assertEqual(self._is_satisfied(offer, basket), (False, 1, 0))
+
+    @override_settings(BLUELIGHT_COMPOUND_CONDITION_SHORT_CIRCUIT=True)
+    def test_short_circuit_or(self):
+        offer = self._build_offer(Conjunction.OR, D("5.00"), 100)
+        basket = self._build_basket(item_quantity=1)
+        self.assertEqual(self._is_satisfied(offer, basket), (True, 1, 0))
+
+    @override_settings(
+        BLUELIGHT_COMPOUND_CONDITION_SHORT_CIRCUIT=True,
+        BLUELIGHT_COMPOUND_CONDITION_ADAPTIVE_ORDER=True,
+    )
+    def test_adaptive_order_checks_cheap_conditions_first(self):
+        offer = self._build_offer(Conjunction.AND, D("5.00"), 100)
+        basket = self._build_basket(item_quantity=1)
+        self.assertEqual(self._is_satisfied(offer, basket), (False, 0, 1))
+        children = offer.condition.proxy().children
+        stats = get_condition_evaluation_stats(children[1].proxy(), "is_satisfied")
+        self.assertEqual(stats.num_evaluations, 1)
+        self.assertEqual(stats.num_satisfied, 0)
+
+    def test_order_for_evaluation_uses_observations(self):
+        offer = self._build_offer(Conjunction.AND, D("5.00"), 1)
+        cond_value, cond_count = [c.proxy() for c in offer.condition.proxy().children]
+        self.assertEqual(
+            order_for_evaluation([cond_value, cond_count], Conjunction.AND, "x"),
+            [cond_count, cond_value],
+        )
+        # The count condition is cheap, but always satisfied, while the value condition
+        # usually decides the AND.
+        for __ in range(MIN_OBSERVATIONS):
+            get_condition_evaluation_stats(cond_count, "x").record(0.001, True)
+            get_condition_evaluation_stats(cond_value, "x").record(0.002, False)
+        self.assertEqual(
+            order_for_evaluation([cond_value, cond_count], Conjunction.AND, "x"),
+            [cond_value, cond_count],
+        )
+        self.assertEqual(
+            order_for_evaluation([cond_value, cond_count], Conjunction.OR, "x"),
+            [cond_count, cond_value],
+        )
+
+    def test_same_discounts_in_every_mode(self):
+        offer = self._build_offer(Conjunction.AND, D("20.00"), 2)
+        totals = []
+        for short_circuit, adaptive_order in (
+            (False, False),
+            (True, False),
+            (True, True),
+        ):
+            with override_settings(
+                BLUELIGHT_COMPOUND_CONDITION_SHORT_CIRCUIT=short_circuit,
+                BLUELIGHT_COMPOUND_CONDITION_ADAPTIVE_ORDER=adaptive_order,
+            ):
+                basket = self._build_basket(item_quantity=3)
+                Applicator().apply_offers(basket, [offer])
+                totals.append(
+                    (basket.total_excl_tax, basket.num_items_without_discount)
+                )
+        self.assertEqual(totals, [(D("27.00"), 0)] * 3)
@@ -0,0 +1,127 @@
+from decimal import Decimal as D
+
+from django.test import TransactionTestCase, override_settings
+from django_redis import get_redis_connection
+
+from oscarbluelight.offer.catalog import clear_offer_catalog, get_offer_catalog
+from oscarbluelight.offer.compound import (
+    compile_compound_benefits,
+    compile_compound_conditions,
+)
+from oscarbluelight.offer.constants import Conjunction
+from oscarbluelight.offer.models import (
+    BluelightAbsoluteDiscountBenefit,
+    BluelightCountCondition,
+    BluelightPercentageDiscountBenefit,
+    BluelightValueCondition,
+    CompoundBenefit,
+    CompoundCondition,
+    ConditionalOffer,
+    Range,
+)
+
+
+@override_settings(BLUELIGHT_OFFER_CATALOG_ENABLED=True)
+class CompoundTreeTest(TransactionTestCase):
+    def setUp(self):
+        # Flush the cache
+        conn = get_redis_connection("redis")
+        conn.flushall()
+        clear_offer_catalog()
+        self.addCleanup(clear_offer_catalog)
+
+        self.range = Range.objects.create(name="All", includes_all_products=True)
+        self.cond_count = BluelightCountCondition.objects.create(
+            range=self.range,
+            proxy_class="oscarbluelight.offer.conditions.BluelightCountCondition",
+            value=2,
+        )
+        self.cond_value = BluelightValueCondition.objects.create(
+            range=self.range,
+            proxy_class="oscarbluelight.offer.conditions.BluelightValueCondition",
+            value=D("50.00"),
+        )
+        self.cond_single = BluelightCountCondition.objects.create(
+            range=self.range,
+            proxy_class="oscarbluelight.offer.conditions.BluelightCountCondition",
+            value=1,
+        )
+        # (2 items OR $50) AND 1 item
+        self.cond_inner = CompoundCondition.objects.create(conjunction=Conjunction.OR)
+        self.cond_inner.subconditions.set([self.cond_count, self.cond_value])
+        self.cond_outer = CompoundCondition.objects.create(conjunction=Conjunction.AND)
+        self.cond_outer.subconditions.set([self.cond_inner, self.cond_single])
+
+        self.benefit_small = BluelightAbsoluteDiscountBenefit.objects.create(
+            range=self.range,
+            proxy_class="oscarbluelight.offer.benefits.BluelightAbsoluteDiscountBenefit",
+            value=D("5.00"),
+        )
+        self.benefit_large = BluelightPercentageDiscountBenefit.objects.create(
+            range=self.range,
+            proxy_class="oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            value=D("20.00"),
+        )
+        self.benefit_inner = CompoundBenefit.objects.create(conjunction=Conjunction.OR)
+        self.benefit_inner.subbenefits.set([self.benefit_small, self.benefit_large])
+        self.benefit_outer = CompoundBenefit.objects.create()
+        self.benefit_outer.subbenefits.set([self.benefit_inner])
+
+        self.offer = ConditionalOffer.objects.create(
+            name="Compound",
+            offer_type=ConditionalOffer.SITE,
+            condition=self.cond_outer,
+            benefit=self.benefit_outer,
+        )
+
+    def _get_tree(self, obj):
+        children = [child.proxy() for child in getattr(obj, "children", [])]
+        return [
+            (child.pk, type(child).__name__, self._get_tree(child))
+            for child in children
+        ]
+
+    def test_compiled_trees_match_queried_trees(self):
+        condition = CompoundCondition.objects.get(pk=self.cond_outer.pk)
+        benefit = CompoundBenefit.objects.get(pk=self.benefit_outer.pk)
+        expected_condition_tree = self._get_tree(condition)
+        expected_benefit_tree = self._get_tree(benefit)
+        # Sub-benefits are ordered by value, descending
+        self.assertEqual(
+            [pk for pk, __, __ in expected_benefit_tree[0][2]],
+            [self.benefit_large.pk, self.benefit_small.pk],
+        )
+
+        condition = CompoundCondition.objects.get(pk=self.cond_outer.pk)
+        benefit = CompoundBenefit.objects.get(pk=self.benefit_outer.pk)
+        # One recursive query for the tree's edges, plus one to load its nodes
+        with self.assertNumQueries(2):
+            compile_compound_conditions([condition])
+        with self.assertNumQueries(2):
+            compile_compound_benefits([benefit])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._get_tree(condition), expected_condition_tree)
+            self.assertEqual(self._get_tree(benefit), expected_benefit_tree)
+
+    def test_catalog_offers_evaluate_without_queries(self):
+        offer = get_offer_catalog().get_offers()[0]
+        with self.assertNumQueries(0):
+            self.assertEqual(len(offer.condition.children), 2)
+            self.assertEqual(len(offer.benefit.children[0].children), 2)
+            offer.condition.name  # noqa: B018
+            offer.condition.description  # noqa: B018
+            offer.benefit.name  # noqa: B018
+            offer.benefit.description  # noqa: B018
+
+    def test_uncompiled_trees_still_load(self):
+        condition = CompoundCondition.objects.get(pk=self.cond_outer.pk)
+        self.assertIsNone(condition._compiled_node)
+        self.assertEqual(
+            [child.pk for child in condition.children],
+            [self.cond_inner.pk, self.cond_single.pk],
+        )
+
+    def test_no_compounds(self):
+        with self.assertNumQueries(0):
+            compile_compound_conditions([self.cond_count, self.cond_single])
+            compile_compound_benefits([])
@@ -1,14 +1,23 @@
 from decimal import Decimal as D
+from unittest import mock
 
-from django.test import TransactionTestCase
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django_redis import get_redis_connection
+from oscar.core.loading import get_model
 from oscar.test.factories import create_basket, create_product, create_stockrecord
 
-from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.applicator import Applicator, pricing_cache_ns
 from oscarbluelight.offer.models import Benefit, Condition, ConditionalOffer, Range
+from oscarbluelight.offer.tasks import warm_cosmetic_price_cache
 
+Basket = get_model("basket", "Basket")
+Category = get_model("catalogue", "Category")
+ProductCategory = get_model("catalogue", "ProductCategory")
 
-class CosmeticPricingCalculationTest(TransactionTestCase):
+
+class BaseCosmeticPricingTest(TransactionTestCase):
     def setUp(self):
         # Flush the cache
         conn = get_redis_connection("redis")
@@ -44,6 +53,8 @@ class CosmeticPricingCalculationTest(TransactionTestCase):
 
         self.basket = create_basket(empty=True)
 
+
+class CosmeticPricingCalculationTest(BaseCosmeticPricingTest):
     def test_calculate_cosmetic_price(self):
         # Cosmetic price should reflect discount
         cosmetic_price = Applicator().get_cosmetic_price(
@@ -76,3 +87,187 @@ class CosmeticPricingCalculationTest(TransactionTestCase):
             self.basket.strategy, self.product_main, quantity=1
         )
         self.assertEqual(cosmetic_price, D("3500.00"))
+
+    def test_calculate_cosmetic_prices_in_bulk(self):
+        product_other = create_product(product_class="Stuff")
+        create_stockrecord(product_other, D("100.00"), num_in_stock=100)
+        prices = Applicator().get_cosmetic_prices(
+            self.basket.strategy, [self.product_main, product_other], quantity=1
+        )
+        self.assertEqual(
+            prices,
+            {
+                self.product_main.pk: D("4500.00"),
+                product_other.pk: D("100.00"),
+            },
+        )
+
+        # Prices should now be served from the cache without any DB queries
+        with self.assertNumQueries(0):
+            prices = Applicator().get_cosmetic_prices(
+                self.basket.strategy, [self.product_main, product_other], quantity=1
+            )
+        self.assertEqual(prices[self.product_main.pk], D("4500.00"))
+        self.assertEqual(prices[product_other.pk], D("100.00"))
+
+        # Single product lookups share the same cache
+        with self.assertNumQueries(0):
+            cosmetic_price = Applicator().get_cosmetic_price(
+                self.basket.strategy, self.product_main, quantity=1
+            )
+        self.assertEqual(cosmetic_price, D("4500.00"))
+
+    def test_calculate_cosmetic_prices_for_no_products(self):
+        prices = Applicator().get_cosmetic_prices(self.basket.strategy, [])
+        self.assertEqual(prices, {})
+
+    def test_calculate_cosmetic_price_does_not_write(self):
+        num_baskets = Basket.objects.count()
+        with CaptureQueriesContext(connection) as ctx:
+            cosmetic_price = Applicator().get_cosmetic_price(
+                self.basket.strategy, self.product_main, quantity=1
+            )
+        self.assertEqual(cosmetic_price, D("4500.00"))
+        self.assertEqual(Basket.objects.count(), num_baskets)
+        for query in ctx.captured_queries:
+            self.assertTrue(
+                query["sql"].lstrip().upper().startswith("SELECT"), query["sql"]
+            )
+
+
+class CosmeticPriceCacheWarmingTest(BaseCosmeticPricingTest):
+    def setUp(self):
+        super().setUp()
+        self.product_other = create_product(product_class="Stuff")
+        create_stockrecord(self.product_other, D("100.00"), num_in_stock=100)
+
+    def _assert_cached(self, product, expected_price):
+        with self.assertNumQueries(0):
+            cosmetic_price = Applicator().get_cosmetic_price(
+                self.basket.strategy, product, quantity=1
+            )
+        self.assertEqual(cosmetic_price, expected_price)
+
+    def test_warm_cosmetic_price_cache(self):
+        warm_cosmetic_price_cache.enqueue(
+            namespace_version=pricing_cache_ns.value,
+            priority_product_ids=[self.product_other.pk],
+        )
+        self._assert_cached(self.product_main, D("4500.00"))
+        self._assert_cached(self.product_other, D("100.00"))
+
+    def test_skip_stale_warm_up(self):
+        namespace_version = pricing_cache_ns.value
+        pricing_cache_ns.invalidate()
+        with mock.patch.object(Applicator, "get_cosmetic_prices") as get_prices:
+            warm_cosmetic_price_cache.enqueue(namespace_version=namespace_version)
+        get_prices.assert_not_called()
+
+    @override_settings(BLUELIGHT_COSMETIC_PRICE_WARMING_ENABLED=True)
+    def test_warm_after_invalidation(self):
+        sr = self.product_main.stockrecords.first()
+        sr.price = D("4000.00")
+        sr.save()
+        self._assert_cached(self.product_main, D("3500.00"))
+
+
+class GranularPricingInvalidationTest(BaseCosmeticPricingTest):
+    def setUp(self):
+        super().setUp()
+        self.product_other = create_product(product_class="Stuff")
+        create_stockrecord(self.product_other, D("100.00"), num_in_stock=100)
+        # Populate the cache
+        Applicator().get_cosmetic_prices(
+            self.basket.strategy, [self.product_main, self.product_other]
+        )
+
+    def _assert_cached(self, product, expected_price):
+        with self.assertNumQueries(0):
+            cosmetic_price = Applicator().get_cosmetic_price(
+                self.basket.strategy, product, quantity=1
+            )
+        self.assertEqual(cosmetic_price, expected_price)
+
+    def test_stockrecord_change_only_invalidates_its_product(self):
+        sr = self.product_other.stockrecords.first()
+        sr.price = D("200.00")
+        sr.save()
+        self._assert_cached(self.product_main, D("4500.00"))
+        cosmetic_price = Applicator().get_cosmetic_price(
+            self.basket.strategy, self.product_other, quantity=1
+        )
+        self.assertEqual(cosmetic_price, D("200.00"))
+
+    def test_range_membership_change_only_invalidates_changed_products(self):
+        self.range_main.add_product(self.product_other)
+        self._assert_cached(self.product_main, D("4500.00"))
+        cosmetic_price = Applicator().get_cosmetic_price(
+            self.basket.strategy, self.product_other, quantity=1
+        )
+        self.assertEqual(cosmetic_price, D("0.00"))
+
+    @override_settings(BLUELIGHT_PRICING_CACHE_MAX_PRODUCT_INVALIDATIONS=0)
+    def test_invalidates_everything_past_threshold(self):
+        namespace_version = pricing_cache_ns.value
+        self.range_main.add_product(self.product_other)
+        self.assertNotEqual(pricing_cache_ns.value, namespace_version)
+
+    def test_offer_change_invalidates_everything(self):
+        namespace_version = pricing_cache_ns.value
+        ConditionalOffer.objects.get().save()
+        self.assertNotEqual(pricing_cache_ns.value, namespace_version)
+
+    def test_excluding_product_from_includes_all_range_invalidates_it(self):
+        self.range_main.includes_all_products = True
+        self.range_main.save()
+        self.assertEqual(
+            Applicator().get_cosmetic_price(
+                self.basket.strategy, self.product_other, quantity=1
+            ),
+            D("0.00"),
+        )
+        # Only adds the product to the range's excluded products, which doesn't change the
+        # range product set view.
+        self.range_main.remove_product(self.product_other)
+        self._assert_cached(self.product_main, D("4500.00"))
+        cosmetic_price = Applicator().get_cosmetic_price(
+            self.basket.strategy, self.product_other, quantity=1
+        )
+        self.assertEqual(cosmetic_price, D("100.00"))
+
+    def test_includes_all_range_category_change_invalidates_everything(self):
+        self.range_main.includes_all_products = True
+        self.range_main.save()
+        namespace_version = pricing_cache_ns.value
+        category = Category.add_root(name="Excluded")
+        self.range_main.excluded_categories.add(category)
+        self.assertNotEqual(pricing_cache_ns.value, namespace_version)
+
+    def test_range_product_batch_change_only_invalidates_changed_products(self):
+        self.range_main.add_product_batch([self.product_other])
+        self._assert_cached(self.product_main, D("4500.00"))
+        cosmetic_price = Applicator().get_cosmetic_price(
+            self.basket.strategy, self.product_other, quantity=1
+        )
+        self.assertEqual(cosmetic_price, D("0.00"))
+
+    def test_category_tree_change_only_invalidates_changed_products(self):
+        category_included = Category.add_root(name="Included")
+        category_other = Category.add_root(name="Other")
+        ProductCategory.objects.create(
+            product=self.product_other, category=category_other
+        )
+        self.range_main.included_categories.add(category_included)
+        Applicator().get_cosmetic_prices(
+            self.basket.strategy, [self.product_main, self.product_other]
+        )
+        self._assert_cached(self.product_other, D("100.00"))
+        # Moving the category under an included category adds its products to the range
+        category_other.move(category_included, "last-child")
+        category_other = Category.objects.get(pk=category_other.pk)
+        category_other.save()
+        self._assert_cached(self.product_main, D("4500.00"))
+        cosmetic_price = Applicator().get_cosmetic_price(
+            self.basket.strategy, self.product_other, quantity=1
+        )
+        self.assertEqual(cosmetic_price, D("0.00"))
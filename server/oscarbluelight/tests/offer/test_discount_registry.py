@@ -0,0 +1,92 @@
+from decimal import Decimal as D
+
+from oscarbluelight.basket_utils import BluelightLineDiscountRegistry
+
+from .base import BaseTest
+
+
+class DiscountRegistryTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.line = self._build_basket(item_quantity=10).all_lines()[0]
+        self.offer_a = self._build_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition", 1
+        )
+        self.offer_b = self._build_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition", 1
+        )
+        self.offers = {self.offer_a.pk: self.offer_a, self.offer_b.pk: self.offer_b}
+
+    def _build_registry(self):
+        registry = BluelightLineDiscountRegistry(self.line)
+        registry.discount(D("3.00"), 2, incl_tax=False, offer=self.offer_a)
+        registry.discount(D("1.50"), 1, incl_tax=True, offer=self.offer_b)
+        registry.discount(D("0.25"), 1, incl_tax=False, offer=self.offer_a)
+        return registry
+
+    def _get_summary(self, registry):
+        return (
+            registry.excl_tax,
+            registry.incl_tax,
+            registry.total,
+            [tuple(d) for d in registry.all()],
+            registry.num_consumed(),
+            registry.num_consumed(self.offer_a),
+            registry.num_consumed(self.offer_b),
+            registry.available(self.offer_a),
+            [o.pk for o in registry.consumers],
+        )
+
+    def test_running_totals(self):
+        registry = self._build_registry()
+        self.assertEqual(registry.excl_tax, D("3.25"))
+        self.assertEqual(registry.incl_tax, D("1.50"))
+        self.assertEqual(registry.total, D("4.75"))
+        self.assertEqual(registry.total, sum(d.amount for d in registry))
+
+    def test_consumptions(self):
+        registry = self._build_registry()
+        self.assertEqual(registry.num_consumed(), 4)
+        self.assertEqual(registry.num_consumed(self.offer_a), 3)
+        self.assertEqual(registry.num_consumed(self.offer_b), 1)
+        offer_c = self._build_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition", 1
+        )
+        self.assertEqual(registry.num_consumed(offer_c), 0)
+        # Exclusive offers have consumed the line, so every offer sees all consumed items
+        offer_c.exclusive = False
+        self.assertEqual(registry.available(offer_c), 6)
+        self.assertEqual(
+            sorted(o.pk for o in registry.consumers),
+            sorted([self.offer_a.pk, self.offer_b.pk]),
+        )
+
+    def test_exclusive_offers(self):
+        registry = self._build_registry()
+        # Both offers are exclusive (the default), so every consumed item is unavailable
+        self.assertEqual(registry.available(self.offer_a), 6)
+        registry = BluelightLineDiscountRegistry(self.line)
+        self.offer_a.exclusive = False
+        self.offer_b.exclusive = False
+        registry.consume(4, offer=self.offer_a)
+        self.assertEqual(registry.available(self.offer_b), 10)
+        self.offer_b.exclusive = True
+        registry.consume(1, offer=self.offer_b)
+        # Once an exclusive offer has consumed the line, every offer sees all consumed items
+        self.assertEqual(registry.available(self.offer_a), 5)
+
+    def test_state_round_trip(self):
+        registry = self._build_registry()
+        restored = BluelightLineDiscountRegistry(self.line)
+        restored.set_state(registry.get_state(), self.offers)
+        self.assertEqual(self._get_summary(restored), self._get_summary(registry))
+
+    def test_snapshot_round_trip(self):
+        registry = self._build_registry()
+        snapshot = registry.get_snapshot()
+        expected = self._get_summary(registry)
+        registry.begin_offer_group_application()
+        registry.consume(5, offer=self.offer_b)
+        registry.restore_snapshot(snapshot)
+        # Snapshots don't include discounts, only consumption counters
+        self.assertEqual(self._get_summary(registry), expected)
@@ -0,0 +1,84 @@
+from decimal import Decimal as D
+
+from django.test import override_settings
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.instrumentation import BaseOfferInstrumentationCollector
+
+from .base import BaseTest
+
+COLLECTOR = "oscarbluelight.tests.offer.test_instrumentation.ListCollector"
+
+
+class ListCollector(BaseOfferInstrumentationCollector):
+    """A collector defined at module level for testing, which stores every application's stats."""
+
+    collected = []
+
+    def collect(self, stats):
+        self.collected.append(stats)
+
+
+class OfferInstrumentationTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        ListCollector.collected.clear()
+        self.offer = self._build_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition", 2
+        )
+        self.basket = create_basket(empty=True)
+        product = create_product()
+        create_stockrecord(product, D("10.00"), num_in_stock=10)
+        self.basket.add_product(product, quantity=1)
+
+    def test_disabled_by_default(self):
+        Applicator().apply(self.basket)
+        self.assertEqual(ListCollector.collected, [])
+
+    @override_settings(BLUELIGHT_OFFER_INSTRUMENTATION_COLLECTOR=COLLECTOR)
+    def test_collects_offer_stats(self):
+        Applicator().apply(self.basket)
+        self.assertEqual(len(ListCollector.collected), 1)
+        stats = ListCollector.collected[0]
+        self.assertIs(stats.basket, self.basket)
+        self.assertFalse(stats.is_cosmetic)
+        self.assertGreater(stats.wall_time_ns, 0)
+        self.assertEqual(len(stats.groups), 1)
+        self.assertEqual(len(stats.offers), 1)
+        offer_stats = stats.offers[0]
+        self.assertEqual(offer_stats.offer.pk, self.offer.pk)
+        # The basket only has one item, so the condition fails on the first iteration
+        self.assertEqual(offer_stats.num_iterations, 1)
+        self.assertGreater(offer_stats.is_condition_satisfied_ns, 0)
+        self.assertGreater(offer_stats.is_condition_partially_satisfied_ns, 0)
+        self.assertGreater(offer_stats.get_upsell_details_ns, 0)
+        self.assertGreaterEqual(
+            offer_stats.wall_time_ns,
+            offer_stats.is_condition_satisfied_ns
+            + offer_stats.is_condition_partially_satisfied_ns
+            + offer_stats.get_upsell_details_ns,
+        )
+        self.assertLessEqual(offer_stats.num_queries, stats.num_queries)
+
+    @override_settings(
+        BLUELIGHT_OFFER_INSTRUMENTATION_COLLECTOR=COLLECTOR,
+        BLUELIGHT_OFFER_INSTRUMENTATION_SAMPLE_RATE=0,
+    )
+    def test_sampling(self):
+        Applicator().apply(self.basket)
+        self.assertEqual(ListCollector.collected, [])
+
+    def test_logging_collector(self):
+        path = (
+            "oscarbluelight.offer.instrumentation.LoggingOfferInstrumentationCollector"
+        )
+        with (
+            override_settings(BLUELIGHT_OFFER_INSTRUMENTATION_COLLECTOR=path),
+            self.assertLogs(
+                "oscarbluelight.offer.instrumentation", level="DEBUG"
+            ) as logs,
+        ):
+            Applicator().apply(self.basket)
+        # One line for the application, one for the offer group, and one for the offer
+        self.assertEqual(len(logs.records), 3)
@@ -0,0 +1,138 @@
+from decimal import Decimal as D
+from unittest import mock
+
+from django.test import override_settings
+from oscar.test import factories
+from oscar.test.basket import add_product
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.models import (
+    ConditionalOffer,
+    Range,
+)
+
+from .base import BaseTest
+
+
+class MultiApplicationTest(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.range = Range.objects.create(
+            name="All products", includes_all_products=True
+        )
+
+    def _apply(self, basket, offer, enabled):
+        basket.reset_offer_applications()
+        with (
+            override_settings(BLUELIGHT_OFFER_MULTI_APPLICATION_ENABLED=enabled),
+            mock.patch.object(
+                ConditionalOffer,
+                "apply_benefit",
+                autospec=True,
+                side_effect=ConditionalOffer.apply_benefit,
+            ) as apply_benefit,
+        ):
+            Applicator().apply_offers(
+                basket, [ConditionalOffer.objects.get(pk=offer.pk)]
+            )
+        lines = [
+            (
+                line.discount_value,
+                line.quantity_with_discount,
+                line.quantity_without_discount,
+                line.get_price_breakdown(),
+            )
+            for line in basket.all_lines()
+        ]
+        applications = [
+            (a["offer"].pk, a["freq"], a["discount"]) for a in basket.offer_applications
+        ]
+        return (basket.total_excl_tax, lines, applications), apply_benefit.call_count
+
+    def assertMultiApplication(self, basket, offer, expected_freq):
+        expected, num_calls = self._apply(basket, offer, enabled=False)
+        actual, num_multi_calls = self._apply(basket, offer, enabled=True)
+        self.assertEqual(actual, expected)
+        self.assertEqual(expected[2][0][1], expected_freq)
+        self.assertLess(num_multi_calls, num_calls)
+        return actual
+
+    def test_count_condition_percentage_benefit(self):
+        basket = factories.create_basket(empty=True)
+        add_product(basket, D("9.99"), 101)
+        offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            3,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            15,
+            max_affected_items=1,
+        )
+        # Each application consumes 3 items, leaving 2 items which can't satisfy the condition
+        self.assertMultiApplication(basket, offer, 33)
+
+    def test_count_condition_multibuy_benefit(self):
+        basket = factories.create_basket(empty=True)
+        add_product(basket, D("12.00"), 500)
+        offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            2,
+            "oscarbluelight.offer.benefits.BluelightMultibuyDiscountBenefit",
+            None,
+        )
+        total, __, applications = self.assertMultiApplication(basket, offer, 250)
+        self.assertEqual(applications[0][2], D("3000.00"))
+        self.assertEqual(total, D("3000.00"))
+
+    def test_value_condition_absolute_benefit(self):
+        basket = factories.create_basket(empty=True)
+        add_product(basket, D("7.00"), 100)
+        offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightValueCondition",
+            D("20.00"),
+            "oscarbluelight.offer.benefits.BluelightAbsoluteDiscountBenefit",
+            D("2.50"),
+            max_affected_items=1,
+        )
+        # Each application consumes 3 items (1 discounted, plus 2 more to reach the value)
+        self.assertMultiApplication(basket, offer, 33)
+
+    def test_coverage_condition_percentage_benefit(self):
+        basket = factories.create_basket(empty=True)
+        add_product(basket, D("5.00"), 50)
+        offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCoverageCondition",
+            1,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            10,
+            max_affected_items=2,
+        )
+        self.assertMultiApplication(basket, offer, 25)
+
+    def test_max_basket_applications(self):
+        basket = factories.create_basket(empty=True)
+        add_product(basket, D("9.99"), 100)
+        offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            2,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            50,
+            max_affected_items=1,
+            max_basket_applications=10,
+        )
+        self.assertMultiApplication(basket, offer, 10)
+
+    def test_skips_multiple_lines(self):
+        basket = factories.create_basket(empty=True)
+        add_product(basket, D("9.99"), 10)
+        add_product(basket, D("5.00"), 10)
+        offer = self._create_offer(
+            "oscarbluelight.offer.conditions.BluelightCountCondition",
+            2,
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            50,
+            max_affected_items=1,
+        )
+        expected, num_calls = self._apply(basket, offer, enabled=False)
+        actual, num_multi_calls = self._apply(basket, offer, enabled=True)
+        self.assertEqual(actual, expected)
+        self.assertEqual(num_multi_calls, num_calls)
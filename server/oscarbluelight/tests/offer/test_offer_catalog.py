@@ -0,0 +1,155 @@
+from datetime import timedelta
+from decimal import Decimal as D
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.offer.applicator import Applicator, pricing_cache_ns
+from oscarbluelight.offer.benefits import BluelightPercentageDiscountBenefit
+from oscarbluelight.offer.catalog import clear_offer_catalog, get_offer_catalog
+from oscarbluelight.offer.conditions import BluelightCountCondition
+from oscarbluelight.offer.models import (
+    Benefit,
+    Condition,
+    ConditionalOffer,
+    OfferGroup,
+    Range,
+)
+
+
+@override_settings(BLUELIGHT_OFFER_CATALOG_ENABLED=True)
+class OfferCatalogTest(TransactionTestCase):
+    def setUp(self):
+        # Flush the cache
+        conn = get_redis_connection("redis")
+        conn.flushall()
+        clear_offer_catalog()
+
+        self.all_products = Range.objects.create(
+            name="All Products", includes_all_products=True
+        )
+
+        self.condition = Condition()
+        self.condition.proxy_class = (
+            "oscarbluelight.offer.conditions.BluelightCountCondition"
+        )
+        self.condition.value = 1
+        self.condition.range = self.all_products
+        self.condition.save()
+
+        self.benefit = Benefit()
+        self.benefit.proxy_class = (
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit"
+        )
+        self.benefit.value = 10
+        self.benefit.range = self.all_products
+        self.benefit.save()
+
+        self.group_low = OfferGroup.objects.create(name="Low", priority=1)
+        self.group_high = OfferGroup.objects.create(name="High", priority=10)
+
+        self.offer_ungrouped = ConditionalOffer.objects.create(
+            name="Ungrouped",
+            offer_type=ConditionalOffer.SITE,
+            condition=self.condition,
+            benefit=self.benefit,
+            priority=100,
+        )
+        self.offer_low = ConditionalOffer.objects.create(
+            name="Low",
+            offer_type=ConditionalOffer.SITE,
+            offer_group=self.group_low,
+            condition=self.condition,
+            benefit=self.benefit,
+        )
+        self.offer_high = ConditionalOffer.objects.create(
+            name="High",
+            offer_type=ConditionalOffer.SITE,
+            offer_group=self.group_high,
+            condition=self.condition,
+            benefit=self.benefit,
+        )
+
+    def test_offers_are_sorted_and_resolved(self):
+        offers = Applicator().get_site_offers()
+        self.assertEqual(
+            [o.pk for o in offers],
+            [self.offer_high.pk, self.offer_low.pk, self.offer_ungrouped.pk],
+        )
+        for offer in offers:
+            self.assertIsInstance(offer.condition, BluelightCountCondition)
+            self.assertIsInstance(offer.benefit, BluelightPercentageDiscountBenefit)
+
+    def test_steady_state_does_not_query(self):
+        Applicator().get_site_offers()
+        with self.assertNumQueries(0):
+            offers = Applicator().get_site_offers()
+            # Related objects are already loaded
+            ranges = [(o.condition.range, o.benefit.range) for o in offers]
+            groups = [o.offer_group for o in offers]
+        self.assertEqual(ranges, [(self.all_products, self.all_products)] * 3)
+        self.assertEqual(groups, [self.group_high, self.group_low, None])
+        self.assertEqual(len(offers), 3)
+
+    def test_offers_are_copied_per_call(self):
+        offers1 = Applicator().get_site_offers()
+        offers2 = Applicator().get_site_offers()
+        self.assertIsNot(offers1[0], offers2[0])
+        self.assertIsNot(offers1[0].condition, offers2[0].condition)
+        self.assertIsNot(offers1[0].benefit, offers2[0].benefit)
+        offers1[0].reset_condition_satisfying_lines()
+        self.assertIsNone(offers2[0]._condition_satisfying_lines)
+
+    def test_rebuilt_when_offer_changes(self):
+        catalog = get_offer_catalog()
+        self.assertEqual(len(catalog.offers), 3)
+
+        self.offer_low.status = ConditionalOffer.SUSPENDED
+        self.offer_low.save()
+        self.assertIsNot(get_offer_catalog(), catalog)
+        self.assertEqual(
+            [o.pk for o in Applicator().get_site_offers()],
+            [self.offer_high.pk, self.offer_ungrouped.pk],
+        )
+
+        self.offer_high.delete()
+        self.assertEqual(
+            [o.pk for o in Applicator().get_site_offers()],
+            [self.offer_ungrouped.pk],
+        )
+
+    def test_rebuilt_when_namespace_invalidated(self):
+        catalog = get_offer_catalog()
+        self.assertIs(get_offer_catalog(), catalog)
+        pricing_cache_ns.invalidate()
+        self.assertIsNot(get_offer_catalog(), catalog)
+
+    def test_expires_at_next_offer_boundary(self):
+        start = timezone.now() + timedelta(days=1)
+        end = timezone.now() + timedelta(days=2)
+        self.offer_low.end_datetime = end
+        self.offer_low.save()
+        ConditionalOffer.objects.create(
+            name="Future",
+            offer_type=ConditionalOffer.SITE,
+            condition=self.condition,
+            benefit=self.benefit,
+            start_datetime=start,
+        )
+        catalog = get_offer_catalog()
+        self.assertEqual(catalog.expires_at, start)
+        self.assertEqual(len(catalog.offers), 3)
+        self.assertTrue(catalog.is_valid(pricing_cache_ns.value))
+        self.assertFalse(catalog.is_valid(pricing_cache_ns.value, at=start))
+
+    def test_apply_with_catalog(self):
+        product = create_product()
+        create_stockrecord(product, D("10.00"), num_in_stock=10)
+        basket = create_basket(empty=True)
+        basket.add_product(product, quantity=1)
+        Applicator().apply(basket)
+        # 10% off, then 10% off, then 10% off (one offer per group)
+        self.assertEqual(basket.total_excl_tax, D("7.29"))
+        self.assertEqual(len(basket.offer_applications), 3)
@@ -0,0 +1,154 @@
+from decimal import Decimal as D
+
+from django.test import TransactionTestCase, override_settings
+from django_redis import get_redis_connection
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.catalog import clear_offer_catalog
+from oscarbluelight.offer.constants import Conjunction
+from oscarbluelight.offer.models import (
+    Benefit,
+    CompoundCondition,
+    Condition,
+    ConditionalOffer,
+    Range,
+)
+
+
+@override_settings(
+    BLUELIGHT_OFFER_CATALOG_ENABLED=True,
+    BLUELIGHT_OFFER_PREFILTER_ENABLED=True,
+)
+class OfferPrefilterTest(TransactionTestCase):
+    def setUp(self):
+        # Flush the cache
+        conn = get_redis_connection("redis")
+        conn.flushall()
+        clear_offer_catalog()
+
+        self.product_a = create_product()
+        create_stockrecord(self.product_a, D("10.00"), num_in_stock=10)
+        self.product_b = create_product()
+        create_stockrecord(self.product_b, D("20.00"), num_in_stock=10)
+        self.product_c = create_product()
+        create_stockrecord(self.product_c, D("30.00"), num_in_stock=10)
+
+        self.range_a = Range.objects.create(name="A")
+        self.range_a.add_product(self.product_a)
+        self.range_b = Range.objects.create(name="B")
+        self.range_b.add_product(self.product_b)
+        self.range_all = Range.objects.create(name="All", includes_all_products=True)
+
+        self.offer_a = self._create_offer("A", self._create_condition(self.range_a))
+        self.offer_b = self._create_offer("B", self._create_condition(self.range_b))
+        self.offer_all = self._create_offer(
+            "All", self._create_condition(self.range_all)
+        )
+        compound = CompoundCondition()
+        compound.proxy_class = "oscarbluelight.offer.conditions.CompoundCondition"
+        compound.conjunction = Conjunction.OR
+        compound.save()
+        compound.subconditions.set(
+            [
+                self._create_condition(self.range_a),
+                self._create_condition(self.range_b),
+            ]
+        )
+        self.offer_compound = self._create_offer("Compound", compound)
+
+    def _create_condition(
+        self,
+        rng,
+        value=1,
+        proxy_class="oscarbluelight.offer.conditions.BluelightCountCondition",
+    ):
+        condition = Condition()
+        condition.proxy_class = proxy_class
+        condition.value = value
+        condition.range = rng
+        condition.save()
+        return condition
+
+    def _create_offer(self, name, condition, benefit_range=None):
+        benefit = Benefit()
+        benefit.proxy_class = (
+            "oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit"
+        )
+        benefit.value = 10
+        benefit.range = benefit_range or self.range_all
+        benefit.save()
+        return ConditionalOffer.objects.create(
+            name=name,
+            offer_type=ConditionalOffer.SITE,
+            condition=condition,
+            benefit=benefit,
+        )
+
+    def _get_candidate_offer_ids(self, *products):
+        basket = create_basket(empty=True)
+        for product in products:
+            basket.add_product(product)
+        return {o.pk for o in Applicator().get_offers(basket)}
+
+    def test_candidate_offers(self):
+        self.assertEqual(
+            self._get_candidate_offer_ids(self.product_a),
+            {self.offer_a.pk, self.offer_all.pk, self.offer_compound.pk},
+        )
+        self.assertEqual(
+            self._get_candidate_offer_ids(self.product_b),
+            {self.offer_b.pk, self.offer_all.pk, self.offer_compound.pk},
+        )
+        self.assertEqual(
+            self._get_candidate_offer_ids(self.product_c),
+            {self.offer_all.pk},
+        )
+        self.assertEqual(
+            self._get_candidate_offer_ids(self.product_a, self.product_b),
+            {
+                self.offer_a.pk,
+                self.offer_b.pk,
+                self.offer_all.pk,
+                self.offer_compound.pk,
+            },
+        )
+
+    def test_candidate_offers_follow_range_changes(self):
+        self.range_a.add_product(self.product_c)
+        self.assertEqual(
+            self._get_candidate_offer_ids(self.product_c),
+            {self.offer_a.pk, self.offer_all.pk, self.offer_compound.pk},
+        )
+
+    def test_apply_matches_unfiltered_application(self):
+        self.assertMatchesUnfilteredApplication(self.product_a)
+
+    def assertMatchesUnfilteredApplication(self, product):
+        basket = create_basket(empty=True)
+        basket.add_product(product)
+        Applicator().apply(basket)
+        with override_settings(BLUELIGHT_OFFER_PREFILTER_ENABLED=False):
+            unfiltered = create_basket(empty=True)
+            unfiltered.add_product(product)
+            Applicator().apply(unfiltered)
+        self.assertEqual(basket.total_excl_tax, unfiltered.total_excl_tax)
+        self.assertEqual(
+            [a["offer"].pk for a in basket.offer_applications],
+            [a["offer"].pk for a in unfiltered.offer_applications],
+        )
+
+    def test_zero_value_condition_is_always_a_candidate(self):
+        # Can be satisfied by any basket, so it's a candidate for product A even though its
+        # condition range doesn't contain it.
+        offer_zero = self._create_offer(
+            "Zero",
+            self._create_condition(
+                self.range_b,
+                value=0,
+                proxy_class="oscarbluelight.offer.conditions.BluelightCoverageCondition",
+            ),
+            benefit_range=self.range_a,
+        )
+        self.assertIn(offer_zero.pk, self._get_candidate_offer_ids(self.product_a))
+        self.assertMatchesUnfilteredApplication(self.product_a)
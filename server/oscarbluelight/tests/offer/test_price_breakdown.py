@@ -0,0 +1,82 @@
+from decimal import Decimal as D
+import itertools
+
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.mixins import PriceBreakdownStackEntry
+
+from .base import BaseTest
+
+
+def _get_item_prices(unit_price, quantity, stack):
+    # The original, per-item implementation of ``get_price_breakdown``
+    item_prices = [unit_price] * quantity
+    for discount_group in stack:
+        remaining_qty_affected = discount_group.quantity_with_discount
+        iterations = 0
+        while remaining_qty_affected > 0 and iterations <= quantity:
+            for i in range(quantity):
+                if item_prices[i] >= discount_group.discount_delta_unit:
+                    item_prices[i] -= discount_group.discount_delta_unit
+                    remaining_qty_affected -= 1
+                if remaining_qty_affected <= 0:
+                    break
+            iterations += 1
+    return [
+        (price, len(list(prices)))
+        for price, prices in itertools.groupby(sorted(item_prices))
+    ]
+
+
+class PriceBreakdownTest(BaseTest):
+    def _build_line(self, price, quantity):
+        basket = create_basket(empty=True)
+        product = create_product()
+        create_stockrecord(product, price, num_in_stock=quantity)
+        basket.add_product(product, quantity=quantity)
+        return basket.all_lines()[0]
+
+    def _get_breakdown(self, line):
+        return [
+            (str(item.unit_price_excl_tax), item.quantity)
+            for item in line.get_price_breakdown()
+        ]
+
+    def test_matches_per_item_breakdown(self):
+        stacks = [
+            [],
+            [PriceBreakdownStackEntry(3, D("2.50"))],
+            [
+                PriceBreakdownStackEntry(4, D("1.5")),
+                PriceBreakdownStackEntry(7, D("3.00")),
+            ],
+            # More discounted items than the line quantity, so some get discounted twice
+            [PriceBreakdownStackEntry(9, D("4.00"))],
+            # Delta greater than the unit price, so nothing can be discounted
+            [PriceBreakdownStackEntry(2, D("12.00"))],
+            [
+                PriceBreakdownStackEntry(5, D("0.01")),
+                PriceBreakdownStackEntry(1, D("9.99")),
+                PriceBreakdownStackEntry(6, D(0)),
+            ],
+        ]
+        for stack in stacks:
+            with self.subTest(stack=stack):
+                line = self._build_line(D("10.00"), 6)
+                line._price_breakdown_stack = list(stack)
+                expected = [
+                    (str(price), qty)
+                    for price, qty in _get_item_prices(D("10.00"), 6, stack)
+                ]
+                self.assertEqual(self._get_breakdown(line), expected)
+
+    def test_high_quantity(self):
+        line = self._build_line(D("10.00"), 50000)
+        line._price_breakdown_stack = [
+            PriceBreakdownStackEntry(30000, D("0.37")),
+            PriceBreakdownStackEntry(50000, D("1.11")),
+        ]
+        self.assertEqual(
+            self._get_breakdown(line),
+            [("8.52", 30000), ("8.89", 20000)],
+        )
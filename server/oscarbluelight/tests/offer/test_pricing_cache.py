@@ -0,0 +1,128 @@
+from unittest import mock
+import uuid
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from oscarbluelight.caching import (
+    CacheNamespace,
+    CacheNamespaceFamily,
+    FluentCache,
+    SingleFlight,
+)
+
+
+class PricingCacheTest(SimpleTestCase):
+    def setUp(self):
+        name = f"test-{uuid.uuid4()}"
+        self.ns = CacheNamespace(cache, name, grace_period=60)
+        self.single_flight = SingleFlight(wait_timeout=0.1, poll_interval=0.01)
+        self.fcache = (
+            FluentCache(cache, f"{name}.value")
+            .timeout(60)
+            .namespaces(self.ns)
+            .key_parts("product")
+        )
+
+    def test_namespace_previous_value(self):
+        self.assertIsNone(self.ns.previous_value)
+        value = self.ns.value
+        self.ns.invalidate()
+        self.assertEqual(self.ns.previous_value, value)
+        self.assertEqual(self.ns.value, value + 1)
+
+    def test_namespace_without_grace_period(self):
+        ns = CacheNamespace(cache, f"test-{uuid.uuid4()}")
+        self.assertIsNotNone(ns.value)
+        ns.invalidate()
+        self.assertIsNone(ns.previous_value)
+
+    def test_namespace_family(self):
+        family = CacheNamespaceFamily(cache, f"test-{uuid.uuid4()}", grace_period=60)
+        self.fcache.namespace_families(product=family)
+        self.fcache.set_many(
+            {
+                self.fcache.build_key(product=1): "one",
+                self.fcache.build_key(product=2): "two",
+            }
+        )
+        family.invalidate([1])
+        compute = mock.Mock(side_effect=lambda ids: {i: "new" for i in ids})
+        items = {i: {"product": i} for i in (1, 2)}
+        self.assertEqual(
+            self.fcache.get_many_or_set(items, compute), {1: "new", 2: "two"}
+        )
+        compute.assert_called_once_with([1])
+        # Only the invalidated member has a stale key
+        self.assertIsNotNone(self.fcache.build_stale_key(product=1))
+        self.assertIsNone(self.fcache.build_stale_key(product=2))
+
+    def test_namespace_family_get_values_single_round_trip(self):
+        family = CacheNamespaceFamily(cache, f"test-{uuid.uuid4()}")
+        values = family.get_values([1, 2, 3])
+        mock_cache = mock.Mock(wraps=cache)
+        family.cache = mock_cache
+        self.assertEqual(family.get_values([1, 2, 3]), values)
+        mock_cache.get_many.assert_called_once()
+        mock_cache.get_or_set.assert_not_called()
+        # Missing namespaces are still created
+        self.assertEqual(set(family.get_values([3, 4])), {3, 4})
+        mock_cache.get_or_set.assert_called_once()
+
+    def test_get_many_or_set(self):
+        compute = mock.Mock(side_effect=lambda ids: {i: i * 10 for i in ids})
+        items = {i: {"product": i} for i in (1, 2, 3)}
+        self.assertEqual(
+            self.fcache.get_many_or_set(items, compute), {1: 10, 2: 20, 3: 30}
+        )
+        compute.assert_called_once_with([1, 2, 3])
+
+        compute.reset_mock()
+        items[4] = {"product": 4}
+        self.assertEqual(
+            self.fcache.get_many_or_set(items, compute),
+            {1: 10, 2: 20, 3: 30, 4: 40},
+        )
+        compute.assert_called_once_with([4])
+
+    def test_single_flight_serves_stale_value(self):
+        self.fcache.single_flight(self.single_flight)
+        self.fcache.concrete(product=1).set("old")
+        self.ns.invalidate()
+
+        # Simulate another worker computing the new value
+        concrete = self.fcache.concrete(product=1)
+        self.assertTrue(self.single_flight.acquire(cache, concrete.key))
+
+        compute = mock.Mock(return_value="new")
+        self.assertEqual(concrete.get_or_set(compute), "old")
+        self.assertEqual(
+            self.fcache.get_many_or_set({1: {"product": 1}}, compute), {1: "old"}
+        )
+        compute.assert_not_called()
+
+        # Once the lock is released, we compute the value ourselves
+        self.single_flight.release(cache, concrete.key)
+        self.assertEqual(concrete.get_or_set(compute), "new")
+        compute.assert_called_once_with()
+
+    def test_single_flight_waits_then_computes(self):
+        self.fcache.single_flight(self.single_flight)
+        concrete = self.fcache.concrete(product=1)
+        self.assertTrue(self.single_flight.acquire(cache, concrete.key))
+
+        # Nothing stale to serve, so we wait for the other worker before giving up
+        compute = mock.Mock(side_effect=lambda ids: {i: "computed" for i in ids})
+        self.assertEqual(
+            self.fcache.get_many_or_set(
+                {1: {"product": 1}, 2: {"product": 2}}, compute
+            ),
+            {1: "computed", 2: "computed"},
+        )
+        self.assertEqual(compute.call_args_list, [mock.call([2]), mock.call([1])])
+
+    def test_single_flight_releases_lock(self):
+        self.fcache.single_flight(self.single_flight)
+        concrete = self.fcache.concrete(product=1)
+        self.assertEqual(concrete.get_or_set(lambda: "value"), "value")
+        self.assertTrue(self.single_flight.acquire(cache, concrete.key))
@@ -1,5 +1,6 @@
 from unittest.mock import patch
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
 from django.db.models import Q
 from django.test import RequestFactory, TestCase, TransactionTestCase
@@ -448,6 +449,106 @@ class TestContainsProductBulk(TransactionTestCase):
         self.assertEqual(len(result), 10)
 
 
+class EvenProductsRange:
+    """Proxy range containing the products with an even ID."""
+
+    def contains_product(self, product):
+        return product.pk % 2 == 0
+
+
+class BatchedEvenProductsRange(EvenProductsRange):
+    def contains_products(self, products):
+        return [product.pk for product in products if self.contains_product(product)]
+
+
+class TestContainsProductsBulk(TransactionTestCase):
+    def setUp(self):
+        self.products = [create_product() for _ in range(4)]
+        self.category = catalogue_models.Category.add_root(name="root")
+        self.subcategory = self.category.add_child(name="child")
+        self.parent = create_product(structure="parent")
+        self.child = create_product(structure="child", parent=self.parent)
+        self.products.append(self.child)
+        self.standard = models.Range.objects.create(name="Standard")
+        self.standard.add_product(self.products[0])
+        self.standard.add_product(self.products[1])
+        self.all_products = models.Range.objects.create(
+            name="All", includes_all_products=True
+        )
+        self.all_but_excluded = models.Range.objects.create(
+            name="All But Excluded", includes_all_products=True
+        )
+        self.all_but_excluded.excluded_products.add(self.products[0])
+        self.all_but_excluded.excluded_categories.add(self.category)
+        # Excluded via a descendant of an excluded category
+        self.products[1].categories.add(self.subcategory)
+        # Excluded via the parent's category
+        self.parent.categories.add(self.category)
+
+    def _get_expected(self, ranges):
+        return {
+            product.pk: {rng.pk for rng in ranges if rng.contains_product(product)}
+            for product in self.products
+        }
+
+    def test_matches_contains_product(self):
+        ranges = [self.standard, self.all_products, self.all_but_excluded]
+        result = models.Range.contains_products_bulk(self.products, ranges)
+        self.assertEqual(result, self._get_expected(ranges))
+        self.assertEqual(
+            result[self.products[2].pk],
+            {self.all_products.pk, self.all_but_excluded.pk},
+        )
+        self.assertEqual(result[self.child.pk], {self.all_products.pk})
+
+    def test_proxy_ranges(self):
+        ranges = [
+            models.Range.objects.create(
+                name="Even",
+                proxy_class="oscarbluelight.tests.offer.test_range.EvenProductsRange",
+            ),
+            models.Range.objects.create(
+                name="Batched Even",
+                proxy_class="oscarbluelight.tests.offer.test_range.BatchedEvenProductsRange",
+            ),
+        ]
+        with patch.object(
+            BatchedEvenProductsRange,
+            "contains_products",
+            autospec=True,
+            side_effect=BatchedEvenProductsRange.contains_products,
+        ) as contains_products:
+            result = models.Range.contains_products_bulk(self.products, ranges)
+        contains_products.assert_called_once()
+        self.assertEqual(result, self._get_expected(ranges))
+
+    def test_empty(self):
+        self.assertEqual(models.Range.contains_products_bulk([], [self.standard]), {})
+        self.assertEqual(
+            models.Range.contains_products_bulk(self.products[:1], []),
+            {self.products[0].pk: set()},
+        )
+
+    def test_query_count_does_not_scale(self):
+        ranges = [self.standard, self.all_products, self.all_but_excluded]
+        for i in range(5):
+            rng = models.Range.objects.create(name=f"Standard {i}")
+            rng.add_product(self.products[i % 2])
+            ranges.append(rng)
+            ranges.append(
+                models.Range.objects.create(name=f"All {i}", includes_all_products=True)
+            )
+        # Materialized view, excluded products, excluded categories, and product categories
+        with self.assertNumQueries(4):
+            result = models.Range.contains_products_bulk(self.products, ranges)
+        self.assertEqual(result, self._get_expected(ranges))
+
+    async def test_acontains_products_bulk(self):
+        ranges = [self.standard, self.all_products, self.all_but_excluded]
+        result = await models.Range.acontains_products_bulk(self.products, ranges)
+        self.assertEqual(result, await sync_to_async(self._get_expected)(ranges))
+
+
 class TestRangeProductListView(TestCase):
     def setUp(self):
         self.factory = RequestFactory()
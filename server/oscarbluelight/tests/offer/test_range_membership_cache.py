@@ -0,0 +1,65 @@
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+from oscar.test.factories import create_product
+
+from oscarbluelight.offer.membership import (
+    clear_range_membership_cache,
+    get_range_membership_cache,
+)
+from oscarbluelight.offer.models import Range, ViewRefreshLog
+
+
+@override_settings(BLUELIGHT_RANGE_MEMBERSHIP_CACHE_ENABLED=True)
+class RangeMembershipCacheTest(TransactionTestCase):
+    def setUp(self):
+        # Flush the cache
+        conn = get_redis_connection("redis")
+        conn.flushall()
+        clear_range_membership_cache()
+        self.addCleanup(clear_range_membership_cache)
+        self.product_in = create_product()
+        self.product_out = create_product()
+        self.range = Range.objects.create(name="Stuff")
+        self.range.add_product(self.product_in)
+        self.range = Range.objects.get(pk=self.range.pk)
+
+    def test_contains_product(self):
+        # Loading the range takes a version check and one query for the range's products
+        with self.assertNumQueries(2):
+            self.assertTrue(self.range.contains_product(self.product_in))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.range.contains_product(self.product_in))
+            self.assertFalse(self.range.contains_product(self.product_out))
+
+    @override_settings(BLUELIGHT_RANGE_MEMBERSHIP_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.assertTrue(self.range.contains_product(self.product_in))
+        with self.assertNumQueries(1):
+            self.assertTrue(self.range.contains_product(self.product_in))
+
+    def test_skips_all_products_ranges(self):
+        rng = Range.objects.create(name="All", includes_all_products=True)
+        rng.excluded_products.add(self.product_out)
+        rng = Range.objects.get(pk=rng.pk)
+        self.assertTrue(rng.contains_product(self.product_in))
+        self.assertFalse(rng.contains_product(self.product_out))
+
+    def test_cleared_on_view_refresh(self):
+        self.assertFalse(self.range.contains_product(self.product_out))
+        cache = get_range_membership_cache()
+        # Refreshes the range product set view, which clears the cache
+        self.range.add_product(self.product_out)
+        self.assertIsNot(get_range_membership_cache(), cache)
+        self.assertTrue(self.range.contains_product(self.product_out))
+
+    @override_settings(BLUELIGHT_RANGE_MEMBERSHIP_CACHE_CHECK_INTERVAL=0)
+    def test_version_check(self):
+        cache = get_range_membership_cache()
+        self.assertIs(get_range_membership_cache(), cache)
+        # Simulate the view being refreshed by another process
+        ViewRefreshLog.objects.create(
+            view_type=ViewRefreshLog.ViewType.RANGE_PRODUCT_SET,
+            refreshed_on=timezone.now() + timezone.timedelta(seconds=1),
+        )
+        self.assertIsNot(get_range_membership_cache(), cache)
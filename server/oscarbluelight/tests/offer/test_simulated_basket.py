@@ -0,0 +1,90 @@
+from decimal import Decimal as D
+
+from django.test import TestCase
+from oscar.core.loading import get_model
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.offer.applicator import Applicator
+from oscarbluelight.offer.models import Benefit, Condition, ConditionalOffer, Range
+from oscarbluelight.simulation import SimulatedBasket
+
+Basket = get_model("basket", "Basket")
+Line = get_model("basket", "Line")
+
+
+class SimulatedBasketTest(TestCase):
+    def setUp(self):
+        self.product = create_product(product_class="Stuff")
+        create_stockrecord(self.product, D("10.00"), num_in_stock=100)
+        self.other_product = create_product(product_class="Stuff")
+        create_stockrecord(self.other_product, D("4.00"), num_in_stock=100)
+
+        self.range = Range.objects.create(name="Stuff")
+        self.range.add_product(self.product)
+
+        condition = Condition.objects.create(
+            proxy_class="oscarbluelight.offer.conditions.BluelightCountCondition",
+            value=1,
+            range=self.range,
+        )
+        benefit = Benefit.objects.create(
+            proxy_class="oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            value=10,
+            range=self.range,
+        )
+        self.offer = ConditionalOffer.objects.create(
+            name="10% off stuff",
+            offer_type=ConditionalOffer.SITE,
+            condition=condition,
+            benefit=benefit,
+        )
+        self.strategy = create_basket(empty=True).strategy
+
+    def test_add_product(self):
+        basket = SimulatedBasket(self.strategy)
+        self.assertTrue(basket.is_empty)
+        self.assertEqual(basket.total_excl_tax, D("0.00"))
+
+        line, created = basket.add_product(self.product, quantity=2)
+        self.assertTrue(created)
+        self.assertIsInstance(line, Line)
+        self.assertEqual(line.pk, -1)
+        line, created = basket.add_product(self.product)
+        self.assertFalse(created)
+        self.assertEqual(line.quantity, 3)
+        line, created = basket.add_product(self.other_product)
+        self.assertTrue(created)
+        self.assertEqual(line.pk, -2)
+
+        self.assertEqual(basket.num_lines, 2)
+        self.assertEqual(basket.num_items, 4)
+        self.assertEqual(basket.currency, "USD")
+        self.assertEqual(basket.total_excl_tax, D("34.00"))
+
+    def test_apply_offers(self):
+        num_baskets = Basket.objects.count()
+        basket = SimulatedBasket(self.strategy)
+        basket.add_product(self.product)
+        basket.add_product(self.other_product)
+        Applicator().apply(basket)
+
+        self.assertEqual(basket.total_excl_tax_excl_discounts, D("14.00"))
+        self.assertEqual(basket.total_excl_tax, D("13.00"))
+        self.assertEqual(len(basket.offer_applications), 1)
+        line, other_line = basket.all_lines()
+        self.assertEqual(line.discount_value, D("1.00"))
+        self.assertEqual(len(line.get_discount_descriptions()), 1)
+        self.assertEqual(other_line.discount_value, D("0.00"))
+        self.assertEqual(Basket.objects.count(), num_baskets)
+
+    def test_reapply_offers(self):
+        basket = SimulatedBasket(self.strategy)
+        basket.add_product(self.product)
+        Applicator().apply(basket)
+        self.assertEqual(basket.total_excl_tax, D("9.00"))
+
+        # Adding to the basket resets previously applied discounts
+        basket.add_product(self.other_product)
+        self.assertEqual(basket.total_discount, D("0.00"))
+        Applicator().apply(basket)
+        self.assertEqual(basket.total_excl_tax, D("13.00"))
@@ -5,6 +5,10 @@ from django_redis import get_redis_connection
 
 from oscarbluelight.offer.applicator import Applicator
 from oscarbluelight.offer.groups import (
+    clear_offer_group_keys,
+    ensure_all_system_groups_exist,
+    get_offer_group_keys,
+    offer_group_ns,
     post_offer_group_apply_receiver,
     pre_offer_group_apply_receiver,
     register_system_offer_group,
@@ -18,6 +22,8 @@ class OfferGroupModelTest(TestCase):
         # Flush the cache
         conn = get_redis_connection("redis")
         conn.flushall()
+        clear_offer_group_keys()
+        self.addCleanup(clear_offer_group_keys)
 
     def test_register_system_offer_group(self):
         # System group should not exist yet
@@ -197,3 +203,53 @@ class OfferGroupModelTest(TestCase):
             offers=[],
             signal=post_offer_group_apply,
         )
+
+    def test_receivers_resolve_slug_once(self):
+        group = OfferGroup.objects.create(
+            slug="group-cached", name="Group Cached", priority=3, is_system_group=True
+        )
+        handler = mock.MagicMock()
+        pre_offer_group_apply_receiver("group-cached")(handler)
+        # Create any system groups registered by other tests up-front
+        ensure_all_system_groups_exist()
+
+        # The offer group keys are loaded by the first signal, and reused after that
+        with self.assertNumQueries(1):
+            pre_offer_group_apply.send(
+                sender=Applicator, basket=None, group=group, offers=[]
+            )
+        with self.assertNumQueries(0):
+            for __ in range(5):
+                pre_offer_group_apply.send(
+                    sender=Applicator, basket=None, group=group, offers=[]
+                )
+        self.assertEqual(handler.call_count, 6)
+
+        # Changing the offer group (even its slug) drops the keys
+        group.name = "Group Renamed"
+        group.save()
+        self.assertNotIn("group-cached", get_offer_group_keys())
+        self.assertEqual(get_offer_group_keys()[group.slug].pk, group.pk)
+        pre_offer_group_apply.send(
+            sender=Applicator, basket=None, group=group, offers=[]
+        )
+        self.assertEqual(handler.call_count, 6)
+
+        # Deleting an offer group drops them too
+        group.delete()
+        self.assertNotIn(group.slug, get_offer_group_keys())
+
+    def test_offer_group_keys_follow_changes_in_other_processes(self):
+        group = OfferGroup.objects.create(
+            slug="group-remote", name="Group Remote", priority=4, is_system_group=True
+        )
+        self.assertEqual(get_offer_group_keys()["group-remote"].pk, group.pk)
+
+        # Simulate another process changing the group: no signals are sent in this process,
+        # so the keys are only reloaded once the shared version is bumped.
+        OfferGroup.objects.filter(pk=group.pk).update(slug="group-moved")
+        self.assertIn("group-remote", get_offer_group_keys())
+        offer_group_ns.invalidate()
+        keys = get_offer_group_keys()
+        self.assertNotIn("group-remote", keys)
+        self.assertEqual(keys["group-moved"].pk, group.pk)
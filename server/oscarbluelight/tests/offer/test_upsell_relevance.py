@@ -0,0 +1,151 @@
+from decimal import Decimal as D
+
+from django.test import TransactionTestCase
+from django_redis import get_redis_connection
+from oscar.test.factories import create_basket, create_product, create_stockrecord
+
+from oscarbluelight.offer.constants import Conjunction
+from oscarbluelight.offer.membership import (
+    RangeMembershipSnapshot,
+    use_range_membership,
+)
+from oscarbluelight.offer.models import (
+    Benefit,
+    Condition,
+    ConditionalOffer,
+    Range,
+)
+from oscarbluelight.offer.upsells import (
+    CompoundUpsell,
+    OfferUpsell,
+    QuantityUpsell,
+    UpsellRelevance,
+)
+
+
+class FirstProductUpsell(OfferUpsell):
+    # Relevance which can't be described by ranges
+    def __init__(self, product, offer, basket):
+        super().__init__(offer, basket)
+        self.product = product
+
+    def is_relevant_to_product(self, product):
+        return product.pk == self.product.pk
+
+
+class UpsellRelevanceTest(TransactionTestCase):
+    def setUp(self):
+        # Flush the cache
+        conn = get_redis_connection("redis")
+        conn.flushall()
+        self.product_a = create_product()
+        self.product_b = create_product()
+        self.product_c = create_product()
+        self.range_a = Range.objects.create(name="A")
+        self.range_a.add_product(self.product_a)
+        self.range_b = Range.objects.create(name="B")
+        self.range_b.add_product(self.product_b)
+        self.range_a = Range.objects.get(pk=self.range_a.pk)
+        self.range_b = Range.objects.get(pk=self.range_b.pk)
+
+        self.basket = create_basket(empty=True)
+        for product in (self.product_a, self.product_b, self.product_c):
+            create_stockrecord(product, D("10.00"), num_in_stock=10)
+            self.basket.add_product(product, quantity=1)
+
+        condition = Condition.objects.create(
+            proxy_class="oscarbluelight.offer.conditions.BluelightCountCondition",
+            value=5,
+            range=self.range_a,
+        )
+        benefit = Benefit.objects.create(
+            proxy_class="oscarbluelight.offer.benefits.BluelightPercentageDiscountBenefit",
+            value=10,
+            range=self.range_a,
+        )
+        self.offer = ConditionalOffer.objects.create(
+            name="Upsell",
+            offer_type=ConditionalOffer.SITE,
+            condition=condition,
+            benefit=benefit,
+        )
+        self.upsell_a = QuantityUpsell(self.range_a, 2, self.offer, self.basket)
+        self.upsell_b = QuantityUpsell(self.range_b, 2, self.offer, self.basket)
+        self.upsell_compound = CompoundUpsell(
+            Conjunction.OR, [self.upsell_a, self.upsell_b], self.offer, self.basket
+        )
+        self.upsell_custom = FirstProductUpsell(self.product_c, self.offer, self.basket)
+        self.upsells = [
+            self.upsell_a,
+            self.upsell_b,
+            self.upsell_compound,
+            self.upsell_custom,
+        ]
+        self.products = [self.product_a, self.product_b, self.product_c]
+
+    def test_matches_per_product_relevance(self):
+        relevance = UpsellRelevance(self.products)
+        for upsell in self.upsells:
+            with self.subTest(upsell=upsell):
+                self.assertEqual(
+                    relevance.get_relevant_product_ids(upsell),
+                    {
+                        product.pk
+                        for product in self.products
+                        if upsell.is_relevant_to_product(product)
+                    },
+                )
+
+    def test_prefetch_uses_single_query(self):
+        relevance = UpsellRelevance(self.products)
+        with self.assertNumQueries(1):
+            relevance.prefetch(self.upsells)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                relevance.get_relevant_product_ids(self.upsell_compound),
+                {self.product_a.pk, self.product_b.pk},
+            )
+
+    def test_candidate_ranges_resolved_once(self):
+        calls = []
+
+        def get_candidate_ranges():
+            calls.append(None)
+            return [self.range_a, self.range_b]
+
+        relevance = UpsellRelevance(self.products, get_candidate_ranges)
+        with self.assertNumQueries(1):
+            relevance.get_relevant_product_ids(self.upsell_a)
+            relevance.get_relevant_product_ids(self.upsell_b)
+            relevance.get_relevant_product_ids(self.upsell_compound)
+        self.assertEqual(len(calls), 1)
+
+    def test_answers_from_membership_snapshot(self):
+        snapshot = RangeMembershipSnapshot(
+            range_ids=[self.range_a.pk, self.range_b.pk],
+            product_ids=[p.pk for p in self.products],
+            membership={self.product_a.pk: [self.range_a.pk]},
+        )
+        relevance = UpsellRelevance(self.products)
+        with use_range_membership(snapshot), self.assertNumQueries(0):
+            relevance.prefetch(self.upsells)
+            self.assertEqual(
+                relevance.get_relevant_product_ids(self.upsell_a),
+                {self.product_a.pk},
+            )
+            self.assertEqual(relevance.get_relevant_product_ids(self.upsell_b), set())
+
+    def test_add_offer_upsells(self):
+        self.basket.add_offer_upsells(self.upsells)
+        upsells_by_product = {
+            line.product.pk: line.get_offer_upsells()
+            for line in self.basket.all_lines()
+        }
+        self.assertEqual(
+            upsells_by_product,
+            {
+                self.product_a.pk: [self.upsell_a, self.upsell_compound],
+                self.product_b.pk: [self.upsell_b, self.upsell_compound],
+                self.product_c.pk: [self.upsell_custom],
+            },
+        )
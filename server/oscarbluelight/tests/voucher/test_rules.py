@@ -214,3 +214,107 @@ class VoucherSingleUsePerCustomerRuleTest(TestCase):
             applied_rule.get_msg_text(),
             "You have already used this coupon in a previous order",
         )
+
+
+class VoucherAvailabilityDataTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="bob", email="bob@example.com", password="foo"
+        )
+        customer = Group.objects.create(name="Customers")
+        self.user.groups.set([customer])
+        other_user = User.objects.create_user(
+            username="john", email="john@example.com", password="foo"
+        )
+
+        def create_voucher(code, **kwargs):
+            return Voucher.objects.create(
+                name=f"Voucher {code}",
+                code=code,
+                start_datetime=timezone.now(),
+                end_datetime=timezone.now() + timezone.timedelta(days=1),
+                **kwargs,
+            )
+
+        parent = create_voucher("parent", usage=Voucher.MULTI_USE)
+        create_voucher("parent-1", usage=Voucher.MULTI_USE, parent=parent)
+        create_voucher("open", usage=Voucher.MULTI_USE)
+        create_voucher("suspended", usage=Voucher.MULTI_USE).suspend()
+        create_voucher(
+            "customers", usage=Voucher.MULTI_USE, limit_usage_by_group=True
+        ).groups.set([customer])
+        create_voucher(
+            "staff", usage=Voucher.MULTI_USE, limit_usage_by_group=True
+        ).groups.set([Group.objects.create(name="Staff")])
+        create_voucher("single-use", usage=Voucher.SINGLE_USE).record_usage(
+            create_order(), other_user
+        )
+        create_voucher("once-per-customer", usage=Voucher.ONCE_PER_CUSTOMER)
+        create_voucher(
+            "once-per-customer-used", usage=Voucher.ONCE_PER_CUSTOMER
+        ).record_usage(create_order(), self.user)
+        create_voucher(
+            "once-per-customer-used-by-other", usage=Voucher.ONCE_PER_CUSTOMER
+        ).record_usage(create_order(), other_user)
+
+    def _get_availability(self, vouchers, user):
+        return {
+            voucher.code: voucher.is_available_to_user(user)[0] for voucher in vouchers
+        }
+
+    def test_matches_unbatched_rules(self):
+        for user in (self.user, AnonymousUser()):
+            with self.subTest(user=user):
+                expected = self._get_availability(Voucher.objects.order_by("pk"), user)
+                vouchers = list(
+                    Voucher.objects.order_by("pk").with_availability_data(user)
+                )
+                with self.assertNumQueries(0):
+                    availability = self._get_availability(vouchers, user)
+                    for voucher in vouchers:
+                        list(voucher.offers.all())
+                self.assertEqual(availability, expected)
+
+        self.assertEqual(
+            expected,
+            {
+                "parent": False,
+                "parent-1": True,
+                "open": True,
+                "suspended": False,
+                "customers": False,
+                "staff": False,
+                "single-use": False,
+                "once-per-customer": False,
+                "once-per-customer-used": False,
+                "once-per-customer-used-by-other": False,
+            },
+        )
+        self.assertEqual(
+            self._get_availability(
+                Voucher.objects.order_by("pk").with_availability_data(self.user),
+                self.user,
+            ),
+            {
+                "parent": False,
+                "parent-1": True,
+                "open": True,
+                "suspended": False,
+                "customers": True,
+                "staff": False,
+                "single-use": False,
+                "once-per-customer": True,
+                "once-per-customer-used": False,
+                "once-per-customer-used-by-other": True,
+            },
+        )
+
+    def test_ignores_data_prefetched_for_another_user(self):
+        voucher = (
+            Voucher.objects.filter(code="once-per-customer-used")
+            .with_availability_data(self.user)
+            .get()
+        )
+        other_user = User.objects.get(username="john")
+        self.assertFalse(voucher.is_available_to_user(self.user)[0])
+        self.assertTrue(voucher.is_available_to_user(other_user)[0])
@@ -1,8 +1,11 @@
 from decimal import Decimal as D
 from unittest.mock import patch
+import re
 
 from django.contrib.auth.models import AnonymousUser, Group, User
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from oscar.test.factories import create_order
 
@@ -437,6 +440,144 @@ class ParentChildVoucherTest(TestCase):
                 str(cm.exception),
             )
 
+    def test_create_children_generated_in_db(self):
+        p = Voucher.objects.create(
+            name="Test Voucher",
+            code="test-voucher",
+            usage=Voucher.SINGLE_USE,
+            start_datetime=timezone.now(),
+            end_datetime=timezone.now(),
+            limit_usage_by_group=False,
+        )
+        # Query breakdown:
+        # - 3 baseline (transaction start/commit + existing children count)
+        # - 1 insert per batch of 100,000 codes
+        with self.assertNumQueries(3 + 2):
+            errors, success_count = p.create_children(
+                auto_generate_count=150_000, generate_in_db=True
+            )
+        self.assertEqual(errors, [])
+        self.assertEqual(success_count, 150_000)
+        self.assertEqual(p.children.all().count(), 150_000)
+        codes = list(p.children.values_list("code", flat=True))
+        self.assertEqual(len(set(codes)), 150_000)
+        self.assertTrue(
+            all(re.fullmatch(r"TEST-VOUCHER-\d{6}\d{3}", code) for code in codes)
+        )
+        c1 = p.children.order_by("code").first()
+        self.assertEqual(c1.name, "Test Voucher")
+        self.assertTrue(c1.code.startswith("TEST-VOUCHER-000000"))
+        self.assertEqual(c1.usage, Voucher.SINGLE_USE)
+        self.assertEqual(c1.start_datetime, p.start_datetime)
+        self.assertEqual(c1.end_datetime, p.end_datetime)
+        self.assertEqual(c1.status, p.status)
+        self.assertFalse(c1.limit_usage_by_group)
+
+        # New codes' indexes continue after the existing children
+        p.create_children(auto_generate_count=10, generate_in_db=True)
+        self.assertEqual(
+            p.children.filter(code__startswith="TEST-VOUCHER-150").count(), 10
+        )
+
+    @override_settings(BLUELIGHT_VOUCHER_GENERATE_CODES_IN_DB=True)
+    def test_insert_generated_children_retries_conflicts(self):
+        p = Voucher.objects.create(
+            name="Test Voucher",
+            code="test-voucher",
+            usage=Voucher.SINGLE_USE,
+            start_datetime=timezone.now(),
+            end_datetime=timezone.now(),
+            limit_usage_by_group=False,
+        )
+        other = Voucher.objects.create(
+            name="Other Voucher",
+            code="other-voucher",
+            usage=Voucher.SINGLE_USE,
+            start_datetime=timezone.now(),
+            end_datetime=timezone.now(),
+            limit_usage_by_group=False,
+        )
+        # Take half of the possible suffixes for index 01, so its code conflicts about half
+        # the time, and must be retried with new suffixes.
+        other._create_child_batch(
+            [f"TEST-VOUCHER-01{suffix:03d}" for suffix in range(0, 1000, 2)],
+            update_children=False,
+        )
+        self.assertEqual(p._insert_generated_children(10, max_rounds=50), 10)
+        self.assertEqual(p.children.all().count(), 10)
+        self.assertEqual(
+            p.children.filter(code__startswith="TEST-VOUCHER-01").count(), 1
+        )
+
+        # Take every suffix for the next index, so it can never be inserted
+        other._create_child_batch(
+            [f"TEST-VOUCHER-10{suffix:03d}" for suffix in range(1000)],
+            update_children=False,
+        )
+        with self.assertRaises(RuntimeError) as cm:
+            p.create_children(auto_generate_count=5)
+        self.assertEqual(
+            "Couldn't find enough unique child codes after 5 rounds.",
+            str(cm.exception),
+        )
+
+    def test_create_children_copy_custom_codes(self):
+        p = Voucher.objects.create(
+            name="Test Voucher",
+            code="test-voucher",
+            usage=Voucher.SINGLE_USE,
+            start_datetime=timezone.now(),
+            end_datetime=timezone.now(),
+            limit_usage_by_group=False,
+        )
+        other = Voucher.objects.create(
+            name="Other Voucher",
+            code="other-voucher",
+            usage=Voucher.SINGLE_USE,
+            start_datetime=timezone.now(),
+            end_datetime=timezone.now(),
+            limit_usage_by_group=False,
+        )
+        p.create_children(custom_codes=["CUSTOM-1"])
+        other.create_children(custom_codes=["CUSTOM-OTHER"])
+        custom_codes = [f"BULK-{i:05d}" for i in range(5_000)] + [
+            "CUSTOM-1",
+            "CUSTOM-2",
+            "CUSTOM-2",
+            "CUSTOM-OTHER",
+            "TAB\tBACK\\SLASH",
+        ]
+        # The number of queries doesn't depend on the number of codes
+        with CaptureQueriesContext(connection) as ctx:
+            errors, success_count = p.create_children(
+                custom_codes=iter(custom_codes), copy_custom_codes=True
+            )
+        self.assertLessEqual(len(ctx.captured_queries), 9)
+        self.assertEqual(
+            [str(error) for error in errors],
+            [
+                "Could not create code “CUSTOM-1” because it already exists.",
+                "Could not create code “CUSTOM-OTHER” because it already exists.",
+            ],
+        )
+        self.assertEqual(success_count, 5_002)
+        self.assertEqual(
+            set(p.children.values_list("code", flat=True)),
+            set(custom_codes) - {"CUSTOM-OTHER"},
+        )
+        c1 = p.children.get(code="CUSTOM-2")
+        self.assertEqual(c1.name, "Test Voucher")
+        self.assertEqual(c1.usage, Voucher.SINGLE_USE)
+        self.assertEqual(c1.start_datetime, p.start_datetime)
+        self.assertEqual(c1.end_datetime, p.end_datetime)
+        self.assertFalse(c1.limit_usage_by_group)
+
+        # Loading nothing doesn't create the temporary table
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                p.create_children(custom_codes=[], copy_custom_codes=True), ([], 0)
+            )
+
     def test_update_parent(self):
         customer = Group.objects.create(name="Customers")
         csrs = Group.objects.create(name="Customer Service Reps")
@@ -3,6 +3,7 @@ from __future__ import annotations
 from collections.abc import Callable, Collection, Iterable, Sequence
 from datetime import datetime
 from functools import partial
+from itertools import chain
 from typing import TYPE_CHECKING, Any, Self
 import time
 
@@ -15,6 +16,7 @@ from django.db.models.base import ModelBase
 from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
 from oscar.apps.voucher.abstract_models import AbstractVoucher
+from oscar.core.loading import get_model
 from thelabdb.fields import NullCharField
 
 from ..offer.models import Benefit, Condition, ConditionalOffer, OfferGroup
@@ -44,6 +46,44 @@ class VoucherQuerySet(models.QuerySet["Voucher"]):
         qs = self.order_by("pk")
         return models.QuerySet.select_for_update(qs, nowait, skip_locked, of, no_key)
 
+    def with_availability_data(
+        self,
+        user: AbstractBaseUser | AnonymousUser | None = None,
+        offers_queryset: models.QuerySet[ConditionalOffer] | None = None,
+    ) -> Self:
+        """
+        Annotate / prefetch everything the built-in voucher availability rules need (child
+        existence, prior applications, user group membership, and the voucher's offers), so that
+        ``Voucher.is_available_to_user`` can be evaluated for every voucher in the queryset
+        without running any further queries.
+        """
+        VoucherApplication = get_model("voucher", "VoucherApplication")
+        applications = VoucherApplication.objects.filter(
+            voucher=models.OuterRef("pk")
+        ).exclude(order__status__in=settings.BLUELIGHT_IGNORED_ORDER_STATUSES)
+        qs = self.annotate(
+            availability_has_children=models.Exists(
+                self.model.objects.filter(parent=models.OuterRef("pk"))
+            ),
+            availability_is_used=models.Exists(applications),
+        )
+        if user is not None and user.is_authenticated:
+            qs = qs.annotate(
+                availability_user_id=models.Value(user.pk),
+                availability_is_used_by_user=models.Exists(
+                    applications.filter(user=user)
+                ),
+                availability_is_in_user_groups=models.Exists(
+                    self.model.groups.through.objects.filter(
+                        voucher=models.OuterRef("pk"),
+                        group__in=user.groups.all(),  # type:ignore[union-attr]  # custom user models provide groups via PermissionsMixin
+                    )
+                ),
+            )
+        if offers_queryset is None:
+            offers_queryset = ConditionalOffer.objects.all()
+        return qs.prefetch_related(models.Prefetch("offers", queryset=offers_queryset))
+
 
 class VoucherManager(models.Manager["Voucher"]):
     def get_queryset(self) -> VoucherQuerySet:
@@ -165,6 +205,53 @@ class Voucher(AbstractVoucher):
 
     unsuspend.alters_data = True  # type:ignore[attr-defined]  # Django alters_data convention
 
+    def _get_availability_data(
+        self,
+        name: str,
+        user: AbstractBaseUser | AnonymousUser | None = None,
+    ) -> bool | None:
+        # Annotations added by ``VoucherQuerySet.with_availability_data``. User specific ones are
+        # only used if they were computed for the same user.
+        if user is not None and getattr(self, "availability_user_id", None) != user.pk:
+            return None
+        return getattr(self, f"availability_{name}", None)
+
+    def has_children(self) -> bool:
+        has_children = self._get_availability_data("has_children")
+        if has_children is None:
+            return self.list_children().exists()
+        return has_children
+
+    def is_used(self, user: AbstractBaseUser | None = None) -> bool:
+        """
+        Check if the voucher has been used in an order (optionally, an order placed by the given
+        user), ignoring orders with a status in ``BLUELIGHT_IGNORED_ORDER_STATUSES``.
+        """
+        is_used = self._get_availability_data(
+            "is_used_by_user" if user else "is_used", user
+        )
+        if is_used is not None:
+            return is_used
+        applications = self.applications.exclude(
+            order__status__in=settings.BLUELIGHT_IGNORED_ORDER_STATUSES
+        )
+        if user is not None:
+            applications = applications.filter(voucher=self, user=user)
+        return applications.exists()
+
+    def is_in_user_groups(self, user: AbstractBaseUser | AnonymousUser) -> bool:
+        """
+        Check if the given user is a member of any of the voucher's groups.
+        """
+        if not user.is_authenticated:
+            return False
+        is_member = self._get_availability_data("is_in_user_groups", user)
+        if is_member is not None:
+            return is_member
+        group_ids = {g.id for g in self.groups.all()}
+        member_ids = {g.id for g in user.groups.all()}  # type:ignore[union-attr]  # custom user models provide groups via PermissionsMixin
+        return len(group_ids & member_ids) > 0
+
     def is_available_to_user(
         self,
         user: AbstractBaseUser | AnonymousUser | None = None,
@@ -187,8 +274,24 @@ class Voucher(AbstractVoucher):
     def create_children(
         self,
         auto_generate_count: int = 0,
-        custom_codes: Sequence[Any] = [],
+        custom_codes: Iterable[Any] = [],
+        generate_in_db: bool | None = None,
+        copy_custom_codes: bool | None = None,
     ) -> tuple[list[StrOrPromise], int]:
+        """
+        Create child vouchers: ``auto_generate_count`` with generated codes, plus one for each of
+        the given ``custom_codes``. Returns the errors for custom codes which already exist, and
+        the number of children created.
+
+        If ``generate_in_db`` is true (defaults to the ``BLUELIGHT_VOUCHER_GENERATE_CODES_IN_DB``
+        setting), the generated codes are created and inserted by PostgreSQL, in batches, instead
+        of in Python (see :meth:`_insert_generated_children`).
+
+        If ``copy_custom_codes`` is true (defaults to the ``BLUELIGHT_VOUCHER_COPY_CUSTOM_CODES``
+        setting), the custom codes are streamed into the database with ``COPY`` and inserted with
+        a single statement (see :meth:`_copy_custom_children`), so ``custom_codes`` may be any
+        iterable, e.g. the lines of a file.
+        """
         if self.parent is not None:
             raise RuntimeError(
                 _(
@@ -199,19 +302,35 @@ class Voucher(AbstractVoucher):
             self.save()
         errors = []
         success_count = 0
+        if generate_in_db is None:
+            generate_in_db = getattr(
+                settings, "BLUELIGHT_VOUCHER_GENERATE_CODES_IN_DB", False
+            )
         # Generate auto codes
-        auto_gen_codes = self._get_child_code_batch(auto_generate_count)
-        # Update newly created child vouchers only when calling `_create_child_batch` for the last time.
-        success_count += len(
-            self._create_child_batch(auto_gen_codes, update_children=False)
-        )
+        if generate_in_db:
+            success_count += self._insert_generated_children(auto_generate_count)
+        else:
+            auto_gen_codes = self._get_child_code_batch(auto_generate_count)
+            # Update newly created child vouchers only when calling `_create_child_batch` for the last time.
+            success_count += len(
+                self._create_child_batch(auto_gen_codes, update_children=False)
+            )
+        if copy_custom_codes is None:
+            copy_custom_codes = getattr(
+                settings, "BLUELIGHT_VOUCHER_COPY_CUSTOM_CODES", False
+            )
         # Save manual/custom codes
-        custom_code_successes = self._create_child_batch(
-            custom_codes, update_children=False
-        )
-        success_count += len(custom_code_successes)
-        custom_code_failures = set(custom_codes) - custom_code_successes
-        for code in sorted(custom_code_failures):
+        if copy_custom_codes:
+            num_created, custom_code_failures = self._copy_custom_children(custom_codes)
+            success_count += num_created
+        else:
+            custom_codes = list(custom_codes)
+            custom_code_successes = self._create_child_batch(
+                custom_codes, update_children=False
+            )
+            success_count += len(custom_code_successes)
+            custom_code_failures = sorted(set(custom_codes) - custom_code_successes)
+        for code in custom_code_failures:
             errors.append(
                 _("Could not create code “%s” because it already exists.") % code
             )
@@ -426,6 +545,97 @@ class Voucher(AbstractVoucher):
             remaining = num_codes - len(new_codes)
         return new_codes
 
+    def _insert_generated_children(
+        self,
+        num_codes: int,
+        batch_size: int = 100_000,
+        max_rounds: int = 5,
+        extra_length: int = 3,
+    ) -> int:
+        """
+        Generate and insert ``num_codes`` child vouchers, entirely in the database. Returns the
+        number of children created.
+
+        Codes have the same format as :meth:`_get_code_uniquifier`'s (the parent's code, the
+        zero-padded index, then ``extra_length`` random digits). Each batch of indexes is inserted
+        with a single ``INSERT ... ON CONFLICT DO NOTHING``, which returns the indexes whose codes
+        already existed. Only those indexes are retried, with new random digits.
+        """
+        if num_codes <= 0:
+            return 0
+        start_index = self.children.count()
+        end_index = start_index + num_codes
+        params: dict[str, Any] = {
+            "parent_id": self.pk,
+            "prefix": f"{self.code}-",
+            "index_width": len(str(end_index)),
+            "suffix_length": extra_length,
+            "suffix_modulus": 10**extra_length,
+        }
+        num_created = 0
+        with connection.cursor() as cursor:
+            for batch_start in range(start_index, end_index, batch_size):
+                batch_end = min(batch_start + batch_size, end_index)
+                cursor.execute(
+                    sql.get_insert_generated_children_sql(Voucher),
+                    {
+                        **params,
+                        "start_index": batch_start,
+                        "end_index": batch_end - 1,
+                    },
+                )
+                conflicts = [row[0] for row in cursor.fetchall()]
+                num_created += (batch_end - batch_start) - len(conflicts)
+                rounds = 1
+                while conflicts:
+                    if rounds >= max_rounds:
+                        raise RuntimeError(
+                            _(
+                                "Couldn't find enough unique child codes after %s rounds."
+                            )
+                            % max_rounds
+                        )
+                    rounds += 1
+                    cursor.execute(
+                        sql.get_retry_generated_children_sql(Voucher),
+                        {**params, "indexes": conflicts},
+                    )
+                    num_retried = len(conflicts)
+                    conflicts = [row[0] for row in cursor.fetchall()]
+                    num_created += num_retried - len(conflicts)
+        return num_created
+
+    def _copy_custom_children(self, codes: Iterable[Any]) -> tuple[int, list[str]]:
+        """
+        Insert a child voucher for each of the given custom codes, entirely in the database.
+        Returns the number of children created, and the (sorted, distinct) codes which weren't
+        created because they already exist.
+
+        The codes are streamed into a temporary table with ``COPY``, then inserted with a single
+        ``INSERT ... ON CONFLICT DO NOTHING``, which also marks the codes it inserted. Only the
+        conflicting codes are read back into Python.
+        """
+        codes = iter(codes)
+        first_code = next(codes, None)
+        if first_code is None:
+            return 0, []
+        with connection.cursor() as cursor:
+            cursor.execute(sql.get_drop_custom_codes_table_sql())
+            cursor.execute(sql.get_create_custom_codes_table_sql())
+            sql.copy_custom_codes(
+                cursor, (str(code) for code in chain([first_code], codes))
+            )
+            cursor.execute(sql.get_analyze_custom_codes_table_sql())
+            cursor.execute(
+                sql.get_insert_custom_children_sql(Voucher),
+                {"parent_id": self.pk},
+            )
+            num_created = cursor.fetchone()[0]
+            cursor.execute(sql.get_select_custom_code_conflicts_sql())
+            conflicts = [row[0] for row in cursor.fetchall()]
+            cursor.execute(sql.get_drop_custom_codes_table_sql())
+        return num_created, conflicts
+
     def _get_child_code(
         self,
         code_index: int,
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from django.conf import settings
 from django.contrib.auth.models import AnonymousUser, User
 from django.utils.translation import gettext_lazy as _
 
@@ -60,7 +59,7 @@ class VoucherHasChildrenRule(VoucherRule):
     def is_obeyed_by_user(self) -> bool:
         ret = super().is_obeyed_by_user()
         # Parent vouchers can not be used directly
-        if self.voucher.list_children().exists():
+        if self.voucher.has_children():
             return False
         return ret
 
@@ -88,10 +87,7 @@ class VoucherLimitUsageByGroupRule(VoucherRule):
         if self.voucher.limit_usage_by_group:
             if not self.user:
                 return False
-            group_ids = {g.id for g in self.voucher.groups.all()}
-            member_ids = {g.id for g in self.user.groups.all()}
-            is_member = len(group_ids & member_ids) > 0
-            if not is_member:
+            if not self.voucher.is_in_user_groups(self.user):
                 return False
         return ret
 
@@ -105,11 +101,7 @@ class VoucherSingleUseRule(VoucherRule):
     def is_obeyed_by_user(self) -> bool:
         ret = super().is_obeyed_by_user()
         if self.voucher.usage == Voucher.SINGLE_USE:
-            # Ignore statuses in BLUELIGHT_IGNORED_ORDER_STATUSES
-            is_available = not self.voucher.applications.exclude(
-                order__status__in=settings.BLUELIGHT_IGNORED_ORDER_STATUSES
-            ).exists()
-            return is_available
+            return not self.voucher.is_used()
         return ret
 
 
@@ -126,15 +118,7 @@ class VoucherSingleUsePerCustomerRule(VoucherRule):
                 self.user if self.user and self.user.is_authenticated else None
             )
             if authd_user:
-                # Ignore statuses in BLUELIGHT_IGNORED_ORDER_STATUSES
-                is_available = (
-                    not self.voucher.applications.exclude(
-                        order__status__in=settings.BLUELIGHT_IGNORED_ORDER_STATUSES
-                    )
-                    .filter(voucher=self.voucher, user=authd_user)
-                    .exists()
-                )
-                return is_available
+                return not self.voucher.is_used(authd_user)
             self._message = _("This voucher is only available to signed in users")
             return False
         return ret
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any
 
 from django.core.exceptions import ImproperlyConfigured
 
 if TYPE_CHECKING:
-    from psycopg2.sql import Composed
+    from psycopg2.sql import Composable, Composed
 
     from .models import Voucher
 
@@ -17,6 +18,13 @@ try:
 except ImportError:
     raise ImproperlyConfigured("Error loading psycopg2 or psycopg module")
 
+#: Temporary table which custom child codes are copied into before being inserted
+CUSTOM_CODES_TABLE = "bluelight_custom_voucher_codes"
+
+_COPY_TEXT_ESCAPES = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+)
+
 
 def get_update_children_meta_sql(Voucher: type[Voucher]) -> Composed:
     query = sql.SQL(
@@ -137,3 +145,247 @@ def get_prune_children_groups_sql(Voucher: type[Voucher]) -> Composed:
         "group_id",
     )
     return query
+
+
+def _get_insert_generated_children_sql(
+    Voucher: type[Voucher], index_source: Composable
+) -> Composed:
+    # Each code is the prefix, the zero-padded index, then a random suffix (from
+    # gen_random_uuid, which uses a cryptographically secure RNG). The candidates CTE is
+    # materialized, so the codes returned as failures are the ones which were generated.
+    query = sql.SQL(
+        """
+        WITH candidates AS MATERIALIZED (
+            SELECT i AS code_index,
+                   {prefix}::text
+                   || lpad(i::text, {index_width}::integer, '0')
+                   || lpad(
+                        (
+                            ('x' || substr(gen_random_uuid()::text, 1, 8))::bit(32)::bigint
+                            % {suffix_modulus}::bigint
+                        )::text,
+                        {suffix_length}::integer,
+                        '0'
+                      ) AS code
+              FROM {index_source} AS i
+        ), inserted AS (
+            INSERT INTO {voucher_table} (
+                name,
+                code,
+                usage,
+                start_datetime,
+                end_datetime,
+                num_basket_additions,
+                num_orders,
+                total_discount,
+                date_created,
+                parent_id,
+                limit_usage_by_group,
+                status
+            )
+            SELECT null,
+                   c.code,
+                   pv.usage,
+                   pv.start_datetime,
+                   pv.end_datetime,
+                   0,
+                   0,
+                   0,
+                   now(),
+                   pv.id,
+                   pv.limit_usage_by_group,
+                   pv.status
+              FROM candidates c
+             CROSS JOIN {voucher_table} pv
+             WHERE pv.id = {parent_id}
+                ON CONFLICT DO NOTHING
+         RETURNING code
+        )
+        SELECT c.code_index
+          FROM candidates c
+         WHERE NOT EXISTS (
+                SELECT 1
+                  FROM inserted ins
+                 WHERE ins.code = c.code
+               )
+         ORDER BY c.code_index;
+        """
+    ).format(
+        voucher_table=sql.Identifier(Voucher._meta.db_table),
+        index_source=index_source,
+        parent_id=sql.Placeholder("parent_id"),
+        prefix=sql.Placeholder("prefix"),
+        index_width=sql.Placeholder("index_width"),
+        suffix_length=sql.Placeholder("suffix_length"),
+        suffix_modulus=sql.Placeholder("suffix_modulus"),
+    )
+    return query
+
+
+def get_insert_generated_children_sql(Voucher: type[Voucher]) -> Composed:
+    """
+    Insert a child voucher for each index from ``start_index`` to ``end_index`` (inclusive),
+    skipping codes which already exist. Returns the indexes whose codes already existed.
+    """
+    index_source = sql.SQL(
+        "generate_series({start_index}::bigint, {end_index}::bigint)"
+    ).format(
+        start_index=sql.Placeholder("start_index"),
+        end_index=sql.Placeholder("end_index"),
+    )
+    return _get_insert_generated_children_sql(Voucher, index_source)
+
+
+def get_retry_generated_children_sql(Voucher: type[Voucher]) -> Composed:
+    """
+    Same as :func:`get_insert_generated_children_sql`, but for the given array of ``indexes``
+    (i.e. those whose codes conflicted), with new random suffixes.
+    """
+    index_source = sql.SQL("unnest({indexes}::bigint[])").format(
+        indexes=sql.Placeholder("indexes"),
+    )
+    return _get_insert_generated_children_sql(Voucher, index_source)
+
+
+def get_create_custom_codes_table_sql() -> Composed:
+    query = sql.SQL(
+        """
+        CREATE TEMPORARY TABLE {codes_table} (
+            code varchar(128) NOT NULL,
+            is_created boolean NOT NULL DEFAULT false
+        ) ON COMMIT DROP;
+        """
+    ).format(
+        codes_table=sql.Identifier(CUSTOM_CODES_TABLE),
+    )
+    return query
+
+
+def get_analyze_custom_codes_table_sql() -> Composed:
+    # Temporary tables aren't analyzed automatically
+    query = sql.SQL("ANALYZE {codes_table};").format(
+        codes_table=sql.Identifier(CUSTOM_CODES_TABLE),
+    )
+    return query
+
+
+def get_drop_custom_codes_table_sql() -> Composed:
+    query = sql.SQL("DROP TABLE IF EXISTS {codes_table};").format(
+        codes_table=sql.Identifier(CUSTOM_CODES_TABLE),
+    )
+    return query
+
+
+def copy_custom_codes(cursor: Any, codes: Iterable[str]) -> None:
+    """
+    Stream the given codes into the custom codes table with ``COPY``.
+    """
+    query = sql.SQL("COPY {codes_table} (code) FROM STDIN").format(
+        codes_table=sql.Identifier(CUSTOM_CODES_TABLE),
+    )
+    # psycopg2
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(query, _CopyTextStream(codes))
+        return
+    # psycopg 3
+    with cursor.copy(query) as copy:
+        for code in codes:
+            copy.write_row((code,))
+
+
+class _CopyTextStream:
+    """
+    File-like object which reads the given values as rows of ``COPY``'s text format.
+    """
+
+    def __init__(self, values: Iterable[str]):
+        self._lines = (value.translate(_COPY_TEXT_ESCAPES) + "\n" for value in values)
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def get_insert_custom_children_sql(Voucher: type[Voucher]) -> Composed:
+    """
+    Insert a child voucher for each distinct code in the custom codes table, skipping codes
+    which already exist, and mark the codes which were inserted. Returns the number of
+    children inserted.
+    """
+    query = sql.SQL(
+        """
+        WITH inserted AS (
+            INSERT INTO {voucher_table} (
+                name,
+                code,
+                usage,
+                start_datetime,
+                end_datetime,
+                num_basket_additions,
+                num_orders,
+                total_discount,
+                date_created,
+                parent_id,
+                limit_usage_by_group,
+                status
+            )
+            SELECT null,
+                   c.code,
+                   pv.usage,
+                   pv.start_datetime,
+                   pv.end_datetime,
+                   0,
+                   0,
+                   0,
+                   now(),
+                   pv.id,
+                   pv.limit_usage_by_group,
+                   pv.status
+              FROM (
+                    SELECT DISTINCT code
+                      FROM {codes_table}
+                   ) c
+             CROSS JOIN {voucher_table} pv
+             WHERE pv.id = {parent_id}
+                ON CONFLICT DO NOTHING
+         RETURNING code
+        ), marked AS (
+            UPDATE {codes_table} AS c
+               SET is_created = true
+              FROM inserted ins
+             WHERE c.code = ins.code
+        )
+        SELECT count(*)
+          FROM inserted;
+        """
+    ).format(
+        voucher_table=sql.Identifier(Voucher._meta.db_table),
+        codes_table=sql.Identifier(CUSTOM_CODES_TABLE),
+        parent_id=sql.Placeholder("parent_id"),
+    )
+    return query
+
+
+def get_select_custom_code_conflicts_sql() -> Composed:
+    """
+    Select the distinct codes from the custom codes table which weren't inserted.
+    """
+    query = sql.SQL(
+        """
+        SELECT DISTINCT code
+          FROM {codes_table}
+         WHERE NOT is_created
+         ORDER BY code;
+        """
+    ).format(
+        codes_table=sql.Identifier(CUSTOM_CODES_TABLE),
+    )
+    return query
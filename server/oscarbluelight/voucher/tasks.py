@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
+from collections.abc import Iterable
 from typing import TYPE_CHECKING
 import logging
 
@@ -24,13 +24,18 @@ def update_child_vouchers(voucher_id: int) -> None:
 def add_child_codes(
     voucher_id: int,
     auto_generate_count: int = 0,
-    custom_codes: Sequence[str] = [],
+    custom_codes: Iterable[str] = [],
+    generate_in_db: bool | None = None,
+    copy_custom_codes: bool | None = None,
 ) -> tuple[list[StrOrPromise], int]:
     from .models import Voucher
 
     parent = Voucher.objects.get(pk=voucher_id)
     errors, success_count = parent.create_children(
-        auto_generate_count=auto_generate_count, custom_codes=custom_codes
+        auto_generate_count=auto_generate_count,
+        custom_codes=custom_codes,
+        generate_in_db=generate_in_db,
+        copy_custom_codes=copy_custom_codes,
     )
     parent.save()
     for error in errors: